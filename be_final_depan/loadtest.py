@@ -0,0 +1,316 @@
+"""
+Load generator untuk endpoint face server, memakai bentuk request yang sama dengan scriptnew.py:
+- verify : POST /face/createlogusersmartnew/   (upload satu frame)
+- logs   : GET  /face/getuserlogsmartnew/      (riwayat akses satu owner)
+- enroll : POST /face/createimagetrainingusernew/ (burst beberapa gambar training)
+
+Contoh:
+    python loadtest.py --images sample_faces/ --concurrency 8 --rate 20 --duration 60
+    python loadtest.py --ramp 1 2 4 8 16 --duration 20 --mix verify=90 logs=5 enroll=5 --json hasil.json
+
+Latensi verify dicatat terpisah ketika ada enroll yang sedang berjalan, supaya kelihatan
+seberapa besar antrean akibat model lbph_model.xml ditulis ulang saat training.
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+import requests
+
+BASE_URL = "http://localhost:8000"
+
+
+def synthetic_frame(seed, width=640, height=480):
+    """Frame wajah sintetis (oval, mata, mulut) kalau tidak ada folder gambar contoh."""
+    rng = np.random.default_rng(seed)
+    frame = np.full((height, width), 128, np.uint8)
+    size = int(height * 0.6)
+    face = np.full((size, size), int(rng.integers(30, 60)), np.uint8)
+    c = size // 2
+    cv2.ellipse(face, (c, c), (int(size * 0.32), int(size * 0.42)), 0, 0, 360, int(rng.integers(170, 220)), -1)
+    for side in (-1, 1):
+        cv2.ellipse(face, (c + side * int(size * 0.13), int(c - size * 0.1)), (int(size * 0.07), int(size * 0.035)),
+                    0, 0, 360, int(rng.integers(20, 60)), -1)
+    cv2.ellipse(face, (c, c + int(size * 0.22)), (int(size * 0.1), int(size * 0.03)), 0, 0, 360, 60, -1)
+    top, left = (height - size) // 2, (width - size) // 2
+    frame[top:top + size, left:left + size] = cv2.GaussianBlur(face, (5, 5), 0)
+    ok, buffer = cv2.imencode('.jpg', cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR))
+    return buffer.tobytes()
+
+
+def load_images(folder, count=20):
+    """Isi gambar (bytes) dari folder contoh, atau frame sintetis kalau folder kosong/tidak diberikan."""
+    images = []
+    if folder and os.path.isdir(folder):
+        for name in sorted(os.listdir(folder)):
+            if name.lower().endswith(("jpg", "jpeg", "png")):
+                with open(os.path.join(folder, name), 'rb') as file:
+                    images.append((name, file.read()))
+    if not images:
+        images = [(f"synthetic_{seed}.jpg", synthetic_frame(seed)) for seed in range(count)]
+    return images
+
+
+def get_owner_usernames():
+    """Sama dengan get_all_owners di scriptnew.py, hanya diambil username-nya."""
+    try:
+        response = requests.get(f"{BASE_URL}/users/userowner/", timeout=10)
+        if response.status_code == 200:
+            return [owner['username'] for owner in response.json()]
+    except requests.RequestException as e:
+        print(f"Error mengambil owner: {e}")
+    return []
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(q / 100 * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+def summarize(latencies, errors, elapsed):
+    values = sorted(latencies)
+    total = len(values)
+    return {
+        'requests': total,
+        'errors': errors,
+        'error_rate': round(errors / total, 4) if total else 0.0,
+        'rps': round(total / elapsed, 2) if elapsed else 0.0,
+        **{f"p{q}_ms": round(percentile(values, q) * 1000, 2) if values else None for q in (50, 90, 95, 99)},
+        'max_ms': round(values[-1] * 1000, 2) if values else None,
+    }
+
+
+# input yang dibutuhkan tiap jenis request
+REQUIRES = {
+    'verify': ('images',),
+    'logs': ('usernames',),
+    'enroll': ('images', 'usernames'),
+}
+
+
+def check_mix(mix, images, usernames):
+    """Pesan error kalau mix tidak bisa dijalankan dengan input yang ada, None kalau aman."""
+    mix = {kind: weight for kind, weight in mix.items() if weight > 0}
+    if not mix:
+        return "--mix tidak berisi request dengan bobot > 0"
+    inputs = {'images': images, 'usernames': usernames}
+    for kind in mix:
+        missing = [name for name in REQUIRES[kind] if not inputs[name]]
+        if missing:
+            return (f"request '{kind}' butuh {', '.join(missing)} tapi tidak ada; "
+                    f"isi --usernames/--images atau hapus '{kind}' dari --mix")
+    return None
+
+
+class LoadTest:
+    def __init__(self, images, usernames, mix, enroll_images=3, timeout=30, terminals=0):
+        error = check_mix(mix, images, usernames)
+        if error:
+            raise ValueError(error)
+        self.images = images
+        self.usernames = usernames
+        self.mix = {kind: weight for kind, weight in mix.items() if weight > 0}
+        self.enroll_images = enroll_images
+        self.timeout = timeout
+        # jumlah terminal simulasi (header X-Terminal-Id), 0 = tanpa id terminal
+        self.terminals = terminals
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.enrolling = 0
+        self.reset()
+
+    def reset(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.status_codes = defaultdict(lambda: defaultdict(int))
+
+    @property
+    def session(self):
+        if not hasattr(self.local, 'session'):
+            self.local.session = requests.Session()
+        return self.local.session
+
+    def verify(self):
+        name, payload = random.choice(self.images)
+        headers = {'X-Terminal-Id': f"loadtest-{random.randrange(self.terminals)}"} if self.terminals else {}
+        return self.session.post(f"{BASE_URL}/face/createlogusersmartnew/", headers=headers,
+                                 files=[('image', (name, payload, 'image/jpeg'))], timeout=self.timeout)
+
+    def logs(self):
+        return self.session.get(f"{BASE_URL}/face/getuserlogsmartnew/",
+                                params={'username': random.choice(self.usernames)}, timeout=self.timeout)
+
+    def enroll(self):
+        files = [('image_list', (name, payload, 'image/jpeg'))
+                 for name, payload in random.sample(self.images, min(self.enroll_images, len(self.images)))]
+        with self.lock:
+            self.enrolling += 1
+        try:
+            return self.session.post(f"{BASE_URL}/face/createimagetrainingusernew/",
+                                     data={'username': random.choice(self.usernames)}, files=files,
+                                     timeout=self.timeout)
+        finally:
+            with self.lock:
+                self.enrolling -= 1
+
+    def run_one(self, kind):
+        with self.lock:
+            during_enroll = self.enrolling > 0
+        start = time.perf_counter()
+        try:
+            response = getattr(self, kind)()
+            code = response.status_code
+            failed = code >= 500 or (kind != 'logs' and code >= 400)
+        except requests.RequestException as e:
+            code, failed = type(e).__name__, True
+        elapsed = time.perf_counter() - start
+        key = f"{kind}_during_enroll" if kind == 'verify' and during_enroll else kind
+        with self.lock:
+            self.latencies[key].append(elapsed)
+            self.status_codes[kind][str(code)] += 1
+            if failed:
+                self.errors[key] += 1
+
+    def pick(self):
+        kinds = list(self.mix)
+        return random.choices(kinds, weights=[self.mix[kind] for kind in kinds])[0]
+
+    def run(self, concurrency, duration, rate=0):
+        """
+        rate > 0: request dijadwalkan merata (open loop), antrean yang menumpuk ikut terukur.
+        rate = 0: tiap worker langsung mengirim request berikutnya (closed loop).
+        """
+        self.reset()
+        deadline = time.perf_counter() + duration
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            if rate > 0:
+                interval, next_at, futures = 1.0 / rate, started, []
+                while next_at < deadline:
+                    delay = next_at - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    futures.append(pool.submit(self.run_one, self.pick()))
+                    next_at += interval
+                for future in futures:
+                    future.result()
+            else:
+                def worker():
+                    while time.perf_counter() < deadline:
+                        self.run_one(self.pick())
+                for future in [pool.submit(worker) for _ in range(concurrency)]:
+                    future.result()
+        elapsed = time.perf_counter() - started
+        total_requests = sum(len(values) for values in self.latencies.values())
+        total_errors = sum(self.errors.values())
+        return {
+            'concurrency': concurrency,
+            'rate': rate,
+            'duration_s': round(elapsed, 2),
+            'rps': round(total_requests / elapsed, 2) if elapsed else 0.0,
+            'error_rate': round(total_errors / total_requests, 4) if total_requests else 0.0,
+            'endpoints': {kind: summarize(values, self.errors[kind], elapsed)
+                          for kind, values in sorted(self.latencies.items())},
+            'status_codes': {kind: dict(codes) for kind, codes in self.status_codes.items()},
+        }
+
+
+def find_saturation(steps, max_error_rate=0.01, latency_factor=2.0, min_gain=0.1):
+    """
+    Titik jenuh: langkah pertama yang throughput-nya tidak naik minimal min_gain dari langkah
+    sebelumnya, error rate melebihi batas, atau p95 verify lebih dari latency_factor x langkah pertama.
+    """
+    def p95(step):
+        return step['endpoints'].get('verify', {}).get('p95_ms')
+
+    baseline = p95(steps[0]) if steps else None
+    for previous, step in zip(steps, steps[1:]):
+        if step['error_rate'] > max_error_rate:
+            return step['concurrency'], 'error rate'
+        if baseline and p95(step) and p95(step) > baseline * latency_factor:
+            return step['concurrency'], 'latensi p95'
+        if step['rps'] < previous['rps'] * (1 + min_gain):
+            return step['concurrency'], 'throughput tidak naik'
+    return None, None
+
+
+def print_step(result):
+    print(f"\n=== concurrency {result['concurrency']}  rate {result['rate'] or 'maks'}  "
+          f"{result['rps']} req/s  error {result['error_rate'] * 100:.2f}% ===")
+    print(f"{'endpoint':<22}{'n':>7}{'err':>6}{'p50':>10}{'p90':>10}{'p95':>10}{'p99':>10}{'max':>10}")
+    for kind, stats in result['endpoints'].items():
+        cells = [stats[key] if stats[key] is not None else '-' for key in
+                 ('p50_ms', 'p90_ms', 'p95_ms', 'p99_ms', 'max_ms')]
+        print(f"{kind:<22}{stats['requests']:>7}{stats['errors']:>6}" + ''.join(f"{cell:>10}" for cell in cells))
+
+
+def parse_mix(values):
+    mix = {}
+    for item in values:
+        kind, _, weight = item.partition('=')
+        if kind not in ('verify', 'logs', 'enroll'):
+            raise argparse.ArgumentTypeError(f"jenis request tidak dikenal: {kind}")
+        mix[kind] = float(weight or 1)
+    return mix
+
+
+def main():
+    global BASE_URL
+    parser = argparse.ArgumentParser(description="Load test endpoint face server")
+    parser.add_argument('--base-url', default=BASE_URL)
+    parser.add_argument('--images', help="folder gambar contoh (jpg/png), default frame sintetis")
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--ramp', type=int, nargs='+', help="daftar concurrency untuk mencari titik jenuh")
+    parser.add_argument('--rate', type=float, default=0, help="request per detik total, 0 = secepatnya")
+    parser.add_argument('--duration', type=float, default=30, help="detik per langkah")
+    parser.add_argument('--mix', nargs='+', default=['verify=85', 'logs=10', 'enroll=5'])
+    parser.add_argument('--enroll-images', type=int, default=3, help="gambar per burst enroll")
+    parser.add_argument('--usernames', nargs='+', help="username owner, default diambil dari /users/userowner/")
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--terminals', type=int, default=0,
+                        help="jumlah terminal simulasi untuk verify (jendela deteksi adaptif), 0 = tanpa id")
+    parser.add_argument('--json', help="simpan hasil ke file JSON")
+    args = parser.parse_args()
+
+    BASE_URL = args.base_url.rstrip('/')
+    mix = parse_mix(args.mix)
+    usernames = args.usernames or (get_owner_usernames() if 'logs' in mix or 'enroll' in mix else [])
+    try:
+        test = LoadTest(load_images(args.images), usernames, mix, args.enroll_images, args.timeout, args.terminals)
+    except ValueError as e:
+        parser.error(str(e))
+
+    steps = []
+    for concurrency in args.ramp or [args.concurrency]:
+        result = test.run(concurrency, args.duration, args.rate)
+        print_step(result)
+        steps.append(result)
+
+    report = {'base_url': BASE_URL, 'mix': mix, 'steps': steps}
+    if len(steps) > 1:
+        concurrency, reason = find_saturation(steps)
+        report['saturation'] = {'concurrency': concurrency, 'reason': reason}
+        if concurrency:
+            print(f"\nTitik jenuh di concurrency {concurrency} ({reason})")
+        else:
+            print("\nBelum jenuh pada concurrency yang diuji")
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(report, file, indent=2)
+        print(f"Hasil disimpan ke {args.json}")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n\nLoad test dihentikan oleh user")
@@ -1,15 +1,31 @@
 import requests
 import cv2
 import os
+import socket
 import time
 from datetime import datetime
 
 BASE_URL = "http://localhost:8000"
 TEMP_DIR = "temp_images"
+# Id terminal ini, dikirim ke server supaya jendela deteksi belajar dari kamera yang sama
+TERMINAL_ID = os.environ.get("TERMINAL_ID", socket.gethostname())
 
 # Pastikan direktori temporary ada
 os.makedirs(TEMP_DIR, exist_ok=True)
 
+# Respons GET terakhir per URL+params: (etag, last_modified, status, json)
+_response_cache = {}
+
+# Detektor wajah terminal: 'haar', 'lbp' (lebih cepat di CPU kecil) atau 'dnn' (YuNet ONNX),
+# sama dengan FACE_DETECTORS di server. Pilih lewat env FACE_DETECTOR.
+FACE_DETECTOR = os.environ.get("FACE_DETECTOR", "haar")
+FACE_DETECTORS = {
+    "haar": {"path": "haarcascade_frontalface_default.xml", "scale_factor": 1.1, "min_neighbors": 5, "min_size": 30},
+    "lbp": {"path": "lbpcascade_frontalface_improved.xml", "scale_factor": 1.1, "min_neighbors": 5, "min_size": 30},
+    "dnn": {"path": "face_detection_yunet_2023mar.onnx", "score_threshold": 0.8, "min_size": 30},
+}
+_face_detector = None
+
 def clear_screen():
     """Membersihkan layar terminal"""
     os.system('cls' if os.name == 'nt' else 'clear')
@@ -20,14 +36,38 @@ def print_header(title):
     print(f"  {title}")
     print("="*50 + "\n")
 
+def cached_get(url, params=None):
+    """
+    GET dengan revalidasi ETag/Last-Modified. Kalau server menjawab 304, isi respons
+    sebelumnya dipakai lagi tanpa server membangun ulang listing.
+    Mengembalikan (status_code, json).
+    """
+    key = (url, tuple(sorted((params or {}).items())))
+    cached = _response_cache.get(key)
+    headers = {}
+    if cached:
+        etag, last_modified, _, _ = cached
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+    response = requests.get(url, params=params, headers=headers)
+    if response.status_code == 304 and cached:
+        return cached[2], cached[3]
+    data = response.json()
+    if response.headers.get('ETag') or response.headers.get('Last-Modified'):
+        _response_cache[key] = (response.headers.get('ETag'), response.headers.get('Last-Modified'),
+                                response.status_code, data)
+    return response.status_code, data
+
 def get_all_owners():
     """Mengambil data semua owner dari API"""
     try:
-        response = requests.get(f"{BASE_URL}/users/userowner/")
-        if response.status_code == 200:
-            return response.json()
+        status_code, data = cached_get(f"{BASE_URL}/users/userowner/")
+        if status_code == 200:
+            return data
         else:
-            print(f"Error: Gagal mengambil data owner (Status: {response.status_code})")
+            print(f"Error: Gagal mengambil data owner (Status: {status_code})")
             return None
     except Exception as e:
         print(f"Error: {e}")
@@ -36,31 +76,57 @@ def get_all_owners():
 def check_user_images(username):
     """Cek apakah user sudah memiliki gambar training"""
     try:
-        response = requests.get(
+        return cached_get(
             f"{BASE_URL}/face/getuserimageexists/",
             params={"username": username}
         )
-        return response.status_code, response.json()
     except Exception as e:
         print(f"Error: {e}")
         return None, None
 
-def verify_face_with_haar(image_path):
-    """Verifikasi apakah ada wajah dalam gambar menggunakan Haar Cascade"""
-    try:
-        # Load Haar Cascade classifier
-        face_cascade = cv2.CascadeClassifier('haarcascade_frontalface_default.xml')
+def get_face_detector():
+    """Membuat detektor FACE_DETECTOR sekali saja, lalu dipakai ulang untuk semua frame"""
+    global _face_detector
+    if _face_detector is not None:
+        return _face_detector
+    config = FACE_DETECTORS[FACE_DETECTOR]
+    min_size = config["min_size"]
+    if FACE_DETECTOR == "dnn":
+        model = cv2.FaceDetectorYN.create(config["path"], "", (320, 320), config["score_threshold"], 0.3, 50)
+
+        def detect(frame):
+            height, width = frame.shape[:2]
+            model.setInputSize((width, height))
+            _, faces = model.detect(frame)
+            if faces is None:
+                return []
+            return [tuple(int(v) for v in face[:4]) for face in faces if face[2] >= min_size and face[3] >= min_size]
+    else:
+        cascade = cv2.CascadeClassifier(config["path"])
+        if cascade.empty():
+            raise RuntimeError(f"File cascade {config['path']} tidak ditemukan")
 
+        def detect(frame):
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            return cascade.detectMultiScale(gray, scaleFactor=config["scale_factor"],
+                                            minNeighbors=config["min_neighbors"], minSize=(min_size, min_size))
+    _face_detector = detect
+    return detect
+
+def detect_faces(frame):
+    """Deteksi wajah pada frame BGR dengan detektor terpilih, hasilnya daftar (x, y, w, h)"""
+    return get_face_detector()(frame)
+
+def verify_face(image_path):
+    """Verifikasi apakah ada wajah dalam gambar menggunakan detektor terpilih"""
+    try:
         # Baca gambar
         img = cv2.imread(image_path)
         if img is None:
             return False
 
-        # Convert ke grayscale
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-
         # Deteksi wajah
-        faces = face_cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(30, 30))
+        faces = detect_faces(img)
 
         return len(faces) > 0
     except Exception as e:
@@ -79,8 +145,8 @@ def auto_capture_images(username, num_images):
         print("❌ Tidak ada kamera yang bisa dibuka. Periksa device /dev/video*.")
         exit()
     cv2.namedWindow('Kamera', cv2.WINDOW_NORMAL)
-    # Load Haar Cascade
-    face_cascade = cv2.CascadeClassifier('haarcascade_frontalface_default.xml')
+    # Load detektor wajah (sekali, dipakai ulang)
+    get_face_detector()
 
     verified_images = []
     user_temp_dir = os.path.join(TEMP_DIR, username)
@@ -102,9 +168,8 @@ def auto_capture_images(username, num_images):
 
         frame_count += 1
 
-        # Deteksi wajah untuk preview
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        faces = face_cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(30, 30))
+        # Deteksi wajah hanya dijalankan pada frame yang akan diambil (lihat di bawah),
+        # frame lain cukup ditampilkan sebagai preview
 
         # Gambar rectangle pada wajah yang terdeteksi
         # for (x, y, w, h) in faces:
@@ -121,7 +186,7 @@ def auto_capture_images(username, num_images):
         cv2.imshow('Auto Capture Images', frame)
 
         # Ambil gambar otomatis setiap interval tertentu
-        if frame_count >= capture_interval and len(faces) > 0:
+        if frame_count >= capture_interval and len(detect_faces(frame)) > 0:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
             filename = f"{username}_{captured_count+1}_{timestamp}.jpg"
             filepath = os.path.join(user_temp_dir, filename)
@@ -130,7 +195,7 @@ def auto_capture_images(username, num_images):
             captured_count += 1
 
             # Verifikasi wajah
-            if verify_face_with_haar(filepath):
+            if verify_face(filepath):
                 verified_images.append(filepath)
                 print(f"✓ Gambar {len(verified_images)} berhasil diambil dan diverifikasi (Total captured: {captured_count})")
             else:
@@ -442,8 +507,8 @@ def capture_single_image_with_verification(max_attempts=10):
 
     cv2.namedWindow('Face Verification', cv2.WINDOW_NORMAL)
 
-    # Load Haar Cascade
-    face_cascade = cv2.CascadeClassifier('haarcascade_frontalface_default.xml')
+    # Load detektor wajah (sekali, dipakai ulang)
+    get_face_detector()
 
     log_temp_dir = os.path.join(TEMP_DIR, "face_log")
     os.makedirs(log_temp_dir, exist_ok=True)
@@ -469,10 +534,7 @@ def capture_single_image_with_verification(max_attempts=10):
 
             frame_count += 1
 
-            # Deteksi wajah untuk preview
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            faces = face_cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(30, 30))
-
+            # Frame stabilisasi hanya ditampilkan, deteksi dilakukan pada gambar yang diambil
             # Gambar rectangle pada wajah yang terdeteksi
             # for (x, y, w, h) in faces:
             #     cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
@@ -510,7 +572,7 @@ def capture_single_image_with_verification(max_attempts=10):
         print(f"📸 Gambar diambil: {filename}")
 
         # Verifikasi wajah
-        if verify_face_with_haar(filepath):
+        if verify_face(filepath):
             verified_image = filepath
             print(f"✓ Wajah terdeteksi! Gambar terverifikasi.")
         else:
@@ -541,7 +603,8 @@ def send_face_log_to_server(image_path):
         print("\n⏳ Mengirim gambar ke server untuk verifikasi...")
         response = requests.post(
             f"{BASE_URL}/face/createlogusersmartnew/",
-            files=files
+            files=files,
+            headers={"X-Terminal-Id": TERMINAL_ID}
         )
 
         # Tutup file
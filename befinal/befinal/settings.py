@@ -10,7 +10,9 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -52,6 +54,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'facerecognition.profiling.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'befinal.urls'
@@ -77,21 +80,46 @@ WSGI_APPLICATION = 'befinal.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 # kalau ini aku memakai mysql silahkan ganti ke db lain
-DATABASES = {
-    'default': {
-        "ENGINE": "django.db.backends.mysql",
-        "NAME": "be_dosen_final",
-        "USER":"root",
-        "PASSWORD":"rootpassword",
-        "HOST":"127.0.0.1",
-        "PORT":'3306',
-        "OPTIONS":{
-            "init_command": "SET sql_mode='STRICT_TRANS_TABLES', innodb_strict_mode=1",
-            "charset": "utf8mb4",
-            "autocommit": True,
+# Koneksi database diatur lewat environment. DB_ENGINE=sqlite untuk test lokal,
+# DB_POOL=1 memakai pool dj_db_conn_pool (pip install django-db-connection-pool[mysql]).
+DB_ENGINE=os.environ.get('DB_ENGINE','mysql')
+DB_POOL=os.environ.get('DB_POOL','0')=='1'
+if DB_ENGINE=='sqlite':
+    DATABASES = {
+        'default': {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": os.environ.get('DB_NAME',BASE_DIR / 'db.sqlite3'),
         }
     }
-}
+elif DB_ENGINE=='mysql':
+    DATABASES = {
+        'default': {
+            "ENGINE": "dj_db_conn_pool.backends.mysql" if DB_POOL else "django.db.backends.mysql",
+            "NAME": os.environ.get('DB_NAME','be_dosen_final'),
+            "USER":os.environ.get('DB_USER','root'),
+            "PASSWORD":os.environ.get('DB_PASSWORD','rootpassword'),
+            "HOST":os.environ.get('DB_HOST','127.0.0.1'),
+            "PORT":os.environ.get('DB_PORT','3306'),
+            "OPTIONS":{
+                "init_command": "SET sql_mode='STRICT_TRANS_TABLES', innodb_strict_mode=1",
+                "charset": "utf8mb4",
+                "autocommit": True,
+            }
+        }
+    }
+    if DB_POOL:
+        DATABASES['default']['POOL_OPTIONS']={
+            'POOL_SIZE':int(os.environ.get('DB_POOL_SIZE','10')),
+            'MAX_OVERFLOW':int(os.environ.get('DB_POOL_MAX_OVERFLOW','10')),
+            'RECYCLE':int(os.environ.get('DB_POOL_RECYCLE','3600')),
+            'PRE_PING':True,
+        }
+else:
+    raise ImproperlyConfigured(f"DB_ENGINE harus 'mysql' atau 'sqlite', bukan {DB_ENGINE!r}")
+# Koneksi persisten: dipakai ulang antar request selama DB_CONN_MAX_AGE detik dan dicek dulu
+# sebelum dipakai. Dengan pool, koneksi dikembalikan ke pool tiap akhir request (max age 0).
+DATABASES['default']['CONN_MAX_AGE']=0 if DB_POOL else int(os.environ.get('DB_CONN_MAX_AGE','60'))
+DATABASES['default']['CONN_HEALTH_CHECKS']=os.environ.get('DB_CONN_HEALTH_CHECKS','1')=='1'
 
 
 # Password validation
@@ -139,4 +167,141 @@ CONS_ALLOW_CREDENTIALS=True
 MEDIA_ROOT=BASE_DIR / 'media'
 MEDIA_URL='/media/'
 ALLOWED_HOSTS=['*']
-AUTH_USER_MODEL='users.User'
\ No newline at end of file
+AUTH_USER_MODEL='users.User'
+
+# Backend pengenal wajah: 'lbph' (cv2.face) atau 'vector' (NumPy, format model sama)
+FACE_RECOGNIZER_BACKEND='lbph'
+# backend 'vector': bandingkan query hanya dengan histogram top-K user terdekat (0 = exhaustive)
+FACE_RECOGNIZER_TOP_K=5
+# file model, akhiran .lbph memakai format biner (memmap) dari facerecognition.modelstore,
+# akhiran .shards memakai satu shard per face_id + manifest
+FACE_MODEL_PATH=os.path.join('hasiltraining','lbph_model.xml')
+FACE_MODEL_DTYPE='float32'
+
+# Bulk ingest log akses dari terminal
+FACE_BULK_MAX_RECORDS=500
+FACE_BULK_WRITE_WORKERS=4
+# Batas upload: enroll di-stream ke FACE_UPLOAD_TEMP_DIR (harus satu filesystem dengan MEDIA_ROOT
+# supaya penyimpanan akhir cukup rename, None = MEDIA_ROOT/uploading), frame verifikasi di memori
+FACE_UPLOAD_TEMP_DIR=None
+FACE_UPLOAD_MAX_FILE_SIZE=10*1024*1024
+FACE_UPLOAD_MAX_REQUEST_SIZE=100*1024*1024
+FACE_UPLOAD_MAX_FILES=50
+FACE_VERIFY_MAX_FRAME_SIZE=5*1024*1024
+
+# Turunan gambar training (facerecognition/preprocess.py): grayscale, sisi terpanjang dibatasi,
+# disimpan di <folder user>/normalized/ dan dipakai training menggantikan file asli
+FACE_NORMALIZED_DIR='normalized'
+FACE_NORMALIZED_MAX_SIDE=640
+FACE_NORMALIZED_EQUALIZE=False
+# Detektor wajah (facerecognition/detectors.py): 'haar', 'lbp' (LBP cascade, lebih cepat) atau
+# 'dnn' (YuNet ONNX via cv2.FaceDetectorYN). min_size berlaku untuk pengenalan, training memakai
+# semua ukuran wajah. Bandingkan kecepatan dan detection rate dengan `manage.py benchdetector`.
+# lbpcascade_frontalface_improved.xml: opencv/data/lbpcascades, face_detection_yunet_2023mar.onnx:
+# opencv_zoo/models/face_detection_yunet, letakkan di hasiltraining/. Entri tambahan dengan kunci
+# 'type' (misal {'type':'haar','scale_factor':1.3,...}) bisa dipakai untuk varian parameter.
+FACE_DETECTOR='haar'
+FACE_DETECTORS={
+    'haar':{'path':os.path.join('hasiltraining','haarcascade_frontalface_default.xml'),
+            'scale_factor':1.2,'min_neighbors':5,'min_size':50},
+    'lbp':{'path':os.path.join('hasiltraining','lbpcascade_frontalface_improved.xml'),
+           'scale_factor':1.2,'min_neighbors':5,'min_size':50},
+    'dnn':{'path':os.path.join('hasiltraining','face_detection_yunet_2023mar.onnx'),
+           'score_threshold':0.8,'nms_threshold':0.3,'top_k':50,'min_size':50},
+}
+
+# Jendela deteksi adaptif per terminal (facerecognition/detectwindow.py): setelah
+# FACE_ADAPTIVE_MIN_SAMPLES wajah, deteksi dibatasi ke ROI dan rentang ukuran wajah terminal itu.
+FACE_TERMINAL_HEADER='X-Terminal-Id'
+FACE_ADAPTIVE_WINDOW=True
+FACE_ADAPTIVE_HISTORY=50
+FACE_ADAPTIVE_MIN_SAMPLES=10
+FACE_ADAPTIVE_MARGIN=0.25
+FACE_ADAPTIVE_TIMEOUT=24*60*60
+# Mode track-then-detect (facerecognition/tracking.py) untuk terminal yang mengirim frame beruntun
+# dengan X-Terminal-Id: deteksi penuh tiap FACE_TRACK_DETECT_INTERVAL frame atau saat track hilang
+# (skor template matching < FACE_TRACK_MIN_SCORE), predict di-cache per track.
+FACE_TRACKING_ENABLED=False
+FACE_TRACK_DETECT_INTERVAL=5
+FACE_TRACK_MIN_SCORE=0.6
+FACE_TRACK_SEARCH_MARGIN=0.5
+FACE_TRACK_TEMPLATE_SIZE=32
+FACE_TRACK_MATCH_IOU=0.3
+FACE_TRACK_REPREDICT_INTERVAL=15
+FACE_TRACK_IDLE_SECONDS=30
+FACE_TRACK_MAX_TERMINALS=256
+# Predict paralel untuk frame dengan beberapa wajah (facerecognition/parallel.py). Thread OpenCV
+# dibatasi FACE_CV_THREADS, None = jumlah core / FACE_PREDICT_WORKERS supaya tidak oversubscribe.
+FACE_PREDICT_WORKERS=4
+FACE_CV_THREADS=None
+# Cache hasil pengenalan untuk frame yang dikirim ulang terminal yang sama (facerecognition/framecache.py):
+# sha256 frame sama, berlaku FACE_FRAME_CACHE_TTL detik. TTL 0 mematikan cache. Log akses tetap ditulis.
+# FACE_FRAME_CACHE_MAX_DISTANCE (mis. 3) ikut memakai ulang prediksi crop wajah yang dHash-nya berbeda
+# <= sekian bit; None = mati, karena wajah orang lain bisa punya dHash yang dekat.
+FACE_FRAME_CACHE_TTL=5
+FACE_FRAME_CACHE_SIZE=256
+FACE_FRAME_CACHE_MAX_DISTANCE=None
+# Debounce event akses createlogusersmartnew/ (facerecognition/debounce.py): face_id + status yang sama
+# dalam FACE_DEBOUNCE_SECONDS sejak terakhir terlihat menambah hit_count baris lama, 0 = selalu insert.
+FACE_DEBOUNCE_SECONDS=10
+# Write-behind log akses createlogusersmartnew/ (facerecognition/writebehind.py): respons langsung dikirim,
+# baris + JPEG ditulis thread writer per batch. Event yang belum tertulis disimpan di FACE_WRITE_BEHIND_SPILL_DIR,
+# sisa setelah crash ditulis dengan `manage.py flushwritebehind`.
+FACE_WRITE_BEHIND=False
+FACE_WRITE_BEHIND_QUEUE_SIZE=1000
+FACE_WRITE_BEHIND_BATCH=100
+FACE_WRITE_BEHIND_INTERVAL=0.5
+FACE_WRITE_BEHIND_SHUTDOWN_TIMEOUT=10
+FACE_WRITE_BEHIND_SPILL_DIR=os.path.join('hasiltraining','writebehind')
+# Gambar log akses dipartisi tracking/YYYY/MM/DD/<prefix hash>/ (facerecognition/logstorage.py).
+# File lama dipindah dengan `manage.py migratetrackinglayout`, partisi lama diarsip/dihapus per hari
+# dengan `manage.py trackingretention` (default FACE_TRACKING_RETENTION_DAYS, None = tidak ada default).
+FACE_TRACKING_HASH_CHARS=2
+FACE_TRACKING_RETENTION_DAYS=None
+FACE_TRACKING_ARCHIVE_DIR=os.path.join('hasiltraining','archive')
+
+# Profil model LBPH (facerecognition/profiles.py): parameter histogram + ukuran crop wajah
+# (crop_size x crop_size sebelum LBPH, 0 = ukuran crop asli). Profil dicatat di metadata model,
+# FACE_MODEL_PROFILE hanya dipakai untuk file model baru. Bandingkan dengan `manage.py compareprofiles`.
+# accept_threshold: jarak chi-square di bawah nilai ini dianggap Authorized. Skala jarak ikut jumlah sel
+# grid dan radius, jadi tiap profil punya ambang sendiri; balanced memakai ambang lama 50, profil lain
+# disetel dengan rasio median_distance compareprofiles terhadap balanced.
+FACE_MODEL_PROFILES={
+    'fast':{'radius':1,'neighbors':8,'grid_x':4,'grid_y':4,'crop_size':64,'accept_threshold':12},
+    'balanced':{'radius':1,'neighbors':8,'grid_x':8,'grid_y':8,'crop_size':128,'accept_threshold':50},
+    'accurate':{'radius':2,'neighbors':8,'grid_x':10,'grid_y':10,'crop_size':160,'accept_threshold':95},
+}
+FACE_MODEL_PROFILE='balanced'
+FACE_CANONICAL_EQUALIZE=False
+
+# Cache respons listing (users/caching.py). LocMem per proses, untuk beberapa worker
+# arahkan CACHE_BACKEND/CACHE_LOCATION ke Redis atau Memcached supaya invalidasi terbagi.
+CACHES={
+    'default':{
+        'BACKEND':os.environ.get('CACHE_BACKEND','django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION':os.environ.get('CACHE_LOCATION','befinal'),
+    }
+}
+RESPONSE_CACHE_TIMEOUT=300
+
+# Profiling cProfile per request view facerecognition (lihat facerecognition/profiling.py),
+# request diprofile kalau terpilih sampling atau membawa header X-Face-Profile: 1
+FACE_PROFILING_ENABLED=False
+FACE_PROFILING_SAMPLE_RATE=0.0
+FACE_PROFILING_HEADER='X-Face-Profile'
+FACE_PROFILING_DIR=os.path.join('hasiltraining','profiles')
+
+# Log pipeline wajah lewat logging (bukan print), level bisa dinaikkan ke WARNING saat beban tinggi
+LOGGING={
+    'version':1,
+    'disable_existing_loggers':False,
+    'handlers':{
+        'console':{'class':'logging.StreamHandler'},
+    },
+    'loggers':{
+        'facerecognition':{
+            'handlers':['console'],
+            'level':os.environ.get('FACE_LOG_LEVEL','INFO'),
+        },
+    },
+}
@@ -0,0 +1,15 @@
+"""
+Settings untuk `manage.py benchface`: database SQLite lokal dan log pipeline
+dinaikkan ke WARNING supaya output log tidak ikut terukur.
+
+    DJANGO_SETTINGS_MODULE=befinal.settings_bench python manage.py benchface
+"""
+from .settings import *
+
+DATABASES={
+    'default':{
+        'ENGINE':'django.db.backends.sqlite3',
+        'NAME':BASE_DIR / 'bench.sqlite3',
+    }
+}
+LOGGING['loggers']['facerecognition']['level']='WARNING'
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class FacerecognitionConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'facerecognition'
+
+    def ready(self):
+        # sinkronisasi model wajah saat owner dihapus / berganti role
+        from . import signals  # noqa: F401
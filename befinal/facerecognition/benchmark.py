@@ -0,0 +1,444 @@
+"""
+Benchmark pipeline wajah dengan data sintetis, dipakai oleh `manage.py benchface`.
+
+Semua kasus memakai seed tetap sehingga hasil dua commit bisa dibandingkan langsung
+dari file JSON-nya. Pekerjaan (model, gambar training, log) dilakukan di direktori
+sementara, model dan media asli tidak disentuh.
+"""
+import os
+import platform
+import subprocess
+import time
+from contextlib import contextmanager
+import numpy as np
+import cv2
+from django.conf import settings
+
+
+def synthetic_face(seed, size=100):
+    """Wajah sintetis sederhana (oval, mata, hidung, mulut) + noise, cukup untuk LBPH."""
+    rng = np.random.default_rng(seed)
+    img = np.full((size, size), int(rng.integers(30, 60)), np.uint8)
+    c = size // 2
+    cv2.ellipse(img, (c, c), (int(size * 0.32), int(size * 0.42)), 0, 0, 360, int(rng.integers(170, 220)), -1)
+    eye_y, eye_x = int(c - size * 0.1), int(size * (0.11 + rng.random() * 0.04))
+    for side in (-1, 1):
+        cv2.ellipse(img, (c + side * eye_x, eye_y), (int(size * 0.07), int(size * 0.035)), 0, 0, 360,
+                    int(rng.integers(20, 60)), -1)
+    cv2.line(img, (c, eye_y + 5), (c, c + int(size * 0.1)), 120, 2)
+    cv2.ellipse(img, (c, c + int(size * 0.22)), (int(size * 0.1), int(size * 0.03)), 0, 0, 360,
+                int(rng.integers(40, 90)), -1)
+    noise = rng.normal(0, 6, img.shape)
+    return np.clip(cv2.GaussianBlur(img, (5, 5), 0) + noise, 0, 255).astype(np.uint8)
+
+
+def synthetic_gallery(users=10, per_user=5, size=100):
+    """Galeri per user: variasi kecil dari wajah dasar masing-masing user."""
+    faces, labels = [], []
+    for user in range(users):
+        base = synthetic_face(user, size)
+        rng = np.random.default_rng(1000 + user)
+        for _ in range(per_user):
+            noisy = base.astype(np.float32) + rng.normal(0, 4, base.shape)
+            faces.append(np.clip(noisy, 0, 255).astype(np.uint8))
+            labels.append(100 + user)
+    return faces, labels
+
+
+def synthetic_frame(height, width, faces=1, seed=0):
+    """Frame BGR berisi `faces` wajah sintetis berjajar, ukuran wajah menyesuaikan frame."""
+    rng = np.random.default_rng(seed)
+    frame = np.full((height, width), 128, np.uint8)
+    frame += rng.integers(0, 8, frame.shape, dtype=np.uint8)
+    size = int(min(height * 0.6, width / (faces + 0.5)))
+    gap = (width - faces * size) // (faces + 1)
+    top = (height - size) // 2
+    for index in range(faces):
+        left = gap + index * (size + gap)
+        frame[top:top + size, left:left + size] = synthetic_face(seed + index, size)
+    return cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+
+
+def random_boxes(count, seed=0, width=1280, height=720):
+    rng = np.random.default_rng(seed)
+    sizes = rng.integers(50, 200, count)
+    xs = rng.integers(0, width - 200, count)
+    ys = rng.integers(0, height - 200, count)
+    return np.stack([xs, ys, sizes, sizes], axis=1).astype(np.int32)
+
+
+def summarize(samples, unit_count=1):
+    """p50/p95/mean dalam milidetik plus throughput (unit per detik)."""
+    samples = np.asarray(samples, dtype=np.float64)
+    total = float(samples.sum())
+    return {
+        'runs': int(len(samples)),
+        'p50_ms': round(float(np.percentile(samples, 50)) * 1000, 4),
+        'p95_ms': round(float(np.percentile(samples, 95)) * 1000, 4),
+        'mean_ms': round(float(samples.mean()) * 1000, 4),
+        'throughput_per_s': round(len(samples) * unit_count / total, 2) if total else None,
+    }
+
+
+def measure(func, repeat, warmup=1):
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+@contextmanager
+def working_directory(path):
+    """Pipeline training memakai path relatif (hasiltraining/, <user>_trained_images.log)."""
+    previous = os.getcwd()
+    os.makedirs(os.path.join(path, 'hasiltraining'), exist_ok=True)
+    os.chdir(path)
+    try:
+        yield path
+    finally:
+        os.chdir(previous)
+
+
+def build_model(model_path, users, per_user, backend=None, face_ids=None):
+    """Melatih model galeri sintetis, label default 100+i atau face_id owner yang diberikan."""
+    from .recognizer import get_recognizer
+    faces, labels = synthetic_gallery(users=users, per_user=per_user)
+    if face_ids is not None:
+        labels = [int(face_ids[label - 100]) for label in labels]
+    recognizer = get_recognizer(backend)
+    recognizer.train(faces, labels)
+    recognizer.save(model_path)
+    return {label: f"user_{label}" for label in sorted(set(labels))}
+
+
+def bench_nms(box_counts, repeat):
+    from .views import non_max_suppression_fast
+    results = []
+    for count in box_counts:
+        boxes = random_boxes(count, seed=count)
+        samples = measure(lambda: non_max_suppression_fast(boxes, overlapThresh=0.3), repeat)
+        results.append(dict(boxes=count, **summarize(samples)))
+    return results
+
+
+def bench_model_load(model_path, repeat, backend=None):
+    from .recognizer import get_recognizer
+    return summarize(measure(lambda: get_recognizer(backend).read(model_path), repeat))
+
+
+def bench_recognize(model_path, label_to_user, frame_sizes, faces_per_frame, repeat, predict_workers=None):
+    """
+    predict_workers: daftar nilai FACE_PREDICT_WORKERS yang dibandingkan (None = setting aktif),
+    untuk melihat apakah frame dengan banyak wajah mendekati waktu frame satu wajah.
+    """
+    from django.test import override_settings
+    from . import parallel
+    from .views import recognize_from_image
+    results = []
+    for workers in predict_workers or [None]:
+        parallel.shutdown()
+        extra = {} if workers is None else {'predict_workers': workers}
+        overrides = {} if workers is None else {'FACE_PREDICT_WORKERS': workers}
+        with override_settings(**overrides):
+            for height, width in frame_sizes:
+                for faces in faces_per_frame:
+                    frame = synthetic_frame(height, width, faces, seed=faces)
+                    # recognize_from_image menggambar kotak ke frame, jadi pakai salinan tiap run
+                    found = len(recognize_from_image(frame.copy(), model_path, label_to_user))
+                    samples = measure(lambda: recognize_from_image(frame.copy(), model_path, label_to_user), repeat)
+                    results.append(dict(frame=f"{width}x{height}", faces=faces, **extra, recognized=found,
+                                        **summarize(samples)))
+        parallel.shutdown()
+    return results
+
+
+def bench_training(model_path, images, repeat):
+    """Biaya training per gambar lewat train_or_update_user_data (deteksi + update + simpan)."""
+    from .views import train_or_update_user_data
+    training_dir = 'imagetraining'
+    samples = []
+    for run in range(repeat):
+        user = f"benchuser{run}"
+        user_dir = os.path.join(training_dir, user)
+        os.makedirs(user_dir, exist_ok=True)
+        for index in range(images):
+            frame = synthetic_frame(480, 640, 1, seed=run * 1000 + index)
+            cv2.imwrite(os.path.join(user_dir, f"{index}.jpg"), frame)
+        start = time.perf_counter()
+        train_or_update_user_data(training_dir, model_path, user, 900000 + run)
+        samples.append((time.perf_counter() - start) / images)
+    return dict(images_per_run=images, **summarize(samples))
+
+
+def create_owners(count):
+    from users.models import User
+    return [
+        User.objects.create_user(username=f"bench{index}", email=f"bench{index}@example.com", password='bench',
+                                 role=User.Role.OWNER, first_name='Bench', last_name=str(index))
+        for index in range(count)
+    ]
+
+
+def bench_endpoint(client, frame_size, faces, repeat):
+    """Latensi end-to-end createlogusersmartnew/ (decode, deteksi, predict, tulis crop dan log)."""
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    height, width = frame_size
+    ok, buffer = cv2.imencode('.jpg', synthetic_frame(height, width, faces, seed=faces))
+    payload = buffer.tobytes()
+    statuses = []
+
+    def post():
+        response = client.post('/face/createlogusersmartnew/', {'image': SimpleUploadedFile('frame.jpg', payload)})
+        statuses.append(response.status_code)
+
+    samples = measure(post, repeat)
+    return dict(frame=f"{width}x{height}", faces=faces,
+                errors=sum(1 for code in statuses if code >= 400), **summarize(samples))
+
+
+def synthetic_samples(users, per_user, probes, seed=0):
+    """
+    Galeri dan probe sintetis sebagai (gambar, box, label). Tiap sampel adalah wajah dasar
+    user dengan ukuran, rotasi, pergeseran dan kecerahan berbeda, jadi resize crop ikut diuji.
+    """
+    gallery, probe_set = [], []
+    for user in range(users):
+        rng = np.random.default_rng(seed * 7919 + user)
+        # wajah dasar + tekstur khas user (bercak acak), supaya antar user bisa dibedakan LBP
+        base = synthetic_face(user, 256)
+        for _ in range(24):
+            center = (int(rng.integers(60, 196)), int(rng.integers(40, 216)))
+            axes = (int(rng.integers(3, 12)), int(rng.integers(3, 12)))
+            cv2.ellipse(base, center, axes, float(rng.uniform(0, 180)), 0, 360, int(rng.integers(40, 240)), -1)
+        for index in range(per_user + probes):
+            size = int(rng.integers(80, 220))
+            matrix = cv2.getRotationMatrix2D((128, 128), rng.uniform(-4, 4), size / 256)
+            matrix[:, 2] += rng.uniform(-0.02, 0.02, 2) * size - (256 - size) / 2
+            face = cv2.warpAffine(base, matrix, (size, size), flags=cv2.INTER_AREA, borderMode=cv2.BORDER_REPLICATE)
+            face = np.clip(face * rng.uniform(0.9, 1.1) + rng.normal(0, 4, face.shape), 0, 255).astype(np.uint8)
+            (gallery if index < per_user else probe_set).append((face, (0, 0, size, size), 100 + user))
+    return gallery, probe_set
+
+
+def gallery_samples(directory, probes=1):
+    """
+    Galeri nyata berlayout imagetraining/<user>/*.jpg. Wajah terbesar tiap gambar dideteksi
+    dengan detektor aktif, `probes` sampel terakhir tiap user dipisahkan sebagai probe.
+    """
+    from . import detectors, preprocess
+    detector = detectors.get_detector()
+    gallery, probe_set = [], []
+    users = sorted(name for name in os.listdir(directory) if os.path.isdir(os.path.join(directory, name)))
+    for label, user in enumerate(users):
+        samples = []
+        for name in sorted(os.listdir(os.path.join(directory, user))):
+            if not name.endswith(("jpg", "jpeg", "png")):
+                continue
+            gray = preprocess.normalize_image(preprocess.read_gray(os.path.join(directory, user, name)))
+            boxes = detector.detect(gray, min_size=0)
+            if len(boxes):
+                samples.append((gray, tuple(max(boxes, key=lambda box: box[2] * box[3])), label))
+        if len(samples) > probes:
+            gallery.extend(samples[:-probes])
+            probe_set.extend(samples[-probes:])
+    return gallery, probe_set
+
+
+def model_bytes(path):
+    """Ukuran model di disk: file XML, .lbph + .labels, atau isi direktori .shards."""
+    from . import modelstore
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+    return sum(os.path.getsize(name) for name in modelstore.store_files(path) if os.path.exists(name))
+
+
+def bench_profile(name, gallery, probes, model_path, repeat, backend=None):
+    """
+    Melatih satu profil pada galeri, lalu mengukur ukuran model, waktu load, latensi predict
+    per wajah (termasuk resize crop, seperti recognize_from_image) dan akurasi pada probe.
+    """
+    from . import preprocess, profiles
+    from .recognizer import get_recognizer
+    profile = profiles.get_profile(name)
+    faces = [preprocess.prepare_face(image, box, copy=True, size=profile['crop_size']) for image, box, _ in gallery]
+    recognizer = get_recognizer(backend, profile=profile)
+    start = time.perf_counter()
+    recognizer.train(faces, [label for _, _, label in gallery])
+    train_seconds = time.perf_counter() - start
+    recognizer.save(model_path)
+
+    load = summarize(measure(lambda: get_recognizer(backend).read(model_path), repeat))
+    loaded = get_recognizer(backend)
+    loaded.read(model_path)
+    predictions, samples = [], []
+    for run in range(repeat + 1):
+        for image, box, _ in probes:
+            start = time.perf_counter()
+            prediction = loaded.predict(preprocess.prepare_face(image, box, size=loaded.crop_size))
+            elapsed = time.perf_counter() - start
+            if run == 0:
+                predictions.append(prediction)  # run pertama sebagai warmup
+            else:
+                samples.append(elapsed)
+    predict = summarize(samples)
+    truth = [label for _, _, label in probes]
+    correct = [int(label) == expected for (label, _), expected in zip(predictions, truth)]
+    distances = [distance for _, distance in predictions]
+    return {
+        'profile': name,
+        'radius': profile['radius'],
+        'neighbors': profile['neighbors'],
+        'grid': f"{profile['grid_x']}x{profile['grid_y']}",
+        'crop_size': loaded.crop_size,
+        'dimension': (2 ** profile['neighbors']) * profile['grid_x'] * profile['grid_y'],
+        'model_bytes': model_bytes(model_path),
+        'train_ms': round(train_seconds * 1000, 2),
+        'load_p50_ms': load['p50_ms'],
+        'load_p95_ms': load['p95_ms'],
+        'predict_p50_ms': predict['p50_ms'],
+        'predict_p95_ms': predict['p95_ms'],
+        'accuracy': round(sum(correct) / len(correct), 4) if correct else None,
+        'accept_threshold': loaded.accept_threshold,
+        # porsi probe yang benar dan lolos ambang profilnya, seperti keputusan recognize_from_image
+        'authorized_rate': round(sum(ok and distance < loaded.accept_threshold
+                                     for ok, distance in zip(correct, distances)) / len(correct), 4) if correct else None,
+        'median_distance': round(float(np.median(distances)), 2) if distances else None,
+    }
+
+
+def detector_images(directory=None, limit=200):
+    """
+    Gambar untuk benchmark detektor sebagai (gray, bgr, jumlah wajah). Tanpa `directory`
+    dipakai frame sintetis berbagai ukuran dengan jumlah wajah yang diketahui, dengan
+    `directory` (dibaca rekursif, misal media/imagetraining) jumlah wajahnya None.
+    """
+    from . import preprocess
+    images = []
+    if directory is None:
+        for height, width in ((480, 640), (720, 1280)):
+            for faces in (1, 2, 3):
+                for seed in range(5):
+                    frame = synthetic_frame(height, width, faces, seed=seed * 10 + faces)
+                    images.append((cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), frame, faces))
+        return images[:limit]
+    for root, _, names in sorted(os.walk(directory)):
+        if os.path.basename(root) == settings.FACE_NORMALIZED_DIR:
+            continue
+        for name in sorted(names):
+            if len(images) >= limit:
+                return images
+            if name.lower().endswith(("jpg", "jpeg", "png")):
+                frame = cv2.imread(os.path.join(root, name))
+                if frame is not None:
+                    gray = preprocess.normalize_image(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+                    images.append((gray, cv2.resize(frame, gray.shape[::-1]), None))
+    return images
+
+
+def bench_detector(name, images, repeat):
+    """ms/frame dan detection rate satu detektor (FACE_DETECTORS[name]) pada set gambar yang sama."""
+    from . import detectors
+    try:
+        detector = detectors.create_detector(name)
+    except (OSError, ValueError, cv2.error) as e:
+        return {'detector': name, 'skipped': str(e)}
+    counts = [len(detector.detect(gray, color=color)) for gray, color, _ in images]
+    samples = []
+    for _ in range(repeat):
+        for gray, color, _ in images:
+            start = time.perf_counter()
+            detector.detect(gray, color=color)
+            samples.append(time.perf_counter() - start)
+    known = [(found, expected) for found, (_, _, expected) in zip(counts, images) if expected]
+    return dict(
+        detector=name,
+        images=len(images),
+        detection_rate=round(sum(1 for found in counts if found) / len(images), 4),
+        faces_per_image=round(sum(counts) / len(images), 3),
+        # hanya untuk gambar dengan jumlah wajah diketahui (frame sintetis)
+        recall=round(sum(min(found, expected) for found, expected in known)
+                     / sum(expected for _, expected in known), 4) if known else None,
+        **summarize(samples),
+    )
+
+
+def bench_db_connection(repeat, conn_max_age, health_checks=False, alias='default'):
+    """
+    Overhead koneksi per request: siklus request_started -> query ala Createlogusersmartnew ->
+    request_finished, dengan CONN_MAX_AGE tertentu. Mengembalikan statistik + jumlah koneksi baru.
+    """
+    from django.core.signals import request_finished, request_started
+    from django.db import connections
+    from django.db.backends.signals import connection_created
+    from users.models import User
+
+    connection = connections[alias]
+    opened = []
+
+    def count(sender, connection, **kwargs):
+        if connection.alias == alias:
+            opened.append(1)
+
+    def cycle():
+        request_started.send(sender=None)
+        try:
+            list(User.objects.filter(face_id__isnull=False).values_list('face_id', 'first_name', 'last_name'))
+            User.objects.filter(role=User.Role.OWNER).exists()
+        finally:
+            request_finished.send(sender=None)
+
+    original = (connection.settings_dict['CONN_MAX_AGE'], connection.settings_dict['CONN_HEALTH_CHECKS'])
+    connection.settings_dict['CONN_MAX_AGE'] = conn_max_age
+    connection.settings_dict['CONN_HEALTH_CHECKS'] = health_checks
+    connection.close()
+    connection_created.connect(count)
+    try:
+        samples = measure(cycle, repeat)
+    finally:
+        connection_created.disconnect(count)
+        connection.settings_dict['CONN_MAX_AGE'], connection.settings_dict['CONN_HEALTH_CHECKS'] = original
+        connection.close()
+    return dict(conn_max_age=conn_max_age, health_checks=health_checks,
+                connections_opened=len(opened), **summarize(samples))
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=settings.BASE_DIR, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'opencv': cv2.__version__,
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def compare(baseline, current, threshold=0.1):
+    """
+    Membandingkan p50 kasus yang sama pada dua hasil benchmark.
+    Mengembalikan daftar (nama kasus, p50 lama, p50 baru, rasio, regresi?).
+    """
+    def flatten(report):
+        cases = {}
+        for section, value in report['results'].items():
+            for item in value if isinstance(value, list) else [value]:
+                key = ' '.join(f"{k}={v}" for k, v in item.items()
+                               if k not in ('runs', 'p50_ms', 'p95_ms', 'mean_ms', 'throughput_per_s', 'recognized', 'errors'))
+                cases[f"{section} {key}".strip()] = item['p50_ms']
+        return cases
+
+    old, new = flatten(baseline), flatten(current)
+    rows = []
+    for name in sorted(old.keys() & new.keys()):
+        ratio = new[name] / old[name] if old[name] else float('inf')
+        rows.append((name, old[name], new[name], ratio, ratio > 1 + threshold))
+    return rows
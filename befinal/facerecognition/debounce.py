@@ -0,0 +1,83 @@
+"""
+Debounce event akses dari createlogusersmartnew/.
+
+Orang yang berdiri di depan terminal mengirim banyak frame berturut-turut, dan tiap frame
+dulu menjadi satu baris Logsmartaccess2 plus satu JPEG di media/tracking. Event dengan face_id
+dan status yang sama, paling lama FACE_DEBOUNCE_SECONDS sejak terakhir terlihat, sekarang
+digabung ke baris yang sudah ada: hit_count bertambah, last_seen diperbarui, dan gambar hanya
+ditulis ulang kalau frame baru lebih yakin (confidence lebih tinggi). Wajah Unknown tidak
+digabung karena orangnya tidak bisa dibedakan.
+"""
+from datetime import timedelta
+from django.conf import settings
+from . import metrics, models
+
+DEBOUNCE_EVENTS = metrics.counter(
+    'face_access_debounce_total',
+    'Event akses createlogusersmartnew per hasil debounce (inserted, merged)',
+    ('result',)
+)
+
+
+def enabled(face_id):
+    return bool(face_id) and settings.FACE_DEBOUNCE_SECONDS > 0
+
+
+def _window(face_id, status, now):
+    since = now - timedelta(seconds=settings.FACE_DEBOUNCE_SECONDS)
+    return (models.Logsmartaccess2.objects
+            .filter(id_face_user_id=face_id, status=status, last_seen__gte=since)
+            .order_by('-last_seen'))
+
+
+def peek_event(face_id, status, now):
+    """Seperti open_event tapi tanpa lock, untuk memutuskan perlu tidaknya menulis gambar dulu."""
+    return _window(face_id, status, now).first()
+
+
+def open_event(face_id, status, now):
+    """
+    Event terakhir face_id + status yang masih dalam jendela debounce, None kalau tidak ada.
+    Baris dikunci (select_for_update), jadi harus dipanggil di dalam transaction.atomic().
+    """
+    return _window(face_id, status, now).select_for_update().first()
+
+
+def is_better(confidence, current):
+    """Frame baru (confidence) lebih yakin dari gambar yang tersimpan (current)."""
+    return current is None or (confidence is not None and confidence > current)
+
+
+def collapse(records):
+    """
+    Debounce untuk batch record write-behind (writebehind.py). Record berisi face_id, status,
+    confidence, timestamp dan crop seperti record bulk ingest. Record yang masih dalam jendela
+    event terbuka di database, atau record sebelumnya di batch yang sama, digabung ke sana.
+    Mengembalikan (record yang perlu di-insert dengan hit_count/last_seen-nya, daftar event
+    database yang diperbarui). Tiap event berupa dict event, hit_count, last_seen, confidence,
+    crop (None kalau gambarnya tidak berubah). Harus dipanggil di dalam transaction.atomic().
+    """
+    window = timedelta(seconds=settings.FACE_DEBOUNCE_SECONDS)
+    inserts, updates, current = [], [], {}
+    for record in sorted(records, key=lambda record: record['timestamp']):
+        record = dict(record, hit_count=1, last_seen=record['timestamp'])
+        if not enabled(record.get('face_id')):
+            inserts.append(record)
+            continue
+        key = (record['face_id'], record['status'])
+        if key not in current:
+            event = open_event(*key, record['timestamp'])
+            if event is not None:
+                current[key] = {'event': event, 'hit_count': event.hit_count, 'last_seen': event.last_seen,
+                                'confidence': event.confidence, 'crop': None}
+                updates.append(current[key])
+        target = current.get(key)
+        if target is None or record['timestamp'] - target['last_seen'] > window:
+            current[key] = record
+            inserts.append(record)
+            continue
+        target['hit_count'] += 1
+        target['last_seen'] = max(target['last_seen'], record['timestamp'])
+        if record.get('crop') and is_better(record.get('confidence'), target['confidence']):
+            target['confidence'], target['crop'] = record.get('confidence'), record['crop']
+    return inserts, updates
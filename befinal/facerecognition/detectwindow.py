@@ -0,0 +1,110 @@
+"""
+Jendela deteksi adaptif per terminal.
+
+Kamera pintu yang terpasang tetap melihat wajah pada rentang ukuran dan posisi yang sempit.
+Kotak wajah terakhir tiap terminal (header FACE_TERMINAL_HEADER atau field form terminal_id)
+disimpan di cache Django. Setelah cukup sampel, deteksi hanya dijalankan pada ROI di sekitar
+posisi wajah yang pernah terlihat, dengan minSize/maxSize dari sebaran ukurannya. Kalau
+jendela tidak menemukan wajah, frame discan penuh seperti biasa dan hasilnya ikut masuk
+statistik, jadi jendela ikut bergeser kalau kamera dipindah.
+"""
+import re
+from collections import namedtuple
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from . import metrics
+
+WINDOW_RESULTS = metrics.counter(
+    'face_detect_window_total',
+    'Deteksi per hasil jendela adaptif (window, fallback, learning, full)',
+    ('result',)
+)
+_TERMINAL_ID = re.compile(r'[A-Za-z0-9_.:-]{1,64}')
+
+Window = namedtuple('Window', 'roi min_size max_size')
+
+
+def terminal_id(request):
+    """Id terminal dari header atau field form, None kalau tidak ada atau tidak valid."""
+    value = request.headers.get(settings.FACE_TERMINAL_HEADER) or request.data.get('terminal_id')
+    if value and _TERMINAL_ID.fullmatch(str(value)):
+        return str(value)
+    return None
+
+
+def _key(terminal):
+    return f"facewindow:{terminal}"
+
+
+def compute_window(boxes, shape, min_size=0):
+    """
+    ROI (x1, y1, x2, y2) yang mencakup semua kotak ditambah margin, minSize dari persentil 5
+    dan maxSize dari persentil 95 ukuran wajah, keduanya dilonggarkan FACE_ADAPTIVE_MARGIN.
+    """
+    boxes = np.asarray(boxes, dtype=np.int64).reshape(-1, 4)
+    height, width = shape[:2]
+    margin = settings.FACE_ADAPTIVE_MARGIN
+    sizes = np.maximum(boxes[:, 2], boxes[:, 3])
+    low = max(int(min_size), int(np.percentile(sizes, 5) * (1 - margin)))
+    high = int(np.ceil(np.percentile(sizes, 95) * (1 + margin)))
+    pad = int(np.ceil(np.median(sizes) * margin))
+    roi = (
+        max(0, int(boxes[:, 0].min()) - pad),
+        max(0, int(boxes[:, 1].min()) - pad),
+        min(width, int((boxes[:, 0] + boxes[:, 2]).max()) + pad),
+        min(height, int((boxes[:, 1] + boxes[:, 3]).max()) + pad),
+    )
+    return Window(roi, low, max(high, low + 1))
+
+
+def get_window(terminal, shape, min_size=0):
+    """Jendela terminal untuk frame berukuran `shape`, None kalau sampel belum cukup."""
+    stats = cache.get(_key(terminal))
+    if not stats or tuple(stats['shape']) != tuple(shape[:2]):
+        return None
+    if len(stats['boxes']) < settings.FACE_ADAPTIVE_MIN_SAMPLES:
+        return None
+    return compute_window(stats['boxes'], shape, min_size)
+
+
+def record(terminal, shape, boxes):
+    """Menambahkan kotak terdeteksi ke riwayat terminal (FACE_ADAPTIVE_HISTORY kotak terakhir)."""
+    if not len(boxes):
+        return
+    stats = cache.get(_key(terminal))
+    if not stats or tuple(stats['shape']) != tuple(shape[:2]):
+        # resolusi kamera berubah, statistik lama tidak berlaku
+        stats = {'shape': tuple(shape[:2]), 'boxes': []}
+    stats['boxes'] = (stats['boxes'] + [[int(value) for value in box] for box in boxes])[-settings.FACE_ADAPTIVE_HISTORY:]
+    cache.set(_key(terminal), stats, settings.FACE_ADAPTIVE_TIMEOUT)
+
+
+def reset(terminal):
+    cache.delete(_key(terminal))
+
+
+def detect(detector, gray, color=None, terminal=None):
+    """
+    Deteksi wajah dengan jendela terminal kalau tersedia. Tanpa terminal (atau
+    FACE_ADAPTIVE_WINDOW=False) sama persis dengan detector.detect pada frame penuh.
+    """
+    if not terminal or not settings.FACE_ADAPTIVE_WINDOW:
+        WINDOW_RESULTS.inc(result='full')
+        return detector.detect(gray, color=color)
+    window = get_window(terminal, gray.shape, detector.min_size)
+    result = 'learning'
+    if window is not None:
+        x1, y1, x2, y2 = window.roi
+        boxes = detector.detect(gray[y1:y2, x1:x2], color=None if color is None else color[y1:y2, x1:x2],
+                                min_size=window.min_size, max_size=window.max_size)
+        if len(boxes):
+            boxes = boxes + np.array([x1, y1, 0, 0], dtype=np.int32)
+            WINDOW_RESULTS.inc(result='window')
+            record(terminal, gray.shape, boxes)
+            return boxes
+        result = 'fallback'
+    boxes = detector.detect(gray, color=color)
+    WINDOW_RESULTS.inc(result=result)
+    record(terminal, gray.shape, boxes)
+    return boxes
@@ -0,0 +1,123 @@
+"""
+Cache hasil pengenalan untuk frame yang dikirim ulang terminal.
+
+Terminal mengulang createlogusersmartnew/ saat timeout, sering dengan frame yang sama atau
+nyaris sama. Hasil pengenalan (bukan respons) disimpan per terminal selama
+FACE_FRAME_CACHE_TTL detik:
+- sha256 isi file sama -> hasil pengenalan lama dipakai tanpa deteksi dan predict.
+- opsional (FACE_FRAME_CACHE_MAX_DISTANCE bukan None): dHash 64 bit crop wajah yang sudah
+  dideteksi berbeda paling banyak sekian bit dari crop sebelumnya -> prediksi crop itu dipakai
+  ulang tanpa predict. Default mati, karena wajah orang lain bisa punya dHash yang dekat.
+Hasil dari cache tetap dicatat seperti request biasa (save_log/write-behind + debounce), jadi
+setiap akses tetap punya baris di Logsmartaccess2.
+Cache berupa LRU di memori proses (paling banyak FACE_FRAME_CACHE_SIZE entry), jadi dengan
+beberapa worker retry yang jatuh ke worker lain tetap diproses penuh. Request tanpa id terminal
+tidak di-cache. TTL sengaja pendek: orang berbeda yang berdiri di depan kamera yang sama
+beberapa detik kemudian tidak boleh mendapat hasil orang sebelumnya.
+"""
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict, namedtuple
+import numpy as np
+import cv2
+from django.conf import settings
+from . import metrics
+
+FRAME_CACHE = metrics.counter(
+    'face_frame_cache_total',
+    'Lookup cache frame verifikasi (exact, similar, miss)',
+    ('result',)
+)
+
+Entry = namedtuple('Entry', 'terminal dhash expires data')
+
+# key ('frame', terminal, sha256) untuk hasil satu frame, ('face', terminal, dhash) untuk prediksi satu crop
+_entries = OrderedDict()
+_lock = threading.Lock()
+
+
+def enabled(terminal):
+    return bool(terminal) and settings.FACE_FRAME_CACHE_TTL > 0 and settings.FACE_FRAME_CACHE_SIZE > 0
+
+
+def similar_enabled(terminal):
+    return enabled(terminal) and settings.FACE_FRAME_CACHE_MAX_DISTANCE is not None
+
+
+def content_hash(buffer):
+    return hashlib.sha256(buffer).hexdigest()
+
+
+def dhash(image):
+    """Difference hash 64 bit: gambar diperkecil ke 9x8, tiap bit = piksel kanan lebih terang dari kirinya."""
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def _expire(now):
+    # urutan _entries = urutan pemakaian, jadi entry kedaluwarsa dibuang satu per satu dari depan
+    # sampai ketemu yang masih berlaku; sisanya dicek lagi saat lookup
+    while _entries and next(iter(_entries.values())).expires <= now:
+        _entries.popitem(last=False)
+
+
+def _store(key, terminal, image_hash, data):
+    entry = Entry(terminal, image_hash, time.monotonic() + settings.FACE_FRAME_CACHE_TTL, copy.deepcopy(data))
+    with _lock:
+        _entries.pop(key, None)
+        _entries[key] = entry
+        while len(_entries) > settings.FACE_FRAME_CACHE_SIZE:
+            _entries.popitem(last=False)
+
+
+def get_exact(terminal, sha256):
+    """Hasil pengenalan lama untuk file yang isinya persis sama, None (dicatat miss) kalau tidak ada."""
+    now = time.monotonic()
+    key = ('frame', terminal, sha256)
+    with _lock:
+        _expire(now)
+        entry = _entries.get(key)
+        if entry is not None and entry.expires > now:
+            _entries.move_to_end(key)
+        else:
+            entry = None
+    FRAME_CACHE.inc(result='miss' if entry is None else 'exact')
+    return None if entry is None else copy.deepcopy(entry.data)
+
+
+def store(terminal, sha256, results):
+    _store(('frame', terminal, sha256), terminal, None, results)
+
+
+def get_similar(terminal, face_hash):
+    """Prediksi lama untuk crop wajah terminal yang dHash-nya cukup dekat, None kalau tidak ada."""
+    now = time.monotonic()
+    max_distance = settings.FACE_FRAME_CACHE_MAX_DISTANCE
+    with _lock:
+        _expire(now)
+        best = None
+        for key, entry in reversed(_entries.items()):
+            if key[0] != 'face' or entry.terminal != terminal or entry.expires <= now:
+                continue
+            distance = (entry.dhash ^ face_hash).bit_count()
+            if distance <= max_distance and (best is None or distance < best[0]):
+                best = (distance, key, entry)
+        if best is not None:
+            _entries.move_to_end(best[1])
+    if best is None:
+        return None
+    FRAME_CACHE.inc(result='similar')
+    return copy.deepcopy(best[2].data)
+
+
+def store_face(terminal, face_hash, prediction):
+    _store(('face', terminal, face_hash), terminal, face_hash, prediction)
+
+
+def clear():
+    with _lock:
+        _entries.clear()
@@ -0,0 +1,96 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from . import models
+
+
+def _crop_filename(log, original_name):
+    """Nama file crop mengikuti pola log tunggal: <face_id/Unknown>_<status>_<waktu>_<log_id>"""
+    ext = os.path.splitext(original_name)[1] or '.jpeg'
+    waktu = log.access_time.strftime('%Y%m%d_%H%M%S_%f')
+    return f"{log.id_face_user_id or 'Unknown'}_{log.status}_{waktu}_{log.log_id}{ext}"
+
+
+def _write_crop(log, content):
+    name = log.image.field.generate_filename(log, _crop_filename(log, content.name))
+    return default_storage.save(name, content)
+
+
+def write_crops(pending):
+    """
+    Menulis file crop ke storage dengan jumlah thread terbatas.
+    pending berisi pasangan (log, file), nama hasil simpan langsung diisi ke log.image.
+    """
+    if not pending:
+        return []
+    workers = max(1, min(settings.FACE_BULK_WRITE_WORKERS, len(pending)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        names = list(pool.map(lambda item: _write_crop(*item), pending))
+    for (log, _), name in zip(pending, names):
+        log.image.name = name
+    return names
+
+
+def delete_crops(names):
+    for name in names:
+        try:
+            default_storage.delete(name)
+        except OSError:
+            pass
+
+
+def bulk_create_access_logs(records, files=None, batch_key=None):
+    """
+    Menyimpan batch event akses yang sudah divalidasi.
+    Record dengan idempotency key yang sudah pernah tersimpan dilewati, sehingga batch
+    yang dikirim ulang oleh terminal tidak menggandakan baris. Kalau record tidak membawa
+    key sendiri, key diturunkan dari header batch + urutan record.
+    Mengembalikan (log yang baru dibuat, jumlah record yang dilewati).
+    """
+    files = files or {}
+    keyed = []
+    for index, record in enumerate(records):
+        key = record.get('idempotency_key') or (f"{batch_key}:{index}" if batch_key else None)
+        keyed.append((key, record))
+
+    keys = {key for key, _ in keyed if key}
+    existing = set(
+        models.Logsmartaccess2.objects.filter(idempotency_key__in=keys).values_list('idempotency_key', flat=True)
+    ) if keys else set()
+
+    logs = []
+    pending = []
+    seen = set()
+    for key, record in keyed:
+        if key and (key in existing or key in seen):
+            continue
+        if key:
+            seen.add(key)
+        access_time = record.get('timestamp') or timezone.now()
+        log = models.Logsmartaccess2(
+            id_face_user_id=record.get('face_id'),
+            status=record['status'],
+            confidence=record.get('confidence'),
+            access_time=access_time,
+            last_seen=record.get('last_seen') or access_time,
+            hit_count=record.get('hit_count') or 1,
+            idempotency_key=key,
+        )
+        if record.get('log_id'):
+            log.log_id = record['log_id']
+        if record.get('crop'):
+            pending.append((log, files[record['crop']]))
+        logs.append(log)
+
+    names = write_crops(pending)
+    try:
+        with transaction.atomic():
+            models.Logsmartaccess2.objects.bulk_create(logs, batch_size=settings.FACE_BULK_MAX_RECORDS)
+    except Exception:
+        # baris tidak jadi masuk, file yang sudah ditulis ikut dibersihkan
+        delete_crops(names)
+        raise
+    return logs, len(records) - len(logs)
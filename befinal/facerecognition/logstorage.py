@@ -0,0 +1,88 @@
+"""
+Layout penyimpanan gambar log akses (media/tracking).
+
+Gambar tidak lagi ditaruh di satu folder datar, tapi dipartisi per tanggal (waktu lokal
+TIME_ZONE) lalu per prefix hash nama file:
+    tracking/2026/10/17/ab/<nama file>
+Satu folder hari berisi paling banyak 16^FACE_TRACKING_HASH_CHARS subfolder, jadi lookup,
+listing dan backup tetap cepat walaupun total file jutaan, dan retensi/arsip cukup bekerja
+per folder hari (`manage.py trackingretention`). File lama di folder datar dipindahkan dengan
+`manage.py migratetrackinglayout`.
+"""
+import hashlib
+import os
+import re
+from datetime import date
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+TRACKING_DIR = 'tracking'
+_PARTITION = re.compile(rf'^{TRACKING_DIR}/(\d{{4}})/(\d{{2}})/(\d{{2}})/')
+
+
+def partition_dir(day):
+    """Folder partisi satu hari, relatif terhadap MEDIA_ROOT."""
+    return f"{TRACKING_DIR}/{day.year:04d}/{day.month:02d}/{day.day:02d}"
+
+
+def hash_prefix(filename):
+    chars = settings.FACE_TRACKING_HASH_CHARS
+    return hashlib.sha256(os.path.basename(filename).encode()).hexdigest()[:chars] if chars else ''
+
+
+def partitioned_name(filename, when=None):
+    """Nama file di layout partisi untuk gambar yang diambil pada `when` (default sekarang)."""
+    day = timezone.localtime(when or timezone.now()).date()
+    parts = [partition_dir(day), hash_prefix(filename), os.path.basename(filename)]
+    return '/'.join(part for part in parts if part)
+
+
+def partition_date(name):
+    """Tanggal partisi dari nama file, None kalau file masih di layout datar."""
+    match = _PARTITION.match(str(name or ''))
+    if not match:
+        return None
+    return date(*(int(value) for value in match.groups()))
+
+
+def partitions():
+    """Daftar (tanggal, folder relatif) semua partisi hari yang ada di storage, urut tanggal."""
+    found = []
+    for year in _digit_dirs(TRACKING_DIR, 4):
+        for month in _digit_dirs(f"{TRACKING_DIR}/{year}", 2):
+            for day in _digit_dirs(f"{TRACKING_DIR}/{year}/{month}", 2):
+                try:
+                    found.append((date(int(year), int(month), int(day)), f"{TRACKING_DIR}/{year}/{month}/{day}"))
+                except ValueError:
+                    continue
+    return sorted(found)
+
+
+def _digit_dirs(path, width):
+    if not default_storage.exists(path):
+        return []
+    directories, _ = default_storage.listdir(path)
+    return sorted(name for name in directories if len(name) == width and name.isdigit())
+
+
+def move_file(old, new):
+    """
+    Memindahkan file di storage. Aman diulang: kalau file lama sudah tidak ada tapi yang baru
+    ada, dianggap sudah dipindah. Mengembalikan False kalau dua-duanya tidak ada.
+    """
+    if not default_storage.exists(old):
+        return default_storage.exists(new)
+    if default_storage.exists(new):
+        raise FileExistsError(f"{new} sudah ada, {old} tidak dipindah")
+    try:
+        old_path, new_path = default_storage.path(old), default_storage.path(new)
+    except NotImplementedError:
+        # storage non-lokal: salin lalu hapus
+        with default_storage.open(old, 'rb') as file:
+            default_storage.save(new, file)
+        default_storage.delete(old)
+        return True
+    os.makedirs(os.path.dirname(new_path), exist_ok=True)
+    os.replace(old_path, new_path)
+    return True
@@ -0,0 +1,35 @@
+import json
+from django.core.management.base import BaseCommand
+from django.db import connections
+from facerecognition import benchmark
+
+
+class Command(BaseCommand):
+    help = ("Ukur overhead koneksi database per request: koneksi baru tiap request (CONN_MAX_AGE=0) "
+            "dibanding strategi koneksi dari settings (persisten/health check/pool)")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=200)
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--output', help="tulis hasil JSON ke file ini")
+
+    def handle(self, *args, **options):
+        settings_dict = connections[options['database']].settings_dict
+        configured = (settings_dict['CONN_MAX_AGE'], settings_dict['CONN_HEALTH_CHECKS'])
+        cases = [('per_request', 0, False), ('configured', *configured)]
+        results = {}
+        for name, max_age, health_checks in cases:
+            results[name] = benchmark.bench_db_connection(options['repeat'], max_age, health_checks,
+                                                          options['database'])
+
+        self.stdout.write(f"engine {settings_dict['ENGINE']}")
+        for name, item in results.items():
+            self.stdout.write(f"  {name:<12} CONN_MAX_AGE={item['conn_max_age']!s:<5} koneksi baru "
+                              f"{item['connections_opened']:>5}  p50 {item['p50_ms']:>8.3f} ms  "
+                              f"p95 {item['p95_ms']:>8.3f} ms  {item['throughput_per_s']}/s")
+        saved = results['per_request']['mean_ms'] - results['configured']['mean_ms']
+        self.stdout.write(self.style.SUCCESS(f"selisih rata-rata per request: {saved:.3f} ms"))
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump({'environment': benchmark.environment(), 'engine': settings_dict['ENGINE'],
+                           'results': results}, file, indent=2)
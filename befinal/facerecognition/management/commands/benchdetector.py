@@ -0,0 +1,54 @@
+import json
+import os
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from facerecognition import benchmark
+
+COLUMNS = ('detector', 'images', 'detection_rate', 'faces_per_image', 'recall', 'p50_ms', 'p95_ms')
+
+
+class Command(BaseCommand):
+    help = "Bandingkan detektor wajah (FACE_DETECTORS) pada set gambar yang sama: detection rate dan ms/frame"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--detectors', nargs='+', help="default semua detektor di FACE_DETECTORS")
+        parser.add_argument('--images', help="direktori gambar (rekursif), default frame sintetis")
+        parser.add_argument('--limit', type=int, default=200, help="jumlah gambar maksimal")
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--output', help="tulis hasil JSON ke file ini")
+
+    def handle(self, *args, **options):
+        names = options['detectors'] or list(settings.FACE_DETECTORS)
+        unknown = [name for name in names if name not in settings.FACE_DETECTORS]
+        if unknown:
+            raise CommandError(f"detektor tidak dikenal: {', '.join(unknown)}")
+        if options['images'] and not os.path.isdir(options['images']):
+            raise CommandError(f"direktori {options['images']} tidak ditemukan")
+        images = benchmark.detector_images(options['images'], options['limit'])
+        if not images:
+            raise CommandError("tidak ada gambar untuk benchmark")
+
+        report_rows, results = [], []
+        for name in names:
+            self.stderr.write(f"detektor {name}...")
+            result = benchmark.bench_detector(name, images, options['repeat'])
+            report_rows.append(result)
+            if 'skipped' in result:
+                self.stderr.write(self.style.WARNING(f"{name} dilewati: {result['skipped']}"))
+            else:
+                results.append(result)
+        if results:
+            widths = [max(len(column), *(len(str(row[column])) for row in results)) for column in COLUMNS]
+            self.stdout.write('  '.join(column.ljust(width) for column, width in zip(COLUMNS, widths)))
+            for row in results:
+                self.stdout.write('  '.join(str(row[column]).ljust(width) for column, width in zip(COLUMNS, widths)))
+
+        if options['output']:
+            report = {
+                'environment': benchmark.environment(),
+                'config': {key: options[key] for key in ('images', 'limit', 'repeat')},
+                'results': {'detectors': report_rows},
+            }
+            with open(options['output'], 'w') as file:
+                json.dump(report, file, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"hasil ditulis ke {options['output']}"))
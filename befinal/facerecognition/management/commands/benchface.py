@@ -0,0 +1,128 @@
+import json
+import os
+import tempfile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from facerecognition import benchmark
+from facerecognition.recognizer import BACKENDS
+
+MODEL_FILES = {'xml': 'lbph_model.xml', 'lbph': 'lbph_model.lbph', 'shards': 'lbph_model.shards'}
+
+
+def frame_size(value):
+    try:
+        width, height = (int(part) for part in value.lower().split('x'))
+    except ValueError:
+        raise CommandError(f"ukuran frame '{value}' harus berformat LEBARxTINGGI, misal 640x480")
+    return height, width
+
+
+class Command(BaseCommand):
+    help = ("Benchmark pengenalan dan training dengan data sintetis (p50/p95, throughput, biaya training "
+            "per gambar, waktu load model). Jalankan dengan DJANGO_SETTINGS_MODULE=befinal.settings_bench.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, nargs='+', default=[10, 100],
+                            help="jumlah user terdaftar di model")
+        parser.add_argument('--per-user', type=int, default=5, help="jumlah sampel wajah per user")
+        parser.add_argument('--frames', nargs='+', default=['640x480', '1280x720'])
+        parser.add_argument('--faces', type=int, nargs='+', default=[1, 3], help="jumlah wajah per frame")
+        parser.add_argument('--predict-workers', type=int, nargs='+', default=None,
+                            help="bandingkan beberapa nilai FACE_PREDICT_WORKERS (default: setting aktif)")
+        parser.add_argument('--boxes', type=int, nargs='+', default=[1, 10, 50, 200],
+                            help="jumlah kotak deteksi untuk benchmark NMS")
+        parser.add_argument('--repeat', type=int, default=10)
+        parser.add_argument('--train-images', type=int, default=5, help="jumlah gambar per run training")
+        parser.add_argument('--train-repeat', type=int, default=3)
+        parser.add_argument('--backend', choices=sorted(BACKENDS), default=None)
+        parser.add_argument('--model-format', choices=sorted(MODEL_FILES), default='xml')
+        parser.add_argument('--skip-endpoint', action='store_true',
+                            help="lewati benchmark end-to-end createlogusersmartnew/")
+        parser.add_argument('--output', help="tulis hasil JSON ke file ini")
+        parser.add_argument('--compare', help="file JSON hasil benchmark sebelumnya sebagai pembanding")
+        parser.add_argument('--threshold', type=float, default=0.1,
+                            help="kenaikan p50 relatif yang dianggap regresi (default 0.1 = 10%%)")
+
+    def handle(self, *args, **options):
+        frames = [frame_size(value) for value in options['frames']]
+        if not options['skip_endpoint'] and connection.vendor != 'sqlite':
+            raise CommandError("benchmark endpoint hanya dijalankan di SQLite, pakai "
+                               "DJANGO_SETTINGS_MODULE=befinal.settings_bench atau --skip-endpoint")
+        overrides = {'FACE_RECOGNIZER_BACKEND': options['backend']} if options['backend'] else {}
+
+        report = {
+            'environment': benchmark.environment(),
+            'config': {key: options[key] for key in ('users', 'per_user', 'frames', 'faces', 'predict_workers', 'boxes',
+                                                    'repeat', 'train_images', 'train_repeat', 'backend',
+                                                    'model_format')},
+            'results': {},
+        }
+        results = report['results']
+        with tempfile.TemporaryDirectory() as tmp, benchmark.working_directory(tmp), override_settings(**overrides):
+            model_name = MODEL_FILES[options['model_format']]
+            self.stderr.write("NMS...")
+            results['nms'] = benchmark.bench_nms(options['boxes'], options['repeat'])
+
+            results['model_load'], results['recognize'] = [], []
+            for users in options['users']:
+                self.stderr.write(f"model {users} user...")
+                model_path = os.path.join(tmp, f"{users}_{model_name}")
+                label_to_user = benchmark.build_model(model_path, users, options['per_user'])
+                results['model_load'].append(
+                    dict(users=users, **benchmark.bench_model_load(model_path, options['repeat'])))
+                for item in benchmark.bench_recognize(model_path, label_to_user, frames, options['faces'],
+                                                      options['repeat'], options['predict_workers']):
+                    results['recognize'].append(dict(users=users, **item))
+
+            self.stderr.write("training...")
+            results['training'] = benchmark.bench_training(os.path.join(tmp, f"train_{model_name}"),
+                                                           options['train_images'], options['train_repeat'])
+
+            if not options['skip_endpoint']:
+                self.stderr.write("endpoint createlogusersmartnew/...")
+                results['endpoint'] = self.bench_endpoint(tmp, model_name, frames[0], options)
+
+        self.print_report(results)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(report, file, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"hasil ditulis ke {options['output']}"))
+        if options['compare']:
+            self.print_comparison(options['compare'], report, options['threshold'])
+
+    def bench_endpoint(self, tmp, model_name, frame, options):
+        """Database test SQLite sementara dibuat dan dibuang lagi setelah benchmark."""
+        model_path = os.path.join(tmp, f"endpoint_{model_name}")
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            users = options['users'][0]
+            owners = benchmark.create_owners(users)
+            benchmark.build_model(model_path, users, options['per_user'], face_ids=[owner.face_id for owner in owners])
+            with override_settings(FACE_MODEL_PATH=model_path, MEDIA_ROOT=os.path.join(tmp, 'media')):
+                return [
+                    dict(users=users, **benchmark.bench_endpoint(Client(), frame, faces, options['repeat']))
+                    for faces in options['faces']
+                ]
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def print_report(self, results):
+        for section, items in results.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(section))
+            for item in items if isinstance(items, list) else [items]:
+                case = ' '.join(f"{key}={value}" for key, value in item.items()
+                                if key not in ('runs', 'p50_ms', 'p95_ms', 'mean_ms', 'throughput_per_s'))
+                self.stdout.write(f"  {case:<45} p50 {item['p50_ms']:>9.3f} ms  p95 {item['p95_ms']:>9.3f} ms  "
+                                  f"{item['throughput_per_s']}/s")
+
+    def print_comparison(self, path, report, threshold):
+        try:
+            with open(path) as file:
+                baseline = json.load(file)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"gagal membaca pembanding {path}: {e}")
+        self.stdout.write(self.style.MIGRATE_HEADING(f"dibanding {baseline['environment'].get('commit')}"))
+        for name, old, new, ratio, regressed in benchmark.compare(baseline, report, threshold):
+            line = f"  {name:<55} {old:>9.3f} -> {new:>9.3f} ms  x{ratio:.2f}"
+            self.stdout.write(self.style.ERROR(line) if regressed else line)
@@ -0,0 +1,67 @@
+import json
+import os
+import tempfile
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from facerecognition import benchmark
+from facerecognition.recognizer import BACKENDS
+from .benchface import MODEL_FILES
+
+COLUMNS = ('profile', 'grid', 'crop_size', 'dimension', 'model_bytes', 'load_p95_ms', 'predict_p95_ms',
+           'accuracy', 'accept_threshold', 'authorized_rate', 'median_distance')
+
+
+class Command(BaseCommand):
+    help = ("Latih setiap profil model (FACE_MODEL_PROFILES) pada galeri yang sama lalu bandingkan ukuran model, "
+            "waktu load, p95 predict dan akurasi")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', nargs='+', help="default semua profil di FACE_MODEL_PROFILES")
+        parser.add_argument('--gallery', help="direktori galeri nyata (layout imagetraining/<user>/), "
+                                              "default galeri sintetis")
+        parser.add_argument('--users', type=int, default=50, help="jumlah user galeri sintetis")
+        parser.add_argument('--per-user', type=int, default=5, help="jumlah sampel training per user sintetis")
+        parser.add_argument('--probes', type=int, default=2, help="jumlah probe per user")
+        parser.add_argument('--repeat', type=int, default=10)
+        parser.add_argument('--backend', choices=sorted(BACKENDS), default=None)
+        parser.add_argument('--model-format', choices=sorted(MODEL_FILES), default='xml')
+        parser.add_argument('--output', help="tulis hasil JSON ke file ini")
+
+    def handle(self, *args, **options):
+        names = options['profiles'] or list(settings.FACE_MODEL_PROFILES)
+        unknown = [name for name in names if name not in settings.FACE_MODEL_PROFILES]
+        if unknown:
+            raise CommandError(f"profil tidak dikenal: {', '.join(unknown)}")
+        if options['gallery']:
+            if not os.path.isdir(options['gallery']):
+                raise CommandError(f"direktori {options['gallery']} tidak ditemukan")
+            gallery, probes = benchmark.gallery_samples(options['gallery'], options['probes'])
+        else:
+            gallery, probes = benchmark.synthetic_samples(options['users'], options['per_user'], options['probes'])
+        if not gallery or not probes:
+            raise CommandError("galeri tidak berisi cukup wajah untuk training dan probe")
+        self.stderr.write(f"galeri {len(gallery)} sampel, {len(probes)} probe")
+
+        results = []
+        extension = os.path.splitext(MODEL_FILES[options['model_format']])[1]
+        with tempfile.TemporaryDirectory() as tmp:
+            for name in names:
+                self.stderr.write(f"profil {name}...")
+                results.append(benchmark.bench_profile(name, gallery, probes, os.path.join(tmp, name + extension),
+                                                       options['repeat'], options['backend']))
+
+        widths = [max(len(column), *(len(str(row[column])) for row in results)) for column in COLUMNS]
+        self.stdout.write('  '.join(column.ljust(width) for column, width in zip(COLUMNS, widths)))
+        for row in results:
+            self.stdout.write('  '.join(str(row[column]).ljust(width) for column, width in zip(COLUMNS, widths)))
+
+        if options['output']:
+            report = {
+                'environment': benchmark.environment(),
+                'config': {key: options[key] for key in ('gallery', 'users', 'per_user', 'probes', 'repeat',
+                                                        'backend', 'model_format')},
+                'results': {'profiles': results},
+            }
+            with open(options['output'], 'w') as file:
+                json.dump(report, file, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"hasil ditulis ke {options['output']}"))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+from facerecognition import modelstore
+
+
+class Command(BaseCommand):
+    help = "Konversi model LBPH antara XML OpenCV dan format biner .lbph / .shards (arah ditentukan dari ekstensi)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('source')
+        parser.add_argument('destination')
+        parser.add_argument('--dtype', choices=modelstore.DTYPES, default='float32',
+                            help="tipe histogram untuk file .lbph")
+
+    def handle(self, *args, **options):
+        source, destination = options['source'], options['destination']
+        try:
+            if modelstore.is_binary_path(destination):
+                rows = modelstore.import_xml(source, destination, dtype=options['dtype'])
+            elif modelstore.is_binary_path(source):
+                rows = modelstore.export_xml(source, destination)
+            else:
+                raise CommandError(f"salah satu path harus berakhiran {modelstore.EXTENSION} atau {modelstore.SHARD_EXTENSION}")
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f"{rows} histogram dikonversi: {source} -> {destination}"))
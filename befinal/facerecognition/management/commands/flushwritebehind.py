@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+from facerecognition import writebehind
+
+
+class Command(BaseCommand):
+    help = "Menulis event akses write-behind yang tertinggal di file spill (misalnya setelah proses crash)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-age', type=float, default=60,
+                            help="hanya file spill yang lebih tua dari sekian detik, event yang lebih muda "
+                                 "mungkin masih di antrean writer yang hidup (default 60)")
+        parser.add_argument('--batch', type=int, default=None, help="jumlah event per transaksi")
+
+    def handle(self, *args, **options):
+        try:
+            count = writebehind.replay(min_age=options['min_age'], batch_size=options['batch'])
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f"{count} event dari {writebehind.spill_dir()} ditulis"))
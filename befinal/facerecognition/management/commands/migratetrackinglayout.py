@@ -0,0 +1,51 @@
+import os
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from facerecognition import logstorage
+from facerecognition.models import Logsmartaccess2
+
+
+class Command(BaseCommand):
+    help = ("Memindahkan gambar log akses dari folder tracking/ datar ke layout partisi "
+            "tracking/YYYY/MM/DD/<prefix hash>/ dan memperbarui path di Logsmartaccess2 per batch")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch', type=int, default=500, help="jumlah baris per transaksi")
+        parser.add_argument('--dry-run', action='store_true', help="hanya hitung baris yang akan dipindah")
+
+    def handle(self, *args, **options):
+        rows = (Logsmartaccess2.objects.filter(image__startswith=f"{logstorage.TRACKING_DIR}/")
+                .only('log_id', 'image', 'access_time').order_by('log_id'))
+        moved = missing = 0
+        last = None
+        while True:
+            batch = list((rows if last is None else rows.filter(log_id__gt=last))[:options['batch']])
+            if not batch:
+                break
+            last = batch[-1].log_id
+            changed = []
+            for log in batch:
+                if logstorage.partition_date(log.image.name):
+                    continue
+                new_name = logstorage.partitioned_name(os.path.basename(log.image.name), log.access_time)
+                if options['dry_run']:
+                    moved += 1
+                    continue
+                # file dipindah dulu baru path di DB; kalau terputus, diulang aman (move_file idempoten)
+                try:
+                    found = logstorage.move_file(log.image.name, new_name)
+                except FileExistsError as e:
+                    self.stderr.write(f"{log.log_id}: {e}")
+                    continue
+                if not found:
+                    missing += 1
+                    self.stderr.write(f"file {log.image.name} ({log.log_id}) tidak ada, path tetap diperbarui")
+                log.image.name = new_name
+                changed.append(log)
+            if changed:
+                with transaction.atomic():
+                    Logsmartaccess2.objects.bulk_update(changed, ['image'])
+                moved += len(changed)
+                self.stdout.write(f"{moved} baris dipindah...")
+        verb = "akan dipindah" if options['dry_run'] else "dipindah"
+        self.stdout.write(self.style.SUCCESS(f"{moved} gambar {verb} ke layout partisi, {missing} file tidak ditemukan"))
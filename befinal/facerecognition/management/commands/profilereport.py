@@ -0,0 +1,42 @@
+import io
+import os
+import pstats
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from facerecognition.profiling import PROFILE_EXTENSION
+
+SORT_KEYS = ('cumulative', 'tottime', 'ncalls')
+
+
+class Command(BaseCommand):
+    help = "Gabungkan file .prof hasil ProfilingMiddleware dan tampilkan top-N fungsi terberat"
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', nargs='?', help="default FACE_PROFILING_DIR")
+        parser.add_argument('--top', type=int, default=25)
+        parser.add_argument('--sort', choices=SORT_KEYS, default='cumulative')
+        parser.add_argument('--view', help="hanya profile dari view ini, misal Createlogusersmartnew")
+        parser.add_argument('--filter', help="regex nama fungsi/file, misal 'cv2|recognizer'")
+        parser.add_argument('--output', help="simpan hasil gabungan sebagai satu file .prof")
+
+    def handle(self, *args, **options):
+        directory = options['directory'] or settings.FACE_PROFILING_DIR
+        if not os.path.isdir(directory):
+            raise CommandError(f"direktori {directory} tidak ditemukan")
+        files = sorted(
+            os.path.join(directory, name) for name in os.listdir(directory)
+            if name.endswith(PROFILE_EXTENSION) and (not options['view'] or f"_{options['view']}_" in name)
+        )
+        if not files:
+            raise CommandError(f"tidak ada file {PROFILE_EXTENSION} di {directory}")
+
+        stream = io.StringIO()
+        stats = pstats.Stats(*files, stream=stream)
+        stats.strip_dirs().sort_stats(options['sort'])
+        restrictions = [options['filter'], options['top']] if options['filter'] else [options['top']]
+        stats.print_stats(*restrictions)
+        self.stdout.write(f"{len(files)} profile digabung dari {directory}")
+        self.stdout.write(stream.getvalue())
+        if options['output']:
+            stats.dump_stats(options['output'])
+            self.stdout.write(self.style.SUCCESS(f"profile gabungan ditulis ke {options['output']}"))
@@ -0,0 +1,64 @@
+import os
+import shutil
+import tarfile
+from datetime import timedelta
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from facerecognition import logstorage
+from facerecognition.models import Logsmartaccess2
+
+
+class Command(BaseCommand):
+    help = ("Retensi gambar log akses per partisi hari: partisi yang lebih tua dari --days diarsip "
+            "(tar.gz per hari, opsional) lalu dihapus, path gambar di log ikut dikosongkan")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None,
+                            help="umur partisi yang dipertahankan (default FACE_TRACKING_RETENTION_DAYS)")
+        parser.add_argument('--archive', action='store_true',
+                            help="arsipkan partisi ke FACE_TRACKING_ARCHIVE_DIR sebelum dihapus")
+        parser.add_argument('--delete-rows', action='store_true',
+                            help="hapus juga baris log partisi tersebut, bukan hanya path gambarnya")
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        days = options['days'] if options['days'] is not None else settings.FACE_TRACKING_RETENTION_DAYS
+        if days is None or days < 0:
+            raise CommandError("isi --days atau FACE_TRACKING_RETENTION_DAYS")
+        try:
+            default_storage.path(logstorage.TRACKING_DIR)
+        except NotImplementedError:
+            raise CommandError("retensi per partisi hanya untuk storage filesystem lokal")
+        cutoff = timezone.localdate() - timedelta(days=days)
+        expired = [(day, path) for day, path in logstorage.partitions() if day < cutoff]
+        if not expired:
+            self.stdout.write(f"tidak ada partisi sebelum {cutoff}")
+            return
+        archive_dir = settings.FACE_TRACKING_ARCHIVE_DIR
+        if not os.path.isabs(archive_dir):
+            archive_dir = os.path.join(settings.BASE_DIR, archive_dir)
+        for day, path in expired:
+            rows = Logsmartaccess2.objects.filter(image__startswith=f"{path}/")
+            if options['dry_run']:
+                self.stdout.write(f"{path}: {rows.count()} baris log")
+                continue
+            if options['archive']:
+                self.stdout.write(f"{path}: diarsip ke {self.archive(path, day, archive_dir)}")
+            with transaction.atomic():
+                count = rows.delete()[0] if options['delete_rows'] else rows.update(image='')
+            # folder baru dihapus setelah DB tidak lagi menunjuk ke sana; kalau terputus di
+            # antaranya, partisi yang sama dihapus lagi pada run berikutnya
+            shutil.rmtree(default_storage.path(path))
+            self.stdout.write(f"{path}: dihapus, {count} baris log diperbarui")
+        self.stdout.write(self.style.SUCCESS(f"{len(expired)} partisi sebelum {cutoff} diproses"))
+
+    def archive(self, path, day, archive_dir):
+        os.makedirs(archive_dir, exist_ok=True)
+        target = os.path.join(archive_dir, f"{logstorage.TRACKING_DIR}-{day.isoformat()}.tar.gz")
+        with tarfile.open(target + '.tmp', 'w:gz') as archive:
+            archive.add(default_storage.path(path), arcname=path)
+        os.replace(target + '.tmp', target)
+        return target
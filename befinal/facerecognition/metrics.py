@@ -0,0 +1,199 @@
+"""
+Instrumentasi ringan untuk pipeline wajah.
+
+Histogram/counter/gauge disimpan di memori proses dan dirender dalam format teks
+Prometheus oleh endpoint face/metrics/. Timer bisa dipakai sebagai context manager
+maupun decorator:
+
+    with metrics.timer('detect'):
+        ...
+
+    @metrics.timed('train')
+    def train_or_update_user_data(...):
+        ...
+"""
+import bisect
+import functools
+import threading
+import time
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(labelnames, labelvalues, extra=()):
+    pairs = list(zip(labelnames, labelvalues)) + list(extra)
+    if not pairs:
+        return ''
+    body = ','.join('{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+                    for name, value in pairs)
+    return '{' + body + '}'
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+            lines.extend(self._render_items(items))
+        return lines
+
+    def _render_items(self, items):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in items]
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                state['buckets'][index] += 1
+            state['sum'] += value
+            state['count'] += 1
+
+    def snapshot(self, **labels):
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return None if state is None else {'sum': state['sum'], 'count': state['count']}
+
+    def _render_items(self, items):
+        lines = []
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, state['buckets']):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, [('le', repr(float(bound)))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key, [('le', '+Inf')])
+            lines.append(f"{self.name}_bucket{labels} {state['count']}")
+            plain = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{plain} {state['sum']}")
+            lines.append(f"{self.name}_count{plain} {state['count']}")
+        return lines
+
+
+REGISTRY = {}
+
+
+def _register(metric):
+    return REGISTRY.setdefault(metric.name, metric)
+
+
+def counter(name, documentation, labelnames=()):
+    return _register(Counter(name, documentation, labelnames))
+
+
+def gauge(name, documentation, labelnames=()):
+    return _register(Gauge(name, documentation, labelnames))
+
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return _register(Histogram(name, documentation, labelnames, buckets))
+
+
+STAGE_SECONDS = histogram(
+    'face_pipeline_stage_seconds',
+    'Durasi tiap tahap pipeline wajah (decode, detect, nms, predict, encode, storage_write, db_write, ...)',
+    ('stage',)
+)
+REQUEST_SECONDS = histogram(
+    'face_request_seconds',
+    'Durasi total request per view facerecognition',
+    ('view', 'status')
+)
+
+
+class timer:
+    """Context manager / decorator yang mencatat durasi ke face_pipeline_stage_seconds."""
+
+    def __init__(self, stage, metric=STAGE_SECONDS):
+        self.stage = stage
+        self.metric = metric
+        self.elapsed = None
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.elapsed = time.perf_counter() - self._start
+        self.metric.observe(self.elapsed, stage=self.stage)
+        return False
+
+    def __call__(self, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timer(self.stage, self.metric):
+                return func(*args, **kwargs)
+        return wrapper
+
+
+timed = timer
+
+
+def observe_request(view_name):
+    """Decorator method APIView: mencatat durasi request beserta status code responsenya."""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            start = time.perf_counter()
+            status_code = 500
+            try:
+                response = method(self, request, *args, **kwargs)
+                status_code = getattr(response, 'status_code', status_code)
+                return response
+            finally:
+                REQUEST_SECONDS.observe(time.perf_counter() - start, view=view_name, status=status_code)
+        return wrapper
+    return decorator
+
+
+def render_prometheus():
+    lines = []
+    for metric in list(REGISTRY.values()):
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
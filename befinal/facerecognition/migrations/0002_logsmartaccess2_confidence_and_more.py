@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:17
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('facerecognition', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='logsmartaccess2',
+            name='confidence',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='logsmartaccess2',
+            name='idempotency_key',
+            field=models.CharField(blank=True, editable=False, max_length=255, null=True, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='logsmartaccess2',
+            name='access_time',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('facerecognition', '0002_logsmartaccess2_confidence_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='datawajahnew',
+            name='sha256',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=64),
+        ),
+    ]
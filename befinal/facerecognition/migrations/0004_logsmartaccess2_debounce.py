@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:02
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def last_seen_from_access_time(apps, schema_editor):
+    Logsmartaccess2 = apps.get_model('facerecognition', 'Logsmartaccess2')
+    Logsmartaccess2.objects.update(last_seen=models.F('access_time'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('facerecognition', '0003_datawajahnew_sha256'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='logsmartaccess2',
+            name='hit_count',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+        migrations.AddField(
+            model_name='logsmartaccess2',
+            name='last_seen',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.RunPython(last_seen_from_access_time, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='logsmartaccess2',
+            index=models.Index(fields=['id_face_user', 'status', 'last_seen'], name='log_debounce_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:10
+
+import facerecognition.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('facerecognition', '0004_logsmartaccess2_debounce'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='logsmartaccess2',
+            name='image',
+            field=models.ImageField(blank=True, default='', max_length=255, null=True, upload_to=facerecognition.models.upload_image_access_user),
+        ),
+    ]
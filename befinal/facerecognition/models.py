@@ -1,15 +1,20 @@
 from django.db import models
 import os
+import logging
 import uuid
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 from users.models import User
+from . import logstorage, preprocess
 # Create your models here.
+logger=logging.getLogger(__name__)
 
 def upload_image_training2(instance,filename):
     return os.path.join('imagetraining',str(instance.user.first_name+instance.user.last_name),filename)
 def upload_image_access_user(instance,filename):
-    print(instance)
-    return os.path.join('tracking',filename)
+    # dipartisi per tanggal akses + prefix hash (logstorage.py), instance None berarti sekarang
+    logger.debug("upload tracking %s untuk %s", filename, instance)
+    return logstorage.partitioned_name(filename,getattr(instance,'access_time',None))
 class Datawajahnew(models.Model):
     """Face data model - hanya untuk User dengan role OWNER"""
 
@@ -27,6 +32,8 @@ class Datawajahnew(models.Model):
         null=True,
         help_text="Face image for training"
     )
+    # sha256 isi file yang dihitung saat upload, untuk menolak gambar yang sama dikirim ulang
+    sha256 = models.CharField(max_length=64, blank=True, default='', db_index=True, editable=False)
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -45,6 +52,12 @@ class Datawajahnew(models.Model):
         # Jalankan validasi sebelum save
         self.full_clean()
         super().save(*args, **kwargs)
+        # turunan grayscale kecil untuk training, dibuat sekali saat ingest
+        if self.image_user:
+            try:
+                preprocess.write_normalized(self.image_user.path)
+            except OSError as e:
+                logger.warning("Gagal membuat gambar ternormalisasi %s: %s", self.image_user.name, e)
 
     class Meta:
         verbose_name = 'Data Wajah'
@@ -52,6 +65,15 @@ class Datawajahnew(models.Model):
 class Logsmartaccess2(models.Model):
     log_id=models.CharField(default=uuid.uuid4,primary_key=True,editable=False,max_length=255)
     id_face_user=models.ForeignKey(User,on_delete=models.CASCADE,to_field='face_id',related_name='log_access_user',null=True)
-    image=models.ImageField(upload_to=upload_image_access_user,default='',blank=True,null=True)
-    access_time=models.DateTimeField(auto_now_add=True)
-    status=models.CharField(max_length=255)
\ No newline at end of file
+    image=models.ImageField(upload_to=upload_image_access_user,default='',blank=True,null=True,max_length=255)
+    access_time=models.DateTimeField(default=timezone.now)
+    status=models.CharField(max_length=255)
+    confidence=models.FloatField(null=True,blank=True)
+    # kunci idempotensi dari terminal, supaya batch yang dikirim ulang tidak dobel
+    idempotency_key=models.CharField(max_length=255,unique=True,null=True,blank=True,editable=False)
+    # debounce (facerecognition/debounce.py): jumlah frame yang digabung ke event ini dan kapan terakhir terlihat
+    hit_count=models.PositiveIntegerField(default=1,editable=False)
+    last_seen=models.DateTimeField(default=timezone.now,editable=False)
+
+    class Meta:
+        indexes=[models.Index(fields=['id_face_user','status','last_seen'],name='log_debounce_idx')]
@@ -0,0 +1,352 @@
+"""
+Format model biner pengganti dump XML LBPH.
+
+Satu model terdiri dari dua file:
+- <nama>.lbph               : header 256 byte (magic + JSON parameter) lalu baris histogram
+                              mentah (float32/float16), bisa dibuka langsung dengan np.memmap.
+- <nama>.lbph.<gen>.labels  : label int32 per baris histogram. <gen> dicatat di header, model
+                              lama tanpa generation memakai <nama>.lbph.labels.
+Tulis ulang (write) membuat file label generation baru lalu mengganti file histogram dengan
+satu rename; rename itu satu-satunya titik commit, jadi crash di tengah jalan menyisakan model
+lama yang utuh. Append menulis histogram dulu dan label terakhir (keduanya di-fsync), jadi
+jumlah label menjadi penanda commit dan baris histogram sisa crash diabaikan. Saat dibaca,
+file label dan jumlah baris histogram divalidasi.
+
+Proses yang mengubah model (training, hapus user, manifest .shards) memegang model_lock,
+flock pada file <nama>.lock di sebelah model, selama baca-ubah-tulis.
+
+Untuk banyak owner tersedia juga layout sharded (lihat bagian bawah file).
+"""
+import json
+import os
+import re
+import tempfile
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+import numpy as np
+try:
+    import fcntl
+except ImportError:  # Windows: hanya dikunci antar thread di proses yang sama
+    fcntl = None
+
+MAGIC = b'LBPHSTR1'
+HEADER_SIZE = 256
+EXTENSION = '.lbph'
+DTYPES = ('float32', 'float16')
+
+
+def is_store_path(path):
+    return str(path).endswith(EXTENSION)
+
+
+def labels_path(path, generation=None):
+    return f"{path}.{generation}.labels" if generation else f"{path}.labels"
+
+
+def store_files(path):
+    """File milik satu model .lbph: file histogram dan file label yang sedang dipakai."""
+    try:
+        generation = read_header(path).get('generation')
+    except (OSError, ValueError):
+        generation = None
+    return [str(path), labels_path(path, generation)]
+
+
+_held = threading.local()
+_thread_locks = {}
+_thread_locks_guard = threading.Lock()
+
+
+@contextmanager
+def model_lock(path):
+    """
+    Kunci eksklusif satu model selama baca-ubah-tulis, antar proses (fcntl.flock) dan antar
+    thread. Reentrant di thread yang sama, jadi save() di dalam training yang sudah memegang
+    kunci tidak menunggu dirinya sendiri.
+    """
+    lock_path = os.path.abspath(str(path).rstrip('/\\')) + '.lock'
+    held = _held.__dict__.setdefault('paths', set())
+    if lock_path in held:
+        yield
+        return
+    with _thread_locks_guard:
+        thread_lock = _thread_locks.setdefault(lock_path, threading.Lock())
+    with thread_lock:
+        os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+        with open(lock_path, 'a') as file:
+            if fcntl is not None:
+                fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+            held.add(lock_path)
+            try:
+                yield
+            finally:
+                held.discard(lock_path)
+                if fcntl is not None:
+                    fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+
+
+def _temp_file(path):
+    """File sementara unik di direktori yang sama dengan `path` (supaya os.replace atomik)."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)),
+                                    prefix=os.path.basename(path) + '.', suffix='.tmp')
+    return os.fdopen(fd, 'wb'), tmp_path
+
+
+def _fsync_dir(path):
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _encode_header(params):
+    payload = MAGIC + json.dumps(params, sort_keys=True).encode('utf-8')
+    if len(payload) > HEADER_SIZE:
+        raise ValueError("header model terlalu besar")
+    return payload.ljust(HEADER_SIZE, b' ')
+
+
+def read_header(path):
+    with open(path, 'rb') as file:
+        raw = file.read(HEADER_SIZE)
+    if not raw.startswith(MAGIC):
+        raise ValueError(f"{path} bukan file model {EXTENSION}")
+    return json.loads(raw[len(MAGIC):].decode('utf-8'))
+
+
+def load(path, mode='r'):
+    """
+    Membuka model tanpa mem-parsing isi histogram: hanya header yang dibaca, histogram
+    dikembalikan sebagai np.memmap (N, D). Mengembalikan (params, histograms, labels).
+    """
+    params = read_header(path)
+    labels_file = labels_path(path, params.get('generation'))
+    if os.path.exists(labels_file):
+        labels = np.fromfile(labels_file, dtype='<i4', count=os.path.getsize(labels_file) // 4)
+    elif params.get('generation'):
+        raise ValueError(f"file label {labels_file} untuk model {path} tidak ada")
+    else:
+        labels = np.empty(0, '<i4')
+    rows = len(labels)
+    row_size = params['dimension'] * np.dtype(params['dtype']).itemsize
+    if os.path.getsize(path) < HEADER_SIZE + rows * row_size:
+        raise ValueError(f"model {path} rusak: histogram lebih sedikit dari {rows} label")
+    if rows == 0:
+        histograms = np.empty((0, params['dimension']), dtype=params['dtype'])
+    else:
+        histograms = np.memmap(path, dtype=params['dtype'], mode=mode, offset=HEADER_SIZE,
+                               shape=(rows, params['dimension']))
+    return params, histograms, labels
+
+
+def _write_synced(file, array, dtype):
+    np.ascontiguousarray(array, dtype=dtype).tofile(file)
+    file.flush()
+    os.fsync(file.fileno())
+
+
+def write(path, params, histograms, labels):
+    """
+    Menulis ulang seluruh model secara atomik: file label generation baru dan file histogram
+    sementara di-fsync dulu, lalu file histogram diganti dengan satu rename (titik commit).
+    File label generation sebelumnya baru dihapus setelah itu.
+    """
+    params = dict(params, dimension=int(histograms.shape[1]), generation=uuid.uuid4().hex[:12])
+    dtype = params.setdefault('dtype', 'float32')
+    if dtype not in DTYPES:
+        raise ValueError(f"dtype model harus salah satu dari {DTYPES}")
+    old_files = store_files(path) if os.path.exists(path) else []
+    new_labels = labels_path(path, params['generation'])
+    with open(new_labels, 'wb') as file:
+        _write_synced(file, labels, '<i4')
+    file, tmp_path = _temp_file(path)
+    try:
+        with file:
+            file.write(_encode_header(params))
+            _write_synced(file, histograms, dtype)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    _fsync_dir(path)
+    for name in old_files[1:]:
+        if name != new_labels and os.path.exists(name):
+            os.remove(name)
+
+
+def append(path, histograms, labels):
+    """Menambahkan baris baru di akhir file tanpa menulis ulang baris lama."""
+    params = read_header(path)
+    if histograms.shape[1] != params['dimension']:
+        raise ValueError("dimensi histogram tidak sama dengan model yang tersimpan")
+    committed = count(path)
+    with open(path, 'r+b') as file:
+        # buang sisa baris yang labelnya belum sempat ditulis
+        file.truncate(HEADER_SIZE + committed * params['dimension'] * np.dtype(params['dtype']).itemsize)
+        file.seek(0, os.SEEK_END)
+        _write_synced(file, histograms, params['dtype'])
+    with open(labels_path(path, params.get('generation')), 'ab') as file:
+        # sisa label yang terpotong di tengah (kurang dari 4 byte) ikut dibuang
+        file.truncate(committed * 4)
+        _write_synced(file, labels, '<i4')
+
+
+def count(path):
+    try:
+        return os.path.getsize(store_files(path)[1]) // 4
+    except OSError:
+        return 0
+
+
+# Metadata profil pada model XML ditulis sebagai node top-level setelah opencv_lbphfaces,
+# node tambahan ini diabaikan oleh cv2.face.LBPHFaceRecognizer.read.
+XML_PROFILE_KEY = 'face_profile'
+XML_CROP_SIZE_KEY = 'face_crop_size'
+XML_ACCEPT_THRESHOLD_KEY = 'face_accept_threshold'
+XML_PROBE_SIZE = 4096
+_XML_NODE = re.compile(r'<(threshold|radius|neighbors|grid_x|grid_y|face_profile|face_crop_size|face_accept_threshold)>\s*([^<\s]+)\s*</')
+
+
+def write_xml_meta(fs, profile, crop_size, accept_threshold):
+    """Menulis metadata profil ke cv2.FileStorage yang sedang terbuka (mode WRITE/APPEND)."""
+    if profile:
+        fs.write(XML_PROFILE_KEY, profile)
+    fs.write(XML_CROP_SIZE_KEY, int(crop_size))
+    fs.write(XML_ACCEPT_THRESHOLD_KEY, float(accept_threshold))
+
+
+def read_xml_params(path):
+    """
+    Parameter LBPH + metadata profil model XML tanpa mem-parsing histogram: parameter ada di
+    awal file dan metadata profil di akhir file, jadi cukup membaca dua potongan kecil.
+    """
+    with open(path, 'rb') as file:
+        head = file.read(XML_PROBE_SIZE)
+        file.seek(max(0, os.path.getsize(path) - XML_PROBE_SIZE))
+        tail = file.read()
+    values = {}
+    for chunk in (head, tail):
+        for key, value in _XML_NODE.findall(chunk.decode('utf-8', 'replace')):
+            values.setdefault(key, value)
+    if not all(key in values for key in ('radius', 'neighbors', 'grid_x', 'grid_y')):
+        raise ValueError(f"{path} bukan model LBPH OpenCV")
+    params = {key: int(float(values[key])) for key in ('radius', 'neighbors', 'grid_x', 'grid_y')}
+    params['threshold'] = float(values.get('threshold', 'inf'))
+    if XML_PROFILE_KEY in values:
+        params['profile'] = values[XML_PROFILE_KEY]
+    if XML_CROP_SIZE_KEY in values:
+        params['crop_size'] = int(float(values[XML_CROP_SIZE_KEY]))
+    if XML_ACCEPT_THRESHOLD_KEY in values:
+        params['accept_threshold'] = float(values[XML_ACCEPT_THRESHOLD_KEY])
+    return params
+
+
+def import_xml(xml_path, store_path, dtype='float32'):
+    """Konversi model XML OpenCV LBPH ke format biner (.lbph atau direktori .shards)."""
+    from .recognizer import VectorLBPHBackend
+    backend = VectorLBPHBackend(top_k=0)
+    backend.read(xml_path)
+    backend.dtype = dtype
+    backend.save(store_path)
+    return len(backend.labels)
+
+
+def export_xml(store_path, xml_path):
+    """Konversi format biner kembali ke XML yang bisa dibaca cv2.face.LBPHFaceRecognizer."""
+    from .recognizer import VectorLBPHBackend
+    backend = VectorLBPHBackend(top_k=0)
+    backend.read(store_path)
+    backend.save(xml_path)
+    return len(backend.labels)
+
+
+# ---------------------------------------------------------------------------
+# Layout sharded: satu file .lbph per face_id di dalam direktori <nama>.shards
+# ditambah manifest.json. Enroll/replace/hapus satu owner hanya menyentuh shard
+# miliknya; manifest diganti secara atomik sehingga crash tidak merusak user lain.
+# ---------------------------------------------------------------------------
+SHARD_EXTENSION = '.shards'
+MANIFEST = 'manifest.json'
+
+
+def is_sharded_path(path):
+    return str(path).rstrip('/\\').endswith(SHARD_EXTENSION)
+
+
+def is_binary_path(path):
+    return is_store_path(path) or is_sharded_path(path)
+
+
+def _atomic_write_bytes(path, data):
+    file, tmp_path = _temp_file(path)
+    try:
+        with file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def read_manifest(path):
+    try:
+        with open(os.path.join(path, MANIFEST), 'r') as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {'version': 1, 'params': None, 'shards': {}}
+
+
+def load_shards(path):
+    """Menggabungkan semua shard di memori, mengembalikan (params, histograms, labels)."""
+    manifest = read_manifest(path)
+    params = manifest['params']
+    histograms, labels = [], []
+    for entry in manifest['shards'].values():
+        _, shard_histograms, shard_labels = load(os.path.join(path, entry['file']))
+        histograms.append(shard_histograms)
+        labels.append(shard_labels)
+    if not histograms:
+        dimension = params['dimension'] if params else 0
+        return params, np.empty((0, dimension), dtype=np.float32), np.empty(0, '<i4')
+    return params, np.concatenate(histograms), np.concatenate(labels)
+
+
+def write_shards(path, params, shards, removed=(), replace_all=False):
+    """
+    Menulis shard untuk label di `shards` (label -> matriks histogram) ke file baru,
+    lalu mengganti manifest secara atomik dan baru setelah itu menghapus file lama.
+    Label di `removed` dihapus dari manifest. replace_all membuang semua shard lain.
+    Baca-ubah-tulis manifest dilakukan di bawah model_lock, jadi enroll paralel tidak saling menimpa.
+    """
+    os.makedirs(path, exist_ok=True)
+    written = {}
+    for label, histograms in shards.items():
+        name = f"{label}.{uuid.uuid4().hex[:8]}{EXTENSION}"
+        write(os.path.join(path, name), params, histograms, np.full(len(histograms), int(label), dtype='<i4'))
+        written[str(label)] = {
+            'file': name,
+            'rows': int(len(histograms)),
+            'updated': datetime.now(timezone.utc).isoformat(),
+        }
+    with model_lock(path):
+        manifest = read_manifest(path)
+        old_shards = manifest['shards']
+        new_shards = {} if replace_all else dict(old_shards)
+        new_shards.update(written)
+        for label in removed:
+            new_shards.pop(str(label), None)
+        manifest.update(params=params, shards=new_shards)
+        _atomic_write_bytes(os.path.join(path, MANIFEST),
+                            json.dumps(manifest, indent=1, sort_keys=True).encode('utf-8'))
+
+        live = {entry['file'] for entry in new_shards.values()}
+        for entry in old_shards.values():
+            if entry['file'] not in live:
+                for name in store_files(os.path.join(path, entry['file'])):
+                    if os.path.exists(name):
+                        os.remove(name)
@@ -0,0 +1,61 @@
+"""
+Predict paralel untuk frame yang berisi beberapa wajah.
+
+Wajah dalam satu frame diprediksi lewat satu thread pool bersama (FACE_PREDICT_WORKERS
+thread per proses), sehingga frame rombongan selesai kira-kira secepat frame satu wajah.
+Satu objek recognizer dipakai bersama oleh thread-thread itu: predict kedua backend hanya
+membaca model (LBPHFaceRecognizer::predict const dan melepas GIL, backend 'vector' hanya
+membaca matriks histogram), jadi tidak perlu lock atau salinan model per thread.
+
+Thread internal OpenCV (parallel_for di detectMultiScale, resize, ...) ikut dibatasi saat pool
+dibuat: FACE_CV_THREADS, atau jumlah core dibagi jumlah worker kalau None, supaya pool predict
+dan pool OpenCV tidak berebut core.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+from django.conf import settings
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def workers():
+    return max(1, int(settings.FACE_PREDICT_WORKERS or 1))
+
+
+def cv_threads():
+    """Jumlah thread OpenCV yang dipakai bersama pool predict."""
+    if settings.FACE_CV_THREADS is not None:
+        return int(settings.FACE_CV_THREADS)
+    return max(1, (os.cpu_count() or 1) // workers())
+
+
+def get_executor():
+    """Thread pool predict milik proses, dibuat saat pertama dipakai."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            cv2.setNumThreads(cv_threads())
+            _executor = ThreadPoolExecutor(max_workers=workers(), thread_name_prefix='face-predict')
+        return _executor
+
+
+def shutdown():
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+
+def run(func, items):
+    """
+    Seperti list(map(func, items)), urutan hasil sama dengan urutan items. Satu item atau
+    FACE_PREDICT_WORKERS=1 dijalankan langsung di thread pemanggil tanpa lewat pool.
+    """
+    items = list(items)
+    if len(items) <= 1 or workers() <= 1:
+        return [func(item) for item in items]
+    return list(get_executor().map(func, items))
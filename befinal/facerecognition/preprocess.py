@@ -0,0 +1,120 @@
+"""
+Preprocessing gambar wajah.
+
+Gambar training disimpan apa adanya, tapi saat Datawajahnew disimpan dibuat juga turunan
+ternormalisasi (grayscale, sisi terpanjang dibatasi, opsional equalize) di subfolder
+FACE_NORMALIZED_DIR di samping file asli. Training cukup membaca file kecil ini.
+
+Crop wajah hasil deteksi, baik saat training maupun pengenalan, melewati prepare_face
+supaya LBPH selalu menghitung histogram pada ukuran yang sama, yaitu crop_size yang tercatat
+di model. Model tanpa crop_size (dilatih dengan crop asli) tidak di-resize.
+"""
+import logging
+import os
+import threading
+import cv2
+import numpy as np
+from PIL import Image
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+NORMALIZED_EXTENSION = '.png'
+
+
+def normalized_path(image_path):
+    # ekstensi asli ikut di nama (x.jpg -> x.jpg.png) supaya x.jpg dan x.png tidak berbagi turunan
+    folder, name = os.path.split(image_path)
+    return os.path.join(folder, settings.FACE_NORMALIZED_DIR, name + NORMALIZED_EXTENSION)
+
+
+def delete_normalized(image_path):
+    """Menghapus turunan ternormalisasi gambar training (saat baris Datawajahnew dihapus)."""
+    try:
+        os.remove(normalized_path(image_path))
+    except FileNotFoundError:
+        pass
+
+
+def normalize_image(gray):
+    """Perkecil (tanpa memperbesar) sampai sisi terpanjang <= FACE_NORMALIZED_MAX_SIDE, lalu equalize opsional."""
+    max_side = settings.FACE_NORMALIZED_MAX_SIDE
+    height, width = gray.shape[:2]
+    scale = max_side / max(height, width) if max_side else 1.0
+    if scale < 1.0:
+        gray = cv2.resize(gray, (max(1, round(width * scale)), max(1, round(height * scale))),
+                          interpolation=cv2.INTER_AREA)
+    if settings.FACE_NORMALIZED_EQUALIZE:
+        gray = cv2.equalizeHist(gray)
+    return gray
+
+
+def read_gray(image_path):
+    """Decode file asli ke grayscale uint8 (sama seperti training lama: PIL convert('L'))."""
+    with Image.open(image_path) as image:
+        return np.array(image.convert("L"), "uint8")
+
+
+def write_normalized(image_path):
+    """Membuat turunan ternormalisasi untuk satu gambar training, mengembalikan array-nya."""
+    gray = normalize_image(read_gray(image_path))
+    target = normalized_path(image_path)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp_path = target + '.tmp' + NORMALIZED_EXTENSION
+    if not cv2.imwrite(tmp_path, gray):
+        raise OSError(f"gagal menulis {target}")
+    os.replace(tmp_path, target)
+    return gray
+
+
+def load_training_image(image_path):
+    """
+    Gambar grayscale untuk training. Turunan ternormalisasi dipakai kalau sudah ada dan
+    tidak lebih lama dari file aslinya, kalau belum ada dibuat sekarang (galeri lama).
+    """
+    target = normalized_path(image_path)
+    try:
+        if os.path.getmtime(target) >= os.path.getmtime(image_path):
+            gray = cv2.imread(target, cv2.IMREAD_GRAYSCALE)
+            if gray is not None:
+                return gray
+    except OSError:
+        pass
+    try:
+        return write_normalized(image_path)
+    except OSError as e:
+        logger.warning("Normalisasi %s gagal, memakai file asli: %s", image_path, e)
+        return normalize_image(read_gray(image_path))
+
+
+_local = threading.local()
+
+
+def _face_buffers(size):
+    """Buffer resize/equalize per thread, dipakai ulang antar panggilan."""
+    buffers = getattr(_local, 'face_buffers', None)
+    if buffers is None or buffers[0].shape != (size, size):
+        buffers = _local.face_buffers = (np.empty((size, size), np.uint8), np.empty((size, size), np.uint8))
+    return buffers
+
+
+def prepare_face(gray, box, copy=False, size=0):
+    """
+    Crop wajah dari gambar grayscale lalu diubah ke ukuran kanonik `size` dan opsional equalize.
+    `size` harus crop_size model yang dipakai (recognizer.crop_size, atau profil model saat
+    training); 0 mempertahankan ukuran crop asli seperti model lama.
+    Hasilnya menunjuk ke buffer milik thread ini dan tertimpa panggilan berikutnya,
+    pakai copy=True kalau crop perlu disimpan (misal dikumpulkan untuk training).
+    """
+    x, y, w, h = (int(value) for value in box)
+    face = gray[y:y + h, x:x + w]
+    equalize = settings.FACE_CANONICAL_EQUALIZE
+    if not size:
+        face = cv2.equalizeHist(face) if equalize else face
+        return face.copy() if copy else face
+    resized, equalized = _face_buffers(size)
+    interpolation = cv2.INTER_AREA if min(face.shape[:2]) > size else cv2.INTER_LINEAR
+    cv2.resize(face, (size, size), dst=resized, interpolation=interpolation)
+    if equalize:
+        cv2.equalizeHist(resized, dst=equalized)
+        resized = equalized
+    return resized.copy() if copy else resized
@@ -0,0 +1,104 @@
+"""
+Profil model LBPH: parameter histogram (radius, neighbors, grid) dan ukuran crop wajah.
+
+Ukuran histogram = 2^neighbors * grid_x * grid_y, jadi profil dengan grid kecil dan crop
+kecil lebih cepat dan lebih hemat memori (cocok untuk terminal low-power), profil dengan
+grid besar lebih teliti. Profil yang dipakai dicatat di metadata model (header .lbph,
+manifest .shards, atau node tambahan di XML), sehingga model lama tetap dibaca dan dipakai
+dengan profilnya sendiri walaupun FACE_MODEL_PROFILE diganti. Profil baru hanya berlaku
+untuk file model baru. Ambang terima recognize_from_image (accept_threshold) ikut profil,
+karena skala jarak chi-square berubah dengan grid dan radius.
+"""
+import os
+from django.conf import settings
+from . import modelstore
+
+LBPH_KEYS = ('radius', 'neighbors', 'grid_x', 'grid_y')
+# ambang untuk model tanpa accept_threshold yang profilnya tidak dikenal (skala grid 8x8 bawaan OpenCV)
+DEFAULT_ACCEPT_THRESHOLD = 50.0
+
+
+def available():
+    return settings.FACE_MODEL_PROFILES
+
+
+def get_profile(profile=None):
+    """
+    Profil sebagai dict (name, radius, neighbors, grid_x, grid_y, crop_size, accept_threshold),
+    default FACE_MODEL_PROFILE.
+    """
+    if isinstance(profile, dict):
+        return profile
+    name = profile or settings.FACE_MODEL_PROFILE
+    try:
+        values = available()[name]
+    except KeyError:
+        raise ValueError(f"profil model '{name}' tidak dikenal, pilih salah satu: {', '.join(available())}")
+    return dict(values, name=name, accept_threshold=_profile_threshold(values))
+
+
+def lbph_params(profile):
+    return {key: int(profile[key]) for key in LBPH_KEYS}
+
+
+def match_profile(params):
+    """Nama profil yang parameter LBPH-nya sama dengan `params`, None kalau tidak ada."""
+    for name, values in available().items():
+        if all(int(values[key]) == int(params[key]) for key in LBPH_KEYS):
+            return name
+    return None
+
+
+def _profile_threshold(values):
+    return float(values.get('accept_threshold', DEFAULT_ACCEPT_THRESHOLD))
+
+
+def _accept_threshold(params, name):
+    threshold = params.get('accept_threshold')
+    if threshold is None:
+        values = available().get(name)
+        return _profile_threshold(values) if values else DEFAULT_ACCEPT_THRESHOLD
+    return float(threshold)
+
+
+def resolve(params):
+    """
+    (nama profil, crop_size, accept_threshold) dari metadata model. Model lama tanpa metadata
+    profil dicocokkan lewat parameter LBPH-nya. Model tanpa crop_size dilatih dari crop asli
+    yang tidak di-resize, jadi crop_size-nya 0. Model tanpa accept_threshold memakai ambang
+    profilnya, atau DEFAULT_ACCEPT_THRESHOLD kalau profilnya tidak dikenal.
+    """
+    name = params.get('profile') or match_profile(params)
+    crop_size = params.get('crop_size')
+    return name, int(crop_size or 0), _accept_threshold(params, name)
+
+
+def resolve_new(params):
+    """
+    (nama profil, crop_size, accept_threshold) untuk backend yang baru dibuat (belum membaca
+    model): tanpa crop_size eksplisit dipakai crop_size profilnya, atau profil aktif kalau tidak cocok.
+    """
+    name = params.get('profile') or match_profile(params)
+    crop_size = params.get('crop_size')
+    if crop_size is None:
+        crop_size = (available().get(name) or get_profile())['crop_size']
+    return name, int(crop_size), _accept_threshold(params, name)
+
+
+def model_profile(path):
+    """
+    Profil model di `path` tanpa memuat histogramnya. Kalau file belum ada (atau manifest
+    .shards masih kosong) dipakai profil aktif, karena model baru akan dibuat dengan profil itu.
+    """
+    params = None
+    if os.path.exists(path):
+        if modelstore.is_sharded_path(path):
+            params = modelstore.read_manifest(path)['params']
+        elif modelstore.is_store_path(path):
+            params = modelstore.read_header(path)
+        else:
+            params = modelstore.read_xml_params(path)
+    if not params:
+        return get_profile()
+    name, crop_size, accept_threshold = resolve(params)
+    return dict(lbph_params(params), name=name, crop_size=crop_size, accept_threshold=accept_threshold)
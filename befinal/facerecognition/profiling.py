@@ -0,0 +1,79 @@
+"""
+Middleware profiling opsional untuk view facerecognition.
+
+Aktif hanya kalau FACE_PROFILING_ENABLED=True. Sebuah request diprofile bila terpilih
+sampling (FACE_PROFILING_SAMPLE_RATE) atau membawa header FACE_PROFILING_HEADER bernilai 1.
+Hasil cProfile ditulis sebagai file .prof (format pstats) ke FACE_PROFILING_DIR dan bisa
+digabung dengan `manage.py profilereport`.
+"""
+import cProfile
+import logging
+import os
+import random
+import time
+import uuid
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.urls import Resolver404, resolve
+
+logger = logging.getLogger(__name__)
+PROFILE_EXTENSION = '.prof'
+
+
+def profile_filename(view_name, elapsed):
+    stamp = time.strftime('%Y%m%d_%H%M%S')
+    return f"{stamp}_{view_name}_{int(elapsed * 1000)}ms_{uuid.uuid4().hex[:6]}{PROFILE_EXTENSION}"
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        if not settings.FACE_PROFILING_ENABLED:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.directory = settings.FACE_PROFILING_DIR
+        self.sample_rate = settings.FACE_PROFILING_SAMPLE_RATE
+        self.header = settings.FACE_PROFILING_HEADER
+        os.makedirs(self.directory, exist_ok=True)
+
+    def view_name(self, request):
+        """Nama view facerecognition yang dituju, None untuk app lain."""
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return None
+        func = getattr(match.func, 'view_class', match.func)
+        if not func.__module__.startswith('facerecognition.'):
+            return None
+        return func.__name__
+
+    def should_profile(self, request):
+        if request.headers.get(self.header) == '1':
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def __call__(self, request):
+        if not self.should_profile(request):
+            return self.get_response(request)
+        view_name = self.view_name(request)
+        if view_name is None:
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # profiler lain sedang aktif (mis. request lain di thread berbeda), lewati saja
+            return self.get_response(request)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+        name = profile_filename(view_name, time.perf_counter() - start)
+        try:
+            profiler.dump_stats(os.path.join(self.directory, name))
+        except OSError as e:
+            logger.warning("Gagal menulis profile %s: %s", name, e)
+            return response
+        response[self.header] = name
+        return response
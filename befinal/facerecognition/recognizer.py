@@ -0,0 +1,647 @@
+"""
+Backend pengenal wajah yang dipanggil oleh views.
+
+Ada dua backend dengan format model yang sama (XML OpenCV LBPH, atau format biner
+.lbph dari modelstore):
+- 'lbph'   : cv2.face.LBPHFaceRecognizer apa adanya.
+- 'vector' : LBP + histogram dihitung dengan NumPy, semua histogram disimpan dalam satu
+             matriks float32 dan pencarian tetangga terdekat dilakukan secara vektor.
+Histogram dan jarak chi-square backend 'vector' identik dengan OpenCV, sehingga kedua
+backend bisa membaca dan menulis file model yang sama.
+Parameter LBPH dan ukuran crop diambil dari profil model (profiles.py) dan ikut disimpan
+di metadata model.
+Model yang dipakai verifikasi dibuka sekali per proses (load_model) dan dipakai ulang
+sampai file modelnya berubah, termasuk index centroid backend 'vector'.
+"""
+import os
+import tempfile
+import threading
+import numpy as np
+import cv2
+from django.conf import settings
+from . import modelstore, profiles
+
+DBL_MAX = np.finfo(np.float64).max
+FLT_EPSILON = np.finfo(np.float32).eps
+
+
+class RecognizerBackend:
+    """Interface minimal yang dipakai proses training dan pengenalan."""
+    name = None
+    # nama profil, ukuran crop wajah dan ambang terima model ini, diperbarui dari metadata saat read()
+    profile = None
+    crop_size = 0
+    accept_threshold = profiles.DEFAULT_ACCEPT_THRESHOLD
+
+    def read(self, path):
+        raise NotImplementedError
+
+    def save(self, path):
+        raise NotImplementedError
+
+    def train(self, faces, labels):
+        """Melatih ulang dari nol, data lama dibuang."""
+        raise NotImplementedError
+
+    def update(self, faces, labels):
+        """Menambahkan wajah baru tanpa membuang data lama."""
+        raise NotImplementedError
+
+    def remove_label(self, label):
+        """Membuang semua histogram milik satu label, label lain tidak disentuh."""
+        raise NotImplementedError
+
+    def replace_label(self, label, faces):
+        """Mengganti semua histogram satu label dengan wajah baru."""
+        self.remove_label(label)
+        if len(faces):
+            self.update(faces, [label] * len(faces))
+
+    def predict(self, face):
+        """Mengembalikan (label, jarak), jarak kecil berarti makin mirip."""
+        raise NotImplementedError
+
+    def predict_many(self, faces):
+        return [self.predict(face) for face in faces]
+
+    def _reset_tracking(self, shard_source=None):
+        # perubahan sejak model dibaca/disimpan, supaya save ke .shards cukup menulis shard yang berubah
+        # dan save ke .lbph cukup menambahkan baris baru (_persisted = (path, jumlah baris tersimpan))
+        self._persisted = None
+        self._shard_source = shard_source
+        self._dirty_labels = set()
+        self._removed_labels = set()
+
+    def _copy_tracking(self, source):
+        self._persisted, self._shard_source = source._persisted, source._shard_source
+        self._dirty_labels, self._removed_labels = set(source._dirty_labels), set(source._removed_labels)
+
+
+class OpenCVLBPHBackend(RecognizerBackend):
+    name = 'lbph'
+
+    def __init__(self, radius=1, neighbors=8, grid_x=8, grid_y=8, profile=None, crop_size=None,
+                 accept_threshold=None):
+        self.model = cv2.face.LBPHFaceRecognizer.create(radius, neighbors, grid_x, grid_y)
+        self.profile, self.crop_size, self.accept_threshold = profiles.resolve_new(dict(
+            radius=radius, neighbors=neighbors, grid_x=grid_x, grid_y=grid_y, profile=profile, crop_size=crop_size,
+            accept_threshold=accept_threshold))
+        self._reset_tracking()
+
+    def _from_vector(self, vector):
+        with tempfile.TemporaryDirectory() as tmp:
+            xml_path = os.path.join(tmp, 'model.xml')
+            vector.save(xml_path)
+            self.model.read(xml_path)
+
+    def _to_vector(self):
+        vector = VectorLBPHBackend(top_k=0)
+        with tempfile.TemporaryDirectory() as tmp:
+            xml_path = os.path.join(tmp, 'model.xml')
+            self.model.save(xml_path)
+            vector.read(xml_path)
+        vector.profile, vector.crop_size, vector.accept_threshold = self.profile, self.crop_size, self.accept_threshold
+        return vector
+
+    def read(self, path):
+        self._reset_tracking()
+        if not modelstore.is_binary_path(path):
+            self.model.read(path)
+            self.profile, self.crop_size, self.accept_threshold = profiles.resolve(modelstore.read_xml_params(path))
+            return
+        # cv2 hanya mengerti XML, jadi format biner/sharded dikonversi lewat backend vector
+        vector = VectorLBPHBackend(top_k=0)
+        vector.read(path)
+        self._from_vector(vector)
+        self.profile, self.crop_size, self.accept_threshold = vector.profile, vector.crop_size, vector.accept_threshold
+        self._copy_tracking(vector)
+
+    def save(self, path):
+        if not modelstore.is_binary_path(path):
+            self.model.save(path)
+            fs = cv2.FileStorage(path, cv2.FILE_STORAGE_APPEND)
+            try:
+                modelstore.write_xml_meta(fs, self.profile, self.crop_size, self.accept_threshold)
+            finally:
+                fs.release()
+            return
+        vector = self._to_vector()
+        vector.dtype = settings.FACE_MODEL_DTYPE
+        # perubahan sejak read ikut dibawa: .shards hanya menulis shard label yang berubah,
+        # .lbph hanya menambahkan baris baru
+        vector._copy_tracking(self)
+        vector.save(path)
+        self._copy_tracking(vector)
+
+    def remove_label(self, label):
+        # LBPHFaceRecognizer tidak bisa menghapus sampel, jadi lewat backend vector
+        labels = self.model.getLabels()
+        if labels is None or int(label) not in labels.ravel():
+            return
+        vector = self._to_vector()
+        vector.remove_label(label)
+        self._from_vector(vector)
+        self._persisted = None
+        self._dirty_labels.discard(int(label))
+        self._removed_labels.add(int(label))
+
+    def train(self, faces, labels):
+        self.model.train(faces, np.asarray(labels, dtype=np.int32))
+        self._reset_tracking()
+
+    def update(self, faces, labels):
+        labels = np.asarray(labels, dtype=np.int32)
+        self.model.update(faces, labels)
+        self._dirty_labels.update(labels.ravel().tolist())
+
+    def predict(self, face):
+        return self.model.predict(face)
+
+
+def elbp(src, radius=1, neighbors=8):
+    """Extended LBP (circular, interpolasi bilinear), sama persis dengan elbp_ di OpenCV."""
+    src = np.asarray(src)
+    rows, cols = src.shape
+    h, w = rows - 2 * radius, cols - 2 * radius
+    image = src.astype(np.float32)
+    center = image[radius:radius + h, radius:radius + w]
+    dst = np.zeros((h, w), dtype=np.int32)
+    for n in range(neighbors):
+        x = np.float32(radius * np.cos(2.0 * np.pi * n / float(neighbors)))
+        y = np.float32(-radius * np.sin(2.0 * np.pi * n / float(neighbors)))
+        fx, fy = int(np.floor(x)), int(np.floor(y))
+        cx, cy = int(np.ceil(x)), int(np.ceil(y))
+        ty, tx = np.float32(y - fy), np.float32(x - fx)
+        w1 = np.float32((1 - tx) * (1 - ty))
+        w2 = np.float32(tx * (1 - ty))
+        w3 = np.float32((1 - tx) * ty)
+        w4 = np.float32(tx * ty)
+
+        def shifted(dy, dx):
+            return image[radius + dy:radius + dy + h, radius + dx:radius + dx + w]
+
+        t = w1 * shifted(fy, fx) + w2 * shifted(fy, cx) + w3 * shifted(cy, fx) + w4 * shifted(cy, cx)
+        bit = (t > center) | (np.abs(t - center) < FLT_EPSILON)
+        dst += bit.astype(np.int32) << n
+    return dst
+
+
+def spatial_histogram(lbp_image, num_patterns, grid_x=8, grid_y=8):
+    """Histogram per sel grid yang dinormalisasi, hasilnya satu baris float32 (1, grid*patterns)."""
+    cell_h = lbp_image.shape[0] // grid_y
+    cell_w = lbp_image.shape[1] // grid_x
+    cells = (lbp_image[:grid_y * cell_h, :grid_x * cell_w]
+             .reshape(grid_y, cell_h, grid_x, cell_w)
+             .transpose(0, 2, 1, 3)
+             .reshape(grid_y * grid_x, cell_h * cell_w))
+    # geser kode LBP tiap sel supaya semua sel bisa dihitung dengan satu bincount
+    offsets = cells + np.arange(grid_y * grid_x, dtype=np.int32)[:, None] * num_patterns
+    hist = np.bincount(offsets.ravel(), minlength=grid_y * grid_x * num_patterns).astype(np.float32)
+    hist *= np.float32(1.0 / (cell_h * cell_w))
+    return hist.reshape(1, -1)
+
+
+def chisqr_distances(matrix, row_sums, query, rows=None):
+    """
+    Chi-square alternatif seperti compareHist HISTCMP_CHISQR_ALT: 2 * sum((h-q)^2 / (h+q)).
+    Pada bin dengan q == 0 suku tersebut sama dengan h, jadi cukup hitung bin yang terisi di
+    query lalu tambahkan sisa jumlah histogram tersimpan. Matriks Fortran-order diambil per
+    bin (matrix.T[bin] kontigu), matriks C-order (mis. memmap) diambil per baris.
+    """
+    nonzero = np.flatnonzero(query)
+    row_sums = row_sums if rows is None else row_sums[rows]
+    if matrix.flags.f_contiguous:
+        axis, values = 0, query[nonzero][:, None]
+        columns = matrix.T
+        stored = columns[nonzero] if rows is None else columns[np.ix_(nonzero, rows)]
+    else:
+        axis, values = 1, query[nonzero]
+        stored = matrix[:, nonzero] if rows is None else matrix[np.ix_(rows, nonzero)]
+    stored = stored.astype(np.float32, copy=False)
+    stored_sum = stored.sum(axis=axis, dtype=np.float64)
+    total = stored + values
+    stored -= values
+    stored *= stored
+    stored /= total
+    return 2.0 * (row_sums - stored_sum + stored.sum(axis=axis, dtype=np.float64))
+
+
+def l2_distances(matrix, sq_norms, query, rows=None):
+    stored = matrix if rows is None else matrix[rows]
+    sq_norms = sq_norms if rows is None else sq_norms[rows]
+    query64 = query.astype(np.float64)
+    result = sq_norms - 2.0 * (stored @ query64) + query64 @ query64
+    return np.sqrt(np.maximum(result, 0.0))
+
+
+class CentroidIndex:
+    """
+    Indeks dua tahap: user diranking dulu berdasarkan jarak ke centroid histogramnya,
+    lalu query hanya dibandingkan dengan histogram milik top-K user terdekat.
+    Biaya tahap pertama sebanding dengan jumlah user, bukan jumlah gambar.
+    """
+
+    def __init__(self, dimension):
+        self.dimension = dimension
+        self.labels = np.empty((0,), dtype=np.int32)
+        self.rows = []
+        self._positions = {}
+        self._counts = np.empty((0,), dtype=np.int64)
+        self.centroids = np.empty((0, dimension), dtype=np.float32, order='F')
+        self.row_sums = np.empty((0,), dtype=np.float64)
+        self.sq_norms = np.empty((0,), dtype=np.float64)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def add(self, histograms, labels, first_row=0):
+        """Menambahkan histogram baru (baris first_row dst. di matriks backend) secara inkremental."""
+        labels = np.asarray(labels, dtype=np.int32).ravel()
+        new_labels = [int(label) for label in np.unique(labels) if int(label) not in self._positions]
+        if new_labels:
+            for offset, label in enumerate(new_labels):
+                self._positions[label] = len(self.labels) + offset
+                self.rows.append(np.empty((0,), dtype=np.int64))
+            grow = len(new_labels)
+            self.labels = np.concatenate([self.labels, np.asarray(new_labels, dtype=np.int32)])
+            self._counts = np.concatenate([self._counts, np.zeros(grow, dtype=np.int64)])
+            self.centroids = np.asfortranarray(
+                np.concatenate([self.centroids, np.zeros((grow, self.dimension), dtype=np.float32)]))
+            self.row_sums = np.concatenate([self.row_sums, np.zeros(grow)])
+            self.sq_norms = np.concatenate([self.sq_norms, np.zeros(grow)])
+        for label in np.unique(labels):
+            position = self._positions[int(label)]
+            members = np.flatnonzero(labels == label)
+            self.rows[position] = np.concatenate([self.rows[position], first_row + members])
+            # rata-rata berjalan, jadi histogram lama tidak perlu dibaca ulang
+            count = self._counts[position]
+            total = self.centroids[position].astype(np.float64) * count
+            total += histograms[members].sum(axis=0, dtype=np.float64)
+            self._counts[position] = count + len(members)
+            centroid = (total / self._counts[position]).astype(np.float32)
+            self.centroids[position] = centroid
+            self.row_sums[position] = centroid.sum(dtype=np.float64)
+            self.sq_norms[position] = np.dot(centroid, centroid)
+
+    def copy(self):
+        """Salinan yang bisa di-add tanpa mengubah indeks yang sedang dipakai thread lain."""
+        index = CentroidIndex(self.dimension)
+        index.labels, index.rows, index._positions = self.labels.copy(), list(self.rows), dict(self._positions)
+        index._counts, index.centroids = self._counts.copy(), self.centroids.copy(order='F')
+        index.row_sums, index.sq_norms = self.row_sums.copy(), self.sq_norms.copy()
+        return index
+
+    def candidate_rows(self, query, top_k, metric='chisqr'):
+        """Indeks baris histogram milik top_k user yang centroid-nya paling dekat dengan query."""
+        if metric == 'l2':
+            dist = l2_distances(self.centroids, self.sq_norms, query)
+        else:
+            dist = chisqr_distances(self.centroids, self.row_sums, query)
+        nearest = np.argpartition(dist, top_k - 1)[:top_k] if top_k < len(dist) else np.arange(len(dist))
+        return np.sort(np.concatenate([self.rows[position] for position in nearest]))
+
+
+class VectorLBPHBackend(RecognizerBackend):
+    name = 'vector'
+
+    def __init__(self, radius=1, neighbors=8, grid_x=8, grid_y=8, metric='chisqr', top_k=None, dtype=None,
+                 profile=None, crop_size=None, accept_threshold=None):
+        self.radius = radius
+        self.neighbors = neighbors
+        self.grid_x = grid_x
+        self.grid_y = grid_y
+        self.profile, self.crop_size, self.accept_threshold = profiles.resolve_new(dict(
+            radius=radius, neighbors=neighbors, grid_x=grid_x, grid_y=grid_y, profile=profile, crop_size=crop_size,
+            accept_threshold=accept_threshold))
+        self.threshold = DBL_MAX
+        self.metric = metric
+        # 0 berarti selalu exhaustive, selain itu pakai CentroidIndex
+        self.top_k = settings.FACE_RECOGNIZER_TOP_K if top_k is None else top_k
+        # dtype histogram saat disimpan ke format biner
+        self.dtype = dtype or settings.FACE_MODEL_DTYPE
+        # (path, jumlah baris) yang sudah ada di file .lbph, supaya save cukup append
+        self._persisted = None
+        # layout sharded: hanya label yang berubah yang ditulis ulang
+        self._shard_source = None
+        self._dirty_labels = set()
+        self._removed_labels = set()
+        self._set_data(np.empty((0, self.dimension), dtype=np.float32), np.empty((0,), dtype=np.int32))
+
+    @property
+    def dimension(self):
+        return (2 ** self.neighbors) * self.grid_x * self.grid_y
+
+    def compute_histograms(self, faces):
+        """Histogram LBP semua wajah ke dalam satu matriks kontigu (N, D)."""
+        matrix = np.empty((len(faces), self.dimension), dtype=np.float32)
+        for row, face in enumerate(faces):
+            lbp_image = elbp(face, self.radius, self.neighbors)
+            matrix[row] = spatial_histogram(lbp_image, 2 ** self.neighbors, self.grid_x, self.grid_y)
+        return matrix
+
+    def _set_data(self, histograms, labels, index=None):
+        if isinstance(histograms, np.memmap):
+            # model biner dipakai langsung dari memmap, tanpa disalin
+            self.histograms = histograms
+        else:
+            # disimpan Fortran-order: histograms.T kontigu per bin, sehingga bin yang terisi
+            # pada query bisa diambil sebagai baris-baris memori yang berurutan
+            self.histograms = np.asfortranarray(histograms, dtype=np.float32)
+        self.labels = np.ascontiguousarray(labels, dtype=np.int32).ravel()
+        self._row_sums = None
+        self._sq_norms = None
+        self._index = index
+
+    @property
+    def row_sums(self):
+        if self._row_sums is None:
+            self._row_sums = self.histograms.sum(axis=1, dtype=np.float64)
+        return self._row_sums
+
+    @property
+    def index(self):
+        # dibangun saat pertama dibutuhkan, jadi membuka model biner tetap O(1). Baru dipasang
+        # setelah lengkap, supaya thread predict lain (parallel.py) tidak melihat index setengah jadi
+        if self._index is None:
+            index = CentroidIndex(self.dimension)
+            index.add(self.histograms, self.labels)
+            self._index = index
+        return self._index
+
+    def _load_params(self, params):
+        self.threshold = float(params.get('threshold', DBL_MAX))
+        self.radius = int(params['radius'])
+        self.neighbors = int(params['neighbors'])
+        self.grid_x = int(params['grid_x'])
+        self.grid_y = int(params['grid_y'])
+        self.profile, self.crop_size, self.accept_threshold = profiles.resolve(params)
+
+    @property
+    def params(self):
+        return {
+            'threshold': float(self.threshold),
+            'radius': self.radius,
+            'neighbors': self.neighbors,
+            'grid_x': self.grid_x,
+            'grid_y': self.grid_y,
+            'dtype': self.dtype,
+            'dimension': self.dimension,
+            'profile': self.profile,
+            'crop_size': self.crop_size,
+            'accept_threshold': self.accept_threshold,
+        }
+
+    def read(self, path):
+        if modelstore.is_sharded_path(path):
+            params, histograms, labels = modelstore.load_shards(path)
+            if params:
+                self._load_params(params)
+                self.dtype = params['dtype']
+            self._set_data(histograms, labels)
+            self._reset_tracking(shard_source=str(path))
+            return
+        self._reset_tracking()
+        if modelstore.is_store_path(path):
+            params, histograms, labels = modelstore.load(path)
+            self._load_params(params)
+            self.dtype = params['dtype']
+            self._set_data(histograms, labels)
+            self._persisted = (str(path), len(labels))
+            return
+        fs = cv2.FileStorage(path, cv2.FILE_STORAGE_READ)
+        try:
+            node = fs.getNode('opencv_lbphfaces')
+            if node.empty():
+                raise ValueError(f"{path} bukan model LBPH OpenCV")
+            params = {key: node.getNode(key).real() for key in ('threshold',) + profiles.LBPH_KEYS}
+            profile_node = fs.getNode(modelstore.XML_PROFILE_KEY)
+            crop_node = fs.getNode(modelstore.XML_CROP_SIZE_KEY)
+            threshold_node = fs.getNode(modelstore.XML_ACCEPT_THRESHOLD_KEY)
+            params['profile'] = None if profile_node.empty() else profile_node.string()
+            params['crop_size'] = None if crop_node.empty() else int(crop_node.real())
+            params['accept_threshold'] = None if threshold_node.empty() else threshold_node.real()
+            self._load_params(params)
+            hist_node = node.getNode('histograms')
+            histograms = np.empty((hist_node.size(), self.dimension), dtype=np.float32)
+            for row in range(hist_node.size()):
+                histograms[row] = hist_node.at(row).mat().ravel()
+            labels_node = node.getNode('labels')
+            labels = labels_node.mat() if not labels_node.empty() else None
+        finally:
+            fs.release()
+        self._set_data(histograms, labels if labels is not None else np.empty((0,), dtype=np.int32))
+
+    def save(self, path):
+        if modelstore.is_sharded_path(path):
+            self._save_shards(str(path))
+            return
+        if modelstore.is_store_path(path):
+            self._save_store(str(path))
+            return
+        fs = cv2.FileStorage(path, cv2.FILE_STORAGE_WRITE)
+        try:
+            fs.startWriteStruct('opencv_lbphfaces', cv2.FileNode_MAP)
+            fs.write('threshold', float(self.threshold))
+            fs.write('radius', self.radius)
+            fs.write('neighbors', self.neighbors)
+            fs.write('grid_x', self.grid_x)
+            fs.write('grid_y', self.grid_y)
+            fs.startWriteStruct('histograms', cv2.FileNode_SEQ)
+            for row in self.histograms:
+                fs.write('', row.reshape(1, -1))
+            fs.endWriteStruct()
+            fs.write('labels', self.labels.reshape(-1, 1))
+            fs.startWriteStruct('labelsInfo', cv2.FileNode_MAP)
+            fs.endWriteStruct()
+            fs.endWriteStruct()
+            modelstore.write_xml_meta(fs, self.profile, self.crop_size, self.accept_threshold)
+        finally:
+            fs.release()
+
+    def _save_store(self, path):
+        persisted_path, persisted_rows = self._persisted or (None, 0)
+        if (persisted_path == path and os.path.exists(path)
+                and modelstore.count(path) == persisted_rows <= len(self.labels)
+                and self._header_matches(path)):
+            # baris lama dan parameter tidak berubah sejak dibaca, cukup tambahkan baris baru
+            if persisted_rows < len(self.labels):
+                modelstore.append(path, self.histograms[persisted_rows:], self.labels[persisted_rows:])
+        else:
+            modelstore.write(path, self.params, self.histograms, self.labels)
+        self._persisted = (path, len(self.labels))
+
+    def _header_matches(self, path):
+        header = modelstore.read_header(path)
+        return all(header.get(key) == value for key, value in self.params.items())
+
+    def _save_shards(self, path):
+        manifest = modelstore.read_manifest(path)
+        incremental = self._shard_source == path and manifest['params'] == self.params
+        labels = self._dirty_labels if incremental else set(np.unique(self.labels).tolist())
+        shards = {label: self.histograms[self.labels == label] for label in labels}
+        removed = self._removed_labels - labels if incremental else set()
+        modelstore.write_shards(path, self.params, shards, removed=removed, replace_all=not incremental)
+        self._reset_tracking(shard_source=path)
+
+    def train(self, faces, labels):
+        self._set_data(self.compute_histograms(faces), labels)
+        self._reset_tracking()
+
+    def update(self, faces, labels):
+        new_histograms = self.compute_histograms(faces)
+        labels = np.asarray(labels, dtype=np.int32).ravel()
+        self._dirty_labels.update(labels.tolist())
+        # indeks centroid (kalau sudah dibangun) cukup ditambah histogram baru
+        if self._index is not None:
+            self._index.add(new_histograms, labels, first_row=len(self.histograms))
+        self._set_data(
+            np.concatenate([self.histograms, new_histograms]),
+            np.concatenate([self.labels, labels]),
+            index=self._index
+        )
+
+    def remove_label(self, label):
+        keep = self.labels != int(label)
+        if keep.all():
+            return
+        self._set_data(self.histograms[keep], self.labels[keep])
+        self._persisted = None
+        self._dirty_labels.discard(int(label))
+        self._removed_labels.add(int(label))
+
+    def distances(self, query, rows=None):
+        """Jarak satu histogram query ke semua histogram tersimpan, atau hanya ke baris `rows`."""
+        if self.metric == 'l2':
+            if self._sq_norms is None:
+                self._sq_norms = np.einsum('ij,ij->i', self.histograms, self.histograms, dtype=np.float64)
+            return l2_distances(self.histograms, self._sq_norms, query, rows)
+        return chisqr_distances(self.histograms, self.row_sums, query, rows)
+
+    def _nearest(self, query, exhaustive=False):
+        rows = None
+        if not exhaustive and self.top_k and len(self.index) > self.top_k:
+            rows = self.index.candidate_rows(query, self.top_k, self.metric)
+        dist = self.distances(query, rows)
+        best = int(np.argmin(dist))
+        if dist[best] < self.threshold:
+            row = best if rows is None else rows[best]
+            return int(self.labels[row]), float(dist[best])
+        return -1, DBL_MAX
+
+    def index_recall(self, faces):
+        """Persentase query yang hasil top-K index-nya sama dengan pencarian exhaustive."""
+        queries = self.compute_histograms(faces)
+        hits = sum(self._nearest(query) == self._nearest(query, exhaustive=True) for query in queries)
+        return hits / len(queries) if len(queries) else 1.0
+
+    def predict(self, face):
+        return self.predict_many([face])[0]
+
+    def predict_many(self, faces):
+        if len(self.histograms) == 0:
+            raise ValueError("model LBPH belum dilatih")
+        queries = self.compute_histograms(faces)
+        return [self._nearest(query) for query in queries]
+
+
+BACKENDS = {
+    OpenCVLBPHBackend.name: OpenCVLBPHBackend,
+    VectorLBPHBackend.name: VectorLBPHBackend,
+}
+
+
+def get_recognizer(name=None, profile=None, **kwargs):
+    """
+    Membuat backend sesuai settings.FACE_RECOGNIZER_BACKEND (default 'lbph') dengan parameter
+    dari profil model (nama profil atau dict dari profiles.model_profile, default FACE_MODEL_PROFILE).
+    """
+    name = name or settings.FACE_RECOGNIZER_BACKEND
+    try:
+        backend_class = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"backend recognizer '{name}' tidak dikenal, pilih salah satu: {', '.join(BACKENDS)}")
+    profile = profiles.get_profile(profile)
+    options = dict(profiles.lbph_params(profile), profile=profile['name'], crop_size=profile['crop_size'],
+                   accept_threshold=profile.get('accept_threshold'))
+    options.update(kwargs)
+    return backend_class(**options)
+
+
+_loaded = {}
+_loaded_lock = threading.Lock()
+
+
+def model_signature(path):
+    """
+    Penanda versi file model: (inode, mtime, ukuran) file yang diganti saat model disimpan.
+    Layout .shards cukup manifest-nya, .lbph termasuk file label karena append menulis di tempat.
+    """
+    if modelstore.is_sharded_path(path):
+        files = [os.path.join(path, modelstore.MANIFEST)]
+    elif modelstore.is_store_path(path):
+        files = modelstore.store_files(path)
+    else:
+        files = [path]
+    signature = []
+    for name in files:
+        try:
+            stat = os.stat(name)
+        except FileNotFoundError:
+            signature.append(None)
+            continue
+        signature.append((stat.st_ino, stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+def _store_generation(path):
+    return modelstore.read_header(path).get('generation') if modelstore.is_store_path(path) else None
+
+
+def _reuse_index(previous, recognizer, generation):
+    """
+    Model .lbph yang hanya ditambah baris (generation sama, baris lama tidak berubah): indeks
+    centroid model sebelumnya disalin lalu ditambah baris baru saja, tanpa membangun ulang.
+    """
+    if previous is None or previous[2] is None or previous[2] != generation:
+        return False
+    old = previous[1]
+    if not isinstance(old, VectorLBPHBackend) or old._index is None:
+        return False
+    rows = len(old.labels)
+    if len(recognizer.labels) < rows or not np.array_equal(recognizer.labels[:rows], old.labels):
+        return False
+    index = old._index.copy()
+    index.add(recognizer.histograms[rows:], recognizer.labels[rows:], first_row=rows)
+    recognizer._index = index
+    return True
+
+
+def load_model(path):
+    """
+    Backend yang sudah membaca model `path`, di-cache per proses selama file model tidak
+    berubah. Hasilnya dipakai bersama antar request (dan thread), jadi hanya untuk predict:
+    training harus memakai get_recognizer() + read() sendiri. Setelah training menambah
+    wajah ke model .lbph, indeks centroid backend 'vector' diperbarui inkremental; format lain
+    membangun ulang indeksnya.
+    """
+    key = (settings.FACE_RECOGNIZER_BACKEND, settings.FACE_MODEL_PROFILE, str(path))
+    # signature diambil sebelum read: kalau model diganti di tengah read, request berikutnya membaca ulang
+    signature = model_signature(path)
+    with _loaded_lock:
+        cached = _loaded.get(key)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    generation = _store_generation(path)
+    recognizer = get_recognizer()
+    recognizer.read(path)
+    if isinstance(recognizer, VectorLBPHBackend) and recognizer.top_k and not _reuse_index(cached, recognizer, generation):
+        # index dibangun sekali di sini, bukan di request pertama yang memakainya
+        recognizer.index
+    with _loaded_lock:
+        _loaded[key] = (signature, recognizer, generation)
+    return recognizer
+
+
+def clear_loaded():
+    with _loaded_lock:
+        _loaded.clear()
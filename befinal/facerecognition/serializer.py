@@ -1,4 +1,8 @@
+from collections import Counter
+from django.conf import settings
+from django.core.files.storage import default_storage
 from rest_framework import serializers
+from users.models import User
 from .models import Datawajahnew,Logsmartaccess2
 class Imagedatawajahserializernew(serializers.ModelSerializer):
     class Meta:
@@ -9,3 +13,61 @@ class Logsmartaccesserializernew(serializers.ModelSerializer):
     class Meta:
         model=Logsmartaccess2
         fields='__all__'
+class Logsmartaccessbulkitemserializer(serializers.Serializer):
+    """Satu event akses dari batch terminal, crop merujuk ke nama part file di multipart"""
+    face_id=serializers.CharField(max_length=10,required=False,allow_null=True,allow_blank=True)
+    status=serializers.CharField(max_length=255)
+    confidence=serializers.FloatField(required=False,allow_null=True)
+    timestamp=serializers.DateTimeField(required=False)
+    crop=serializers.CharField(required=False,allow_blank=True)
+    idempotency_key=serializers.CharField(max_length=255,required=False,allow_blank=True)
+
+    def validate_face_id(self,value):
+        return value or None
+
+    def validate_crop(self,value):
+        if value and value not in self.context.get('files',{}):
+            raise serializers.ValidationError(f"file crop '{value}' tidak ada di request.")
+        return value or None
+
+class Logsmartaccessbulkserializer(serializers.Serializer):
+    records=Logsmartaccessbulkitemserializer(many=True,allow_empty=False)
+
+    def validate_records(self,records):
+        max_records=settings.FACE_BULK_MAX_RECORDS
+        if len(records)>max_records:
+            raise serializers.ValidationError(f"maksimal {max_records} record per batch.")
+        # satu part file hanya boleh dipakai satu record, crop ditulis paralel dari file yang sama
+        crops=Counter(record['crop'] for record in records if record.get('crop'))
+        shared=sorted(crop for crop,count in crops.items() if count>1)
+        if shared:
+            raise serializers.ValidationError(f"file crop dipakai lebih dari satu record: {', '.join(shared)}")
+        # cek semua face_id sekaligus dalam satu query
+        face_ids={record['face_id'] for record in records if record.get('face_id')}
+        known=set(User.objects.filter(face_id__in=face_ids).values_list('face_id',flat=True))
+        unknown=sorted(face_ids-known)
+        if unknown:
+            raise serializers.ValidationError(f"face_id tidak terdaftar: {', '.join(unknown)}")
+        return records
+class Storageurlfield(serializers.ReadOnlyField):
+    """Nama file dari .values() ditampilkan sebagai URL media, sama seperti ImageField"""
+    def to_representation(self,value):
+        return default_storage.url(value) if value else None
+class Imagedatawajahlistserializer(serializers.Serializer):
+    """Versi ringan Imagedatawajahserializernew untuk baris .values()"""
+    id=serializers.IntegerField()
+    user=serializers.IntegerField()
+    image_user=Storageurlfield()
+    created_at=serializers.DateTimeField()
+    updated_at=serializers.DateTimeField()
+class Logsmartaccesslistserializer(serializers.Serializer):
+    """Riwayat akses untuk listing, tanpa instansiasi model"""
+    log_id=serializers.CharField()
+    id_face_user=serializers.CharField()
+    image=Storageurlfield()
+    access_time=serializers.DateTimeField()
+    status=serializers.CharField()
+    confidence=serializers.FloatField(allow_null=True)
+    # event beruntun yang digabung debounce: jumlah frame dan waktu terakhir terlihat
+    hit_count=serializers.IntegerField()
+    last_seen=serializers.DateTimeField()
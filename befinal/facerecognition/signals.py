@@ -0,0 +1,71 @@
+import logging
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from users import caching
+from users.models import User
+from .models import Datawajahnew
+from . import preprocess
+
+logger = logging.getLogger(__name__)
+
+
+def _schedule_removal(face_id, target_user):
+    """Hapus dari model setelah transaksi commit, supaya rollback tidak membuang data wajah."""
+    if not face_id or not str(face_id).isdigit():
+        return
+
+    def remove():
+        from .views import remove_user_data
+        try:
+            remove_user_data(settings.FACE_MODEL_PATH, target_user, int(face_id))
+        except Exception as e:
+            # jangan sampai gagal hapus model membatalkan perubahan user
+            logger.exception("Gagal menghapus data wajah %s: %s", target_user, e)
+
+    transaction.on_commit(remove)
+
+
+@receiver(pre_save, sender=User)
+def remember_face_identity(sender, instance, update_fields=None, **kwargs):
+    """Simpan face_id dan nama lama, karena User.save mengosongkannya saat role bukan OWNER."""
+    instance._previous_face = None
+    if instance.pk is None:
+        return
+    if update_fields is not None and not {'role', 'face_id'} & set(update_fields):
+        return
+    instance._previous_face = (
+        User.objects.filter(pk=instance.pk).values('face_id', 'first_name', 'last_name').first()
+    )
+
+
+@receiver(post_save, sender=User)
+def drop_face_on_role_change(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous_face', None)
+    if previous and previous['face_id'] and previous['face_id'] != instance.face_id:
+        _schedule_removal(previous['face_id'], previous['first_name'] + previous['last_name'])
+
+
+@receiver(post_delete, sender=User)
+def drop_face_on_delete(sender, instance, **kwargs):
+    if instance.face_id:
+        _schedule_removal(instance.face_id, instance.first_name + instance.last_name)
+
+
+@receiver(post_save, sender=Datawajahnew)
+@receiver(post_delete, sender=Datawajahnew)
+def invalidate_face_image_listing(sender, **kwargs):
+    caching.bump(caching.FACE_IMAGES)
+
+
+@receiver(post_delete, sender=Datawajahnew)
+def delete_normalized_image(sender, instance, **kwargs):
+    """Turunan ternormalisasi ikut dihapus setelah commit, file asli dibiarkan seperti sebelumnya."""
+    if not instance.image_user:
+        return
+    try:
+        path = instance.image_user.path
+    except NotImplementedError:
+        return
+    transaction.on_commit(lambda: preprocess.delete_normalized(path))
@@ -1,3 +1,1462 @@
-from django.test import TestCase
+import contextlib
+import hashlib
+import json
+import os
+import tarfile
+import tempfile
+from io import BytesIO, StringIO
+import threading
+import time
+from unittest import mock
+from datetime import timedelta
+import numpy as np
+import cv2
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError
+from django.db.models import F
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from users.models import User
+from . import (benchmark, debounce, detectors, detectwindow, framecache, ingest, logstorage, metrics, modelstore,
+               parallel, preprocess, profiles, recognizer, tracking, uploadhandlers, views, writebehind)
+from .models import Datawajahnew, Logsmartaccess2
+from .benchmark import synthetic_face, synthetic_gallery
+from .recognizer import CentroidIndex, OpenCVLBPHBackend, VectorLBPHBackend, get_recognizer
 
 # Create your tests here.
+MODEL_PATH = os.path.join(settings.BASE_DIR, 'hasiltraining', 'lbph_model.xml')
+
+
+class VectorBackendParityTest(SimpleTestCase):
+    def test_histograms_identical_to_opencv(self):
+        faces = [synthetic_face(seed, size) for seed, size in enumerate((100, 173, 61))]
+        for radius, neighbors in ((1, 8), (2, 8), (1, 4)):
+            opencv = OpenCVLBPHBackend(radius, neighbors)
+            vector = VectorLBPHBackend(radius, neighbors)
+            opencv.train(faces, [1, 2, 3])
+            vector.train(faces, [1, 2, 3])
+            np.testing.assert_array_equal(np.vstack(opencv.model.getHistograms()), vector.histograms)
+
+    def test_predictions_match_opencv(self):
+        faces, labels = synthetic_gallery()
+        opencv, vector = OpenCVLBPHBackend(), VectorLBPHBackend(top_k=0)
+        opencv.train(faces, labels)
+        vector.train(faces, labels)
+        queries = [synthetic_face(seed) for seed in range(10)] + [synthetic_face(500)]
+        for query, (label, distance) in zip(queries, vector.predict_many(queries)):
+            expected_label, expected_distance = opencv.predict(query)
+            self.assertEqual(label, expected_label)
+            self.assertAlmostEqual(distance, expected_distance, places=3)
+
+    def test_reads_existing_model(self):
+        opencv, vector = OpenCVLBPHBackend(), VectorLBPHBackend()
+        opencv.read(MODEL_PATH)
+        vector.read(MODEL_PATH)
+        np.testing.assert_array_equal(np.vstack(opencv.model.getHistograms()), vector.histograms)
+        np.testing.assert_array_equal(opencv.model.getLabels().ravel(), vector.labels)
+        query = synthetic_face(7, 120)
+        label, distance = vector.predict(query)
+        expected_label, expected_distance = opencv.predict(query)
+        self.assertEqual(label, expected_label)
+        self.assertAlmostEqual(distance, expected_distance, places=3)
+
+    def test_model_file_interchangeable(self):
+        faces, labels = synthetic_gallery(users=3)
+        vector = VectorLBPHBackend()
+        vector.train(faces, labels)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'model.xml')
+            vector.save(path)
+            opencv = OpenCVLBPHBackend()
+            opencv.read(path)
+            opencv.update([synthetic_face(99)], [999])
+            opencv.save(path)
+            vector.read(path)
+        self.assertEqual(vector.predict(synthetic_face(99))[0], 999)
+        self.assertEqual(vector.predict(faces[0])[0], labels[0])
+
+    def test_predict_latency_parity(self):
+        faces, labels = synthetic_gallery(users=40, per_user=10)
+        opencv, vector = OpenCVLBPHBackend(), VectorLBPHBackend(top_k=0)
+        opencv.train(faces, labels)
+        vector.train(faces, labels)
+        queries = [synthetic_face(seed) for seed in range(15)]
+
+        def median_ms(predict):
+            timings = []
+            for query in queries:
+                start = time.perf_counter()
+                predict(query)
+                timings.append(time.perf_counter() - start)
+            return np.median(timings) * 1000
+
+        opencv_ms, vector_ms = median_ms(opencv.predict), median_ms(vector.predict)
+        # toleransi longgar supaya tidak flaky di mesin CI yang sibuk
+        self.assertLess(vector_ms, opencv_ms * 3, f"vector {vector_ms:.2f} ms vs lbph {opencv_ms:.2f} ms")
+
+    def test_get_recognizer(self):
+        self.assertIsInstance(get_recognizer('vector'), VectorLBPHBackend)
+        self.assertIsInstance(get_recognizer('lbph'), OpenCVLBPHBackend)
+        with self.assertRaises(ValueError):
+            get_recognizer('eigen')
+
+
+class CentroidIndexTest(SimpleTestCase):
+    def test_recall_against_exhaustive(self):
+        faces, labels = synthetic_gallery(users=30, per_user=4)
+        vector = VectorLBPHBackend(top_k=3)
+        vector.train(faces, labels)
+        queries = [synthetic_face(seed) for seed in range(30)]
+        self.assertGreaterEqual(vector.index_recall(queries), 0.95)
+
+    def test_candidates_scale_with_users_not_images(self):
+        faces, labels = synthetic_gallery(users=20, per_user=6)
+        vector = VectorLBPHBackend(top_k=2)
+        vector.train(faces, labels)
+        query = vector.compute_histograms([synthetic_face(4)])[0]
+        rows = vector.index.candidate_rows(query, 2)
+        self.assertEqual(len(rows), 2 * 6)
+        self.assertIn(104, vector.labels[rows])
+
+    def test_incremental_update_matches_rebuild(self):
+        faces, labels = synthetic_gallery(users=6, per_user=4)
+        incremental, rebuilt = VectorLBPHBackend(top_k=2), VectorLBPHBackend(top_k=2)
+        incremental.train(faces[:10], labels[:10])
+        # indeks sudah dibangun sebelum update, jadi update menambah baris ke indeks yang ada
+        built = incremental.index
+        with mock.patch.object(CentroidIndex, 'add', autospec=True, side_effect=CentroidIndex.add) as add:
+            incremental.update(faces[10:], labels[10:])
+        add.assert_called_once()
+        self.assertIs(incremental.index, built)
+        rebuilt.train(faces, labels)
+        np.testing.assert_array_equal(incremental.index.labels, rebuilt.index.labels)
+        np.testing.assert_allclose(incremental.index.centroids, rebuilt.index.centroids, rtol=1e-5, atol=1e-7)
+        for rows, expected in zip(incremental.index.rows, rebuilt.index.rows):
+            np.testing.assert_array_equal(rows, expected)
+
+
+    @override_settings(FACE_RECOGNIZER_BACKEND='vector')
+    def test_loaded_model_reused_until_file_changes(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.addCleanup(recognizer.clear_loaded)
+        path = os.path.join(tmp.name, 'model.lbph')
+        faces, labels = synthetic_gallery(users=4, per_user=3)
+        backend = VectorLBPHBackend(top_k=2)
+        backend.train(faces[:9], labels[:9])
+        backend.save(path)
+
+        loaded = recognizer.load_model(path)
+        self.assertIsNotNone(loaded._index)
+        with mock.patch.object(VectorLBPHBackend, 'read') as read:
+            self.assertIs(recognizer.load_model(path), loaded)
+        read.assert_not_called()
+
+        # training menambah baris ke .lbph: indeks model lama disalin lalu ditambah baris baru saja
+        backend = VectorLBPHBackend(top_k=2)
+        backend.read(path)
+        backend.update(faces[9:], labels[9:])
+        backend.save(path)
+        with mock.patch.object(CentroidIndex, 'add', autospec=True, side_effect=CentroidIndex.add) as add:
+            reloaded = recognizer.load_model(path)
+        self.assertIsNot(reloaded, loaded)
+        self.assertEqual(add.call_args.kwargs['first_row'], 9)
+        self.assertEqual(len(loaded.index.labels), 3)
+        rebuilt = VectorLBPHBackend(top_k=2)
+        rebuilt.train(faces, labels)
+        np.testing.assert_array_equal(reloaded.index.labels, rebuilt.index.labels)
+        np.testing.assert_allclose(reloaded.index.centroids, rebuilt.index.centroids, rtol=1e-5, atol=1e-7)
+        self.assertEqual(reloaded.predict(faces[10])[0], labels[10])
+
+
+class ModelStoreTest(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.store_path = os.path.join(self.tmp.name, 'model.lbph')
+
+    def test_xml_roundtrip_is_lossless(self):
+        xml_path = os.path.join(self.tmp.name, 'back.xml')
+        self.assertEqual(modelstore.import_xml(MODEL_PATH, self.store_path), 8)
+        modelstore.export_xml(self.store_path, xml_path)
+        with open(MODEL_PATH, 'rb') as original, open(xml_path, 'rb') as exported:
+            original, exported = original.read(), exported.read()
+        # isi model identik, hanya ditambah node metadata profil sebelum tag penutup
+        closing = b'</opencv_storage>\n'
+        self.assertTrue(exported.startswith(original[:-len(closing)]))
+        self.assertEqual(modelstore.read_xml_params(xml_path)['profile'], 'balanced')
+
+    def test_load_is_memmap_and_predicts_like_xml(self):
+        modelstore.import_xml(MODEL_PATH, self.store_path)
+        from_store, from_xml = VectorLBPHBackend(top_k=0), VectorLBPHBackend(top_k=0)
+        from_store.read(self.store_path)
+        from_xml.read(MODEL_PATH)
+        self.assertIsInstance(from_store.histograms, np.memmap)
+        query = synthetic_face(3, 120)
+        self.assertEqual(from_store.predict(query)[0], from_xml.predict(query)[0])
+        self.assertAlmostEqual(from_store.predict(query)[1], from_xml.predict(query)[1], places=6)
+
+    def test_update_appends_without_rewriting(self):
+        faces, labels = synthetic_gallery(users=3)
+        backend = VectorLBPHBackend(top_k=0)
+        backend.train(faces[:5], labels[:5])
+        backend.save(self.store_path)
+        with open(self.store_path, 'rb') as file:
+            before = file.read()
+
+        backend = VectorLBPHBackend(top_k=0)
+        backend.read(self.store_path)
+        backend.update(faces[5:], labels[5:])
+        backend.save(self.store_path)
+        with open(self.store_path, 'rb') as file:
+            after = file.read()
+        self.assertTrue(after.startswith(before))
+        self.assertEqual(modelstore.count(self.store_path), len(faces))
+
+        reloaded = VectorLBPHBackend(top_k=0)
+        reloaded.read(self.store_path)
+        np.testing.assert_array_equal(reloaded.labels, labels)
+        self.assertEqual(reloaded.predict(faces[12])[0], labels[12])
+
+    @override_settings(FACE_RECOGNIZER_BACKEND='lbph')
+    def test_default_backend_appends(self):
+        faces, labels = synthetic_gallery(users=3)
+        backend = get_recognizer()
+        backend.train(faces[:5], labels[:5])
+        backend.save(self.store_path)
+        with open(self.store_path, 'rb') as file:
+            before = file.read()
+
+        backend = get_recognizer()
+        backend.read(self.store_path)
+        backend.update(faces[5:], labels[5:])
+        with mock.patch.object(modelstore, 'write', wraps=modelstore.write) as write:
+            backend.save(self.store_path)
+        write.assert_not_called()
+        with open(self.store_path, 'rb') as file:
+            self.assertTrue(file.read().startswith(before))
+        self.assertEqual(modelstore.count(self.store_path), len(faces))
+        reloaded = get_recognizer()
+        reloaded.read(self.store_path)
+        self.assertEqual(reloaded.predict(faces[12])[0], labels[12])
+
+    def test_interrupted_rewrite_keeps_previous_model(self):
+        faces, labels = synthetic_gallery(users=3)
+        backend = VectorLBPHBackend(top_k=0)
+        backend.train(faces[:6], labels[:6])
+        backend.save(self.store_path)
+        old_labels = modelstore.store_files(self.store_path)[1]
+
+        # crash tepat sebelum rename: label generation baru sudah tertulis, histogram belum diganti
+        with mock.patch('facerecognition.modelstore.os.replace', side_effect=OSError('crash')):
+            with self.assertRaises(OSError):
+                modelstore.write(self.store_path, backend.params, backend.compute_histograms(faces), labels)
+        _, _, stored = modelstore.load(self.store_path)
+        np.testing.assert_array_equal(stored, labels[:6])
+        self.assertEqual(modelstore.store_files(self.store_path)[1], old_labels)
+
+        modelstore.write(self.store_path, backend.params, backend.compute_histograms(faces), labels)
+        self.assertEqual(modelstore.count(self.store_path), len(labels))
+        self.assertFalse(os.path.exists(old_labels))
+
+    def test_inconsistent_files_rejected(self):
+        modelstore.import_xml(MODEL_PATH, self.store_path)
+        histogram_file, labels_file = modelstore.store_files(self.store_path)
+        with open(histogram_file, 'r+b') as file:
+            file.truncate(os.path.getsize(histogram_file) - 4)
+        with self.assertRaises(ValueError):
+            modelstore.load(self.store_path)
+        os.remove(labels_file)
+        with self.assertRaises(ValueError):
+            modelstore.load(self.store_path)
+
+    def test_float16_store_and_opencv_backend(self):
+        modelstore.import_xml(MODEL_PATH, self.store_path, dtype='float16')
+        self.assertEqual(modelstore.read_header(self.store_path)['dtype'], 'float16')
+        opencv = OpenCVLBPHBackend()
+        opencv.read(self.store_path)
+        self.assertEqual(len(opencv.model.getHistograms()), 8)
+
+
+class ShardedModelTest(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, 'lbph_model.shards')
+        self.faces, self.labels = synthetic_gallery(users=3, per_user=4)
+        backend = VectorLBPHBackend(top_k=0)
+        backend.train(self.faces, self.labels)
+        backend.save(self.path)
+
+    def shard_files(self):
+        return {label: entry['file'] for label, entry in modelstore.read_manifest(self.path)['shards'].items()}
+
+    def test_enroll_touches_only_own_shard(self):
+        before = self.shard_files()
+        backend = VectorLBPHBackend(top_k=0)
+        backend.read(self.path)
+        backend.update([synthetic_face(100)], [101])
+        backend.save(self.path)
+        after = self.shard_files()
+        self.assertNotEqual(before['101'], after['101'])
+        self.assertEqual(before['100'], after['100'])
+        self.assertEqual(before['102'], after['102'])
+        self.assertFalse(os.path.exists(os.path.join(self.path, before['101'])))
+
+        reloaded = VectorLBPHBackend(top_k=0)
+        reloaded.read(self.path)
+        self.assertEqual(int((reloaded.labels == 101).sum()), 5)
+
+    @override_settings(FACE_RECOGNIZER_BACKEND='lbph')
+    def test_default_backend_rewrites_only_changed_shard(self):
+        before = self.shard_files()
+        backend = get_recognizer()
+        self.assertIsInstance(backend, OpenCVLBPHBackend)
+        backend.read(self.path)
+        backend.update([synthetic_face(100)], [101])
+        backend.save(self.path)
+        after = self.shard_files()
+        self.assertNotEqual(before['101'], after['101'])
+        self.assertEqual(before['100'], after['100'])
+        self.assertEqual(before['102'], after['102'])
+
+        reloaded = VectorLBPHBackend(top_k=0)
+        reloaded.read(self.path)
+        self.assertEqual(int((reloaded.labels == 101).sum()), 5)
+
+    def test_replace_and_remove_user(self):
+        backend = VectorLBPHBackend(top_k=0)
+        backend.read(self.path)
+        backend.replace_label(100, [synthetic_face(50)])
+        backend.remove_label(102)
+        backend.save(self.path)
+        self.assertEqual(sorted(self.shard_files()), ['100', '101'])
+        self.assertEqual(len(os.listdir(self.path)), 1 + 2 * 2)
+
+        reloaded = VectorLBPHBackend(top_k=0)
+        reloaded.read(self.path)
+        self.assertEqual(int((reloaded.labels == 100).sum()), 1)
+        self.assertEqual(reloaded.predict(synthetic_face(50))[0], 100)
+
+    def test_concurrent_enrollments_keep_every_user(self):
+        store_path = os.path.join(os.path.dirname(self.path), 'model.lbph')
+        backend = VectorLBPHBackend(top_k=0)
+        backend.train(self.faces, self.labels)
+        backend.save(store_path)
+        barrier = threading.Barrier(6)
+        errors = []
+
+        def enroll(path, label, locked):
+            try:
+                barrier.wait()
+                with modelstore.model_lock(path) if locked else contextlib.nullcontext():
+                    backend = VectorLBPHBackend(top_k=0)
+                    backend.read(path)
+                    backend.update([synthetic_face(label)], [label])
+                    backend.save(path)
+            except Exception as error:
+                errors.append(error)
+
+        # .shards: hanya manifest yang dikunci; .lbph: seluruh baca-ubah-tulis seperti training
+        threads = [threading.Thread(target=enroll, args=(self.path, 200 + i, False)) for i in range(3)]
+        threads += [threading.Thread(target=enroll, args=(store_path, 300 + i, True)) for i in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(sorted(self.shard_files()), ['100', '101', '102', '200', '201', '202'])
+        self.assertFalse([name for name in os.listdir(self.path) if name.endswith('.tmp')])
+        reloaded = VectorLBPHBackend(top_k=0)
+        reloaded.read(store_path)
+        self.assertEqual(sorted(set(reloaded.labels.tolist())), [100, 101, 102, 300, 301, 302])
+
+    def test_opencv_backend_reads_shards(self):
+        opencv = OpenCVLBPHBackend()
+        opencv.read(self.path)
+        self.assertEqual(opencv.predict(self.faces[5])[0], self.labels[5])
+
+
+class RemoveUserFromModelTest(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        # log gambar terlatih ditulis relatif ke cwd, sama seperti saat server jalan
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(tmp.name)
+        self.model_path = os.path.join(tmp.name, 'lbph_model.shards')
+        override = override_settings(FACE_MODEL_PATH=self.model_path, FACE_RECOGNIZER_BACKEND='vector')
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.owner = User.objects.create_user(username='owner', email='owner@example.com', password='x',
+                                              role=User.Role.OWNER, first_name='John', last_name='Doe')
+        self.other = User.objects.create_user(username='other', email='other@example.com', password='x',
+                                              role=User.Role.OWNER, first_name='Jane', last_name='Roe')
+        faces, _ = synthetic_gallery(users=2, per_user=3)
+        labels = [int(self.owner.face_id)] * 3 + [int(self.other.face_id)] * 3
+        backend = VectorLBPHBackend(top_k=0)
+        backend.train(faces, labels)
+        backend.save(self.model_path)
+        open('JohnDoe_trained_images.log', 'w').close()
+
+    def model_labels(self):
+        backend = VectorLBPHBackend(top_k=0)
+        backend.read(self.model_path)
+        return set(backend.labels.tolist())
+
+    def test_delete_owner_removes_samples(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.owner.delete()
+        self.assertEqual(self.model_labels(), {int(self.other.face_id)})
+        self.assertFalse(os.path.exists('JohnDoe_trained_images.log'))
+
+    def shard_files(self):
+        return {label: entry['file'] for label, entry in modelstore.read_manifest(self.model_path)['shards'].items()}
+
+    def test_default_backend_touches_only_removed_shard(self):
+        before = self.shard_files()
+        with self.settings(FACE_RECOGNIZER_BACKEND='lbph'):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.owner.delete()
+        self.assertEqual(self.shard_files(), {self.other.face_id: before[self.other.face_id]})
+        self.assertEqual(sorted(os.listdir(self.model_path)),
+                         sorted([modelstore.MANIFEST] + [os.path.basename(name) for name in
+                                 modelstore.store_files(os.path.join(self.model_path, before[self.other.face_id]))]))
+
+    def test_role_change_removes_samples(self):
+        face_id = int(self.owner.face_id)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.owner.role = User.Role.BUYER
+            self.owner.save()
+        self.assertNotIn(face_id, self.model_labels())
+        self.assertIn(int(self.other.face_id), self.model_labels())
+
+    def test_unrelated_save_keeps_samples(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.owner.email = 'new@example.com'
+            self.owner.save()
+        self.assertEqual(len(self.model_labels()), 2)
+
+
+class MetricsTest(SimpleTestCase):
+    def test_timer_context_and_decorator(self):
+        histogram = metrics.Histogram('test_stage_seconds', 'test', ('stage',), buckets=(0.5, 1.0))
+
+        with metrics.timer('decode', histogram):
+            pass
+
+        @metrics.timed('decode', histogram)
+        def work():
+            return 'ok'
+
+        self.assertEqual(work(), 'ok')
+        self.assertEqual(histogram.snapshot(stage='decode')['count'], 2)
+        self.assertIsNone(histogram.snapshot(stage='detect'))
+
+    def test_prometheus_text(self):
+        histogram = metrics.Histogram('test_render_seconds', 'test', ('stage',), buckets=(0.5, 1.0))
+        histogram.observe(0.2, stage='predict')
+        histogram.observe(0.7, stage='predict')
+        lines = histogram.render()
+        self.assertIn('# TYPE test_render_seconds histogram', lines)
+        self.assertIn('test_render_seconds_bucket{stage="predict",le="0.5"} 1', lines)
+        self.assertIn('test_render_seconds_bucket{stage="predict",le="1.0"} 2', lines)
+        self.assertIn('test_render_seconds_bucket{stage="predict",le="+Inf"} 2', lines)
+        self.assertIn('test_render_seconds_count{stage="predict"} 2', lines)
+
+    def test_metrics_endpoint(self):
+        with metrics.timer('nms'):
+            pass
+        response = self.client.get('/face/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        self.assertIn('face_pipeline_stage_seconds_count{stage="nms"}', response.content.decode())
+
+
+class BenchmarkCommandTest(SimpleTestCase):
+    def test_writes_json_report(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, 'bench.json')
+            call_command('benchface', '--users', '3', '--frames', '320x240', '--faces', '1', '--boxes', '5',
+                         '--repeat', '2', '--train-images', '1', '--train-repeat', '1', '--backend', 'vector',
+                         '--model-format', 'lbph', '--skip-endpoint', '--output', output,
+                         stdout=StringIO(), stderr=StringIO())
+            with open(output) as file:
+                report = json.load(file)
+        results = report['results']
+        self.assertEqual(set(results), {'nms', 'model_load', 'recognize', 'training'})
+        self.assertEqual(results['recognize'][0]['recognized'], 1)
+        for key in ('p50_ms', 'p95_ms', 'throughput_per_s'):
+            self.assertIn(key, results['training'])
+        rows = benchmark.compare(report, report)
+        self.assertTrue(rows)
+        self.assertFalse(any(regressed for *_, regressed in rows))
+
+
+class ProfilingMiddlewareTest(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.directory = tmp.name
+
+    def profiles(self):
+        return [name for name in os.listdir(self.directory) if name.endswith('.prof')]
+
+    def test_header_triggers_profile_and_report(self):
+        with self.settings(FACE_PROFILING_ENABLED=True, FACE_PROFILING_DIR=self.directory):
+            response = self.client.get('/face/metrics/', headers={'X-Face-Profile': '1'})
+            self.assertEqual(self.profiles(), [response['X-Face-Profile']])
+            self.assertIn('_metrics_view_', response['X-Face-Profile'])
+
+            self.client.get('/face/metrics/')
+            self.assertEqual(len(self.profiles()), 1)
+
+            out = StringIO()
+            call_command('profilereport', '--top', '5', stdout=out)
+        self.assertIn('1 profile digabung', out.getvalue())
+        self.assertIn('render_prometheus', out.getvalue())
+
+    def test_sample_rate(self):
+        with self.settings(FACE_PROFILING_ENABLED=True, FACE_PROFILING_DIR=self.directory,
+                           FACE_PROFILING_SAMPLE_RATE=1.0):
+            self.client.get('/face/metrics/')
+        self.assertEqual(len(self.profiles()), 1)
+
+    def test_disabled_ignores_header(self):
+        with self.settings(FACE_PROFILING_DIR=self.directory):
+            response = self.client.get('/face/metrics/', headers={'X-Face-Profile': '1'})
+        self.assertNotIn('X-Face-Profile', response)
+        self.assertEqual(self.profiles(), [])
+
+
+class ListingQueryTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username='owner', email='owner@example.com', password='x',
+                                              role=User.Role.OWNER, first_name='John', last_name='Doe')
+        self.empty = User.objects.create_user(username='empty', email='empty@example.com', password='x',
+                                              role=User.Role.OWNER, first_name='Jane', last_name='Roe')
+
+    def test_user_logs_single_query(self):
+        for index in range(3):
+            Logsmartaccess2.objects.create(id_face_user=self.owner, status='Authorized', confidence=80 + index,
+                                           image=f"tracking/{index}.jpeg")
+        with self.assertNumQueries(1):
+            response = self.client.get('/face/getuserlogsmartnew/', {'username': 'owner'})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()['data']
+        self.assertEqual(len(data), 3)
+        self.assertEqual(data[0]['id_face_user'], self.owner.face_id)
+        self.assertEqual(data[0]['confidence'], 82)
+        self.assertEqual(data[0]['image'], '/media/tracking/2.jpeg')
+        self.assertEqual(data[0]['hit_count'], 1)
+        self.assertIsNotNone(data[0]['last_seen'])
+
+    def test_user_logs_missing_user_or_logs(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/face/getuserlogsmartnew/', {'username': 'nobody'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['message'], 'username tidak ditemukan')
+        response = self.client.get('/face/getuserlogsmartnew/', {'username': 'empty'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get('/face/getuserlogsmartnew/')
+        self.assertEqual(response.status_code, 400)
+
+    def test_user_images_single_query(self):
+        for index in range(2):
+            Datawajahnew.objects.create(user=self.owner, image_user=f"imagetraining/JohnDoe/{index}.jpg")
+        with self.assertNumQueries(1):
+            response = self.client.get('/face/getuserimageexists/', {'username': 'owner'})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()['data']
+        self.assertEqual([item['image_user'] for item in data],
+                         ['/media/imagetraining/JohnDoe/0.jpg', '/media/imagetraining/JohnDoe/1.jpg'])
+        self.assertEqual({item['user'] for item in data}, {self.owner.id})
+
+    def test_user_images_missing(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/face/getuserimageexists/', {'username': 'empty'})
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.json()['error'], 'gambar user tidak ditemukan')
+        response = self.client.get('/face/getuserimageexists/', {'username': 'nobody'})
+        self.assertEqual(response.json()['error'], 'username does not exist')
+
+    def test_user_images_cached_until_new_image(self):
+        Datawajahnew.objects.create(user=self.owner, image_user='imagetraining/JohnDoe/0.jpg')
+        first = self.client.get('/face/getuserimageexists/', {'username': 'owner'})
+        with self.assertNumQueries(0):
+            response = self.client.get('/face/getuserimageexists/', {'username': 'owner'},
+                                       headers={'If-None-Match': first['ETag']})
+        self.assertEqual(response.status_code, 304)
+        # ETag berbeda per username
+        other = self.client.get('/face/getuserimageexists/', {'username': 'empty'})
+        self.assertNotEqual(other['ETag'], first['ETag'])
+
+        Datawajahnew.objects.create(user=self.owner, image_user='imagetraining/JohnDoe/1.jpg')
+        response = self.client.get('/face/getuserimageexists/', {'username': 'owner'},
+                                   headers={'If-None-Match': first['ETag']})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['data']), 2)
+
+
+class StreamingUploadTest(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        workdir = benchmark.working_directory(tmp.name)
+        workdir.__enter__()
+        self.addCleanup(workdir.__exit__, None, None, None)
+        override = override_settings(MEDIA_ROOT=os.path.join(tmp.name, 'media'),
+                                     FACE_MODEL_PATH=os.path.join(tmp.name, 'model.lbph'),
+                                     FACE_RECOGNIZER_BACKEND='vector')
+        override.enable()
+        self.addCleanup(override.disable)
+        self.owner = User.objects.create_user(username='owner', email='owner@example.com', password='x',
+                                              role=User.Role.OWNER, first_name='John', last_name='Doe')
+
+    def frame(self, seed):
+        ok, buffer = cv2.imencode('.jpg', benchmark.synthetic_frame(240, 320, 1, seed=seed))
+        return buffer.tobytes()
+
+    def enroll(self, *payloads):
+        files = [SimpleUploadedFile(f"{index}.jpg", payload, 'image/jpeg') for index, payload in enumerate(payloads)]
+        return self.client.post('/face/createimagetrainingusernew/', {'username': 'owner', 'image_list': files})
+
+    def test_enroll_streams_and_hashes(self):
+        first, second = self.frame(1), self.frame(2)
+        response = self.enroll(first, second)
+        self.assertEqual(response.status_code, 200)
+        rows = Datawajahnew.objects.filter(user=self.owner)
+        self.assertEqual(sorted(rows.values_list('sha256', flat=True)),
+                         sorted(hashlib.sha256(payload).hexdigest() for payload in (first, second)))
+        for row in rows:
+            with open(row.image_user.path, 'rb') as file:
+                self.assertEqual(hashlib.sha256(file.read()).hexdigest(), row.sha256)
+        self.assertEqual(os.listdir(uploadhandlers.upload_temp_dir()), [])
+
+        response = self.enroll(first)
+        self.assertEqual(response.json()['skipped'], ['0.jpg'])
+        self.assertEqual(rows.count(), 2)
+
+    def test_enroll_size_limits(self):
+        with self.settings(FACE_UPLOAD_MAX_FILE_SIZE=1000):
+            response = self.enroll(self.frame(1))
+        self.assertEqual(response.status_code, 413)
+        with self.settings(FACE_UPLOAD_MAX_FILES=1):
+            response = self.enroll(self.frame(1), self.frame(2))
+        self.assertEqual(response.status_code, 413)
+        self.assertFalse(Datawajahnew.objects.exists())
+        self.assertEqual(os.listdir(uploadhandlers.upload_temp_dir()), [])
+
+    def test_verify_frame_limit(self):
+        with self.settings(FACE_VERIFY_MAX_FRAME_SIZE=1000):
+            response = self.client.post('/face/createlogusersmartnew/',
+                                        {'image': SimpleUploadedFile('f.jpg', self.frame(1), 'image/jpeg')})
+        self.assertEqual(response.status_code, 413)
+
+    def test_image_buffer_zero_copy(self):
+        payload = self.frame(3)
+        uploaded = uploadhandlers.InMemoryUploadedFile(BytesIO(payload), 'image', 'f.jpg', 'image/jpeg',
+                                                       len(payload), None)
+        buffer = uploadhandlers.image_buffer(uploaded)
+        self.assertFalse(buffer.flags.owndata)
+        self.assertEqual(buffer.tobytes(), payload)
+        del buffer
+
+
+class NormalizedTrainingImageTest(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        override = override_settings(MEDIA_ROOT=tmp.name, FACE_NORMALIZED_MAX_SIDE=200)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.owner = User.objects.create_user(username='owner', email='owner@example.com', password='x',
+                                              role=User.Role.OWNER, first_name='John', last_name='Doe')
+
+    def test_derivative_created_on_save(self):
+        ok, buffer = cv2.imencode('.jpg', benchmark.synthetic_frame(600, 800, 1, seed=4))
+        row = Datawajahnew.objects.create(user=self.owner,
+                                          image_user=SimpleUploadedFile('face.jpg', buffer.tobytes()))
+        target = preprocess.normalized_path(row.image_user.path)
+        self.assertEqual(target, os.path.join(os.path.dirname(row.image_user.path), 'normalized', 'face.jpg.png'))
+        derivative = cv2.imread(target, cv2.IMREAD_UNCHANGED)
+        self.assertEqual(derivative.shape, (150, 200))
+        np.testing.assert_array_equal(preprocess.load_training_image(row.image_user.path), derivative)
+
+    def test_same_stem_kept_apart_and_deleted_with_row(self):
+        rows = []
+        for name, seed in (('face.jpg', 4), ('face.png', 5)):
+            ok, buffer = cv2.imencode(os.path.splitext(name)[1], benchmark.synthetic_frame(60, 80, 1, seed=seed))
+            rows.append(Datawajahnew.objects.create(user=self.owner,
+                                                    image_user=SimpleUploadedFile(name, buffer.tobytes())))
+        targets = [preprocess.normalized_path(row.image_user.path) for row in rows]
+        self.assertNotEqual(targets[0], targets[1])
+        for row, target in zip(rows, targets):
+            np.testing.assert_array_equal(cv2.imread(target, cv2.IMREAD_GRAYSCALE),
+                                          preprocess.read_gray(row.image_user.path))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            rows[0].delete()
+        self.assertFalse(os.path.exists(targets[0]))
+        self.assertTrue(os.path.exists(targets[1]))
+
+    def test_missing_or_stale_derivative_rebuilt(self):
+        path = os.path.join(settings.MEDIA_ROOT, 'face.jpg')
+        cv2.imwrite(path, benchmark.synthetic_frame(100, 120, 1, seed=5))
+        gray = preprocess.load_training_image(path)
+        self.assertEqual(gray.shape, (100, 120))
+        self.assertTrue(os.path.exists(preprocess.normalized_path(path)))
+
+        cv2.imwrite(path, benchmark.synthetic_frame(300, 400, 1, seed=6))
+        os.utime(preprocess.normalized_path(path), (0, 0))
+        self.assertEqual(preprocess.load_training_image(path).shape, (150, 200))
+
+
+class PrepareFaceTest(SimpleTestCase):
+    def test_canonical_size_and_buffer_reuse(self):
+        gray = cv2.cvtColor(benchmark.synthetic_frame(720, 1280, 1, seed=8), cv2.COLOR_BGR2GRAY)
+        close_up = preprocess.prepare_face(gray, (300, 50, 600, 600), size=64)
+        far = preprocess.prepare_face(gray, (10, 10, 40, 40), size=64)
+        kept = preprocess.prepare_face(gray, (300, 50, 600, 600), copy=True, size=64)
+        # tanpa crop_size model, crop tidak di-resize
+        self.assertEqual(preprocess.prepare_face(gray, (10, 10, 40, 30)).shape, (30, 40))
+        self.assertEqual(close_up.shape, (64, 64))
+        self.assertEqual(far.shape, (64, 64))
+        # tanpa copy hasilnya buffer thread yang sama
+        self.assertTrue(np.shares_memory(close_up, far))
+        self.assertFalse(np.shares_memory(kept, far))
+        np.testing.assert_array_equal(kept, cv2.resize(gray[50:650, 300:900], (64, 64), interpolation=cv2.INTER_AREA))
+
+    def test_equalize_and_passthrough(self):
+        gray = cv2.cvtColor(benchmark.synthetic_frame(240, 320, 1, seed=9), cv2.COLOR_BGR2GRAY)
+        with self.settings(FACE_CANONICAL_EQUALIZE=True):
+            face = preprocess.prepare_face(gray, (0, 0, 100, 100), size=32)
+        np.testing.assert_array_equal(
+            face, cv2.equalizeHist(cv2.resize(gray[:100, :100], (32, 32), interpolation=cv2.INTER_AREA)))
+        self.assertEqual(preprocess.prepare_face(gray, (5, 5, 50, 70), size=0).shape, (70, 50))
+
+
+class ModelProfileTest(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+        self.faces, self.labels = synthetic_gallery(users=3, per_user=2, size=64)
+
+    def test_profile_stored_in_every_format(self):
+        for backend in ('lbph', 'vector'):
+            for name in ('model.xml', 'model.lbph', 'model.shards'):
+                path = os.path.join(self.tmp, f"{backend}_{name}")
+                recognizer = get_recognizer(backend, profile='fast')
+                recognizer.train(self.faces, self.labels)
+                recognizer.save(path)
+                for reader in ('lbph', 'vector'):
+                    loaded = get_recognizer(reader, profile='accurate')
+                    loaded.read(path)
+                    self.assertEqual((loaded.profile, loaded.crop_size), ('fast', 64), (backend, name, reader))
+                    self.assertEqual(loaded.accept_threshold, 12, (backend, name, reader))
+                self.assertEqual(profiles.model_profile(path)['name'], 'fast')
+                self.assertEqual(profiles.model_profile(path)['accept_threshold'], 12)
+                self.assertEqual(profiles.model_profile(path)['grid_x'], 4)
+        self.assertEqual(modelstore.read_header(os.path.join(self.tmp, 'vector_model.lbph'))['profile'], 'fast')
+
+    def test_legacy_model_and_new_model_profile(self):
+        path = os.path.join(self.tmp, 'legacy.xml')
+        legacy = cv2.face.LBPHFaceRecognizer.create(1, 8, 8, 8)
+        legacy.train(self.faces, np.asarray(self.labels, dtype=np.int32))
+        legacy.save(path)
+        recognizer = get_recognizer('lbph', profile='fast')
+        recognizer.read(path)
+        # model lama tanpa metadata crop dilatih dari crop asli, jadi tidak di-resize
+        self.assertEqual((recognizer.profile, recognizer.crop_size), ('balanced', 0))
+        self.assertEqual(recognizer.accept_threshold, 50)
+        self.assertEqual(profiles.model_profile(path)['crop_size'], 0)
+
+        missing = os.path.join(self.tmp, 'baru.lbph')
+        self.assertEqual(profiles.model_profile(missing)['name'], 'balanced')
+        with self.settings(FACE_MODEL_PROFILE='fast'):
+            self.assertEqual(profiles.model_profile(missing)['crop_size'], 64)
+            self.assertEqual(profiles.model_profile(path)['name'], 'balanced')
+        with self.assertRaises(ValueError):
+            get_recognizer('vector', profile='tidakada')
+
+    def test_accept_threshold_kept_when_profile_changes(self):
+        path = os.path.join(self.tmp, 'model.lbph')
+        recognizer = get_recognizer('vector', profile='accurate')
+        recognizer.train(self.faces, self.labels)
+        recognizer.save(path)
+        # ambang yang tercatat di model yang dipakai, bukan nilai profil di settings saat ini
+        accurate = dict(settings.FACE_MODEL_PROFILES['accurate'], accept_threshold=80)
+        with self.settings(FACE_MODEL_PROFILES=dict(settings.FACE_MODEL_PROFILES, accurate=accurate)):
+            loaded = get_recognizer('vector')
+            loaded.read(path)
+            self.assertEqual(loaded.accept_threshold, 95)
+            self.assertEqual(get_recognizer('lbph', profile='accurate').accept_threshold, 80)
+        # model dengan parameter LBPH di luar profil mana pun memakai ambang bawaan
+        self.assertEqual(VectorLBPHBackend(grid_x=6, grid_y=6, profile=None).accept_threshold, 50)
+
+    def test_compare_command(self):
+        output = os.path.join(self.tmp, 'profiles.json')
+        call_command('compareprofiles', users=4, per_user=3, probes=1, repeat=1, output=output,
+                     stdout=StringIO(), stderr=StringIO())
+        with open(output) as file:
+            rows = {row['profile']: row for row in json.load(file)['results']['profiles']}
+        self.assertEqual(set(rows), {'fast', 'balanced', 'accurate'})
+        self.assertLess(rows['fast']['model_bytes'], rows['balanced']['model_bytes'])
+        self.assertLess(rows['balanced']['model_bytes'], rows['accurate']['model_bytes'])
+        self.assertEqual(rows['fast']['crop_size'], 64)
+        self.assertEqual(rows['fast']['accept_threshold'], 12)
+
+
+class LegacyModelTest(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, 'lbph_model.xml')
+        override = override_settings(MEDIA_ROOT=os.path.join(tmp.name, 'media'), FACE_MODEL_PATH=self.path,
+                                     FACE_FRAME_CACHE_TTL=0, FACE_DEBOUNCE_SECONDS=0)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.addCleanup(recognizer.clear_loaded)
+        self.owner = User.objects.create_user(username='owner', email='owner@example.com', password='x',
+                                              role=User.Role.OWNER, first_name='John', last_name='Doe')
+
+    def test_legacy_model_recognises_owner(self):
+        # model format lama: XML OpenCV tanpa metadata profil, dilatih dari crop asli (belum di-resize)
+        frame = benchmark.synthetic_frame(480, 640, 1, seed=0)
+        ok, buffer = cv2.imencode('.jpg', frame)
+        gray = cv2.cvtColor(cv2.imdecode(buffer, cv2.IMREAD_COLOR), cv2.COLOR_BGR2GRAY)
+        face = preprocess.prepare_face(gray, detectors.get_detector().detect(gray)[0], copy=True, size=0)
+        legacy = cv2.face.LBPHFaceRecognizer.create()
+        legacy.train([face] * 3, np.full(3, int(self.owner.face_id), dtype=np.int32))
+        legacy.save(self.path)
+        self.assertNotIn('crop_size', modelstore.read_xml_params(self.path))
+
+        response = self.client.post('/face/createlogusersmartnew/',
+                                    {'image': SimpleUploadedFile('f.jpg', buffer.tobytes(), 'image/jpeg')})
+        result = response.json()['result'][0]
+        self.assertEqual(result['status'], 'Authorized')
+        self.assertEqual(result['id_face_user'], self.owner.face_id)
+        self.assertGreater(result['confidence'], 90)
+
+
+class DetectorTest(SimpleTestCase):
+    def test_boxes_format_and_cached_per_thread(self):
+        frame = benchmark.synthetic_frame(480, 640, 2, seed=2)
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        detector = detectors.get_detector()
+        self.assertIs(detector, detectors.get_detector('haar'))
+        boxes = detector.detect(gray, color=frame)
+        self.assertEqual((boxes.dtype, boxes.shape[1]), (np.int32, 4))
+        self.assertGreaterEqual(len(boxes), 1)
+        self.assertEqual(detector.detect(np.zeros((120, 160), np.uint8)).shape, (0, 4))
+
+    def test_variant_via_type_and_missing_file(self):
+        variants = dict(settings.FACE_DETECTORS, large={'type': 'haar', 'path': settings.FACE_DETECTORS['haar']['path'],
+                                                        'min_size': 400})
+        gray = cv2.cvtColor(benchmark.synthetic_frame(480, 640, 1, seed=1), cv2.COLOR_BGR2GRAY)
+        with self.settings(FACE_DETECTORS=variants):
+            large = detectors.get_detector('large')
+            self.assertIsInstance(large, detectors.HaarDetector)
+            self.assertEqual(len(large.detect(gray)), 0)
+            self.assertGreaterEqual(len(large.detect(gray, min_size=0)), 1)
+        missing = dict(settings.FACE_DETECTORS, lbp={'path': 'hasiltraining/tidakada.xml'})
+        with self.settings(FACE_DETECTORS=missing):
+            with self.assertRaises(FileNotFoundError):
+                detectors.create_detector('lbp')
+            with self.assertRaises(ValueError):
+                detectors.create_detector('tidakada')
+
+    def test_benchdetector_command(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, 'detectors.json')
+            missing = dict(settings.FACE_DETECTORS, lbp={'path': 'hasiltraining/tidakada.xml'})
+            with self.settings(FACE_DETECTORS=missing):
+                call_command('benchdetector', detectors=['haar', 'lbp'], limit=3, repeat=1, output=output,
+                             stdout=StringIO(), stderr=StringIO())
+            with open(output) as file:
+                rows = {row['detector']: row for row in json.load(file)['results']['detectors']}
+        self.assertEqual(rows['haar']['images'], 3)
+        self.assertIn('recall', rows['haar'])
+        self.assertIn('skipped', rows['lbp'])
+
+
+@override_settings(FACE_ADAPTIVE_MIN_SAMPLES=3)
+class DetectionWindowTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.detector = detectors.get_detector()
+
+    def frame_with_face(self, top, left):
+        frame = np.full((720, 1280, 3), 128, np.uint8)
+        frame[top:top + 260, left:left + 240] = benchmark.synthetic_frame(260, 240, 1, seed=3)
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), frame
+
+    def test_compute_window(self):
+        window = detectwindow.compute_window([[100, 100, 80, 80], [120, 110, 120, 120]], (720, 1280), min_size=50)
+        self.assertEqual(window.roi, (75, 75, 265, 255))
+        self.assertEqual(window.min_size, 61)
+        self.assertEqual(window.max_size, 148)
+
+    def test_window_after_samples_and_fallback(self):
+        gray, frame = self.frame_with_face(200, 500)
+        full = self.detector.detect(gray, color=frame)
+        counts = lambda: {key[0]: value for key, value in detectwindow.WINDOW_RESULTS._values.items()}
+        before = counts()
+        for _ in range(3):
+            detectwindow.detect(self.detector, gray, frame, terminal='pintu1')
+        window = detectwindow.get_window('pintu1', gray.shape, self.detector.min_size)
+        self.assertIsNotNone(window)
+        boxes = detectwindow.detect(self.detector, gray, frame, terminal='pintu1')
+        self.assertEqual(len(boxes), len(full))
+        np.testing.assert_allclose(boxes, full, atol=4)
+        self.assertEqual(counts().get('window', 0) - before.get('window', 0), 1)
+
+        # wajah pindah keluar ROI: jendela kosong, scan penuh tetap menemukan wajah
+        moved_gray, moved = self.frame_with_face(400, 50)
+        boxes = detectwindow.detect(self.detector, moved_gray, moved, terminal='pintu1')
+        self.assertEqual(len(boxes), 1)
+        self.assertLess(boxes[0][0], 300)
+        self.assertEqual(counts().get('fallback', 0) - before.get('fallback', 0), 1)
+        # tanpa terminal selalu scan penuh
+        np.testing.assert_array_equal(detectwindow.detect(self.detector, gray, frame), full)
+
+    def test_terminal_id_from_header_or_field(self):
+        from rest_framework.request import Request
+        from rest_framework.parsers import FormParser
+        from rest_framework.test import APIRequestFactory
+        factory = APIRequestFactory()
+        request = Request(factory.post('/', {}, HTTP_X_TERMINAL_ID='pintu-depan'), parsers=[FormParser()])
+        self.assertEqual(detectwindow.terminal_id(request), 'pintu-depan')
+        request = Request(factory.post('/', 'terminal_id=lobby.2', content_type='application/x-www-form-urlencoded'),
+                          parsers=[FormParser()])
+        self.assertEqual(detectwindow.terminal_id(request), 'lobby.2')
+        request = Request(factory.post('/', {}, HTTP_X_TERMINAL_ID='../etc'), parsers=[FormParser()])
+        self.assertIsNone(detectwindow.terminal_id(request))
+
+
+@override_settings(FACE_TRACK_DETECT_INTERVAL=5, FACE_TRACK_REPREDICT_INTERVAL=10)
+class FaceTrackerTest(SimpleTestCase):
+    def setUp(self):
+        self.face = cv2.cvtColor(benchmark.synthetic_frame(260, 240, 1, seed=3), cv2.COLOR_BGR2GRAY)
+        self.detector = detectors.get_detector()
+        self.detect_calls = 0
+
+    def frame(self, x, y):
+        gray = np.full((480, 800), 128, np.uint8)
+        if x is not None:
+            gray[y:y + 260, x:x + 240] = self.face
+        return gray
+
+    def detect(self, gray):
+        self.detect_calls += 1
+        return self.detector.detect(gray)
+
+    def test_tracks_between_detections_and_caches_prediction(self):
+        tracker = tracking.FaceTracker()
+        predicted = []
+        for index in range(20):
+            gray = self.frame(200 + 4 * index, 100 + index % 3)
+            tracks = tracker.update(gray, self.detect)
+            self.assertEqual(len(tracks), 1)
+            truth = self.detector.detect(gray)[0]
+            self.assertLessEqual(abs(tracks[0].box[0] - truth[0]), 6)
+            self.assertLessEqual(abs(tracks[0].box[1] - truth[1]), 6)
+            tracker.predict(tracks[0], lambda: predicted.append(index) or (7, 12.0))
+        self.assertEqual(self.detect_calls, 4)
+        self.assertEqual(predicted, [0, 10])
+        self.assertEqual(tracks[0].id, 1)
+
+    def test_lost_track_triggers_detection(self):
+        tracker = tracking.FaceTracker()
+        tracker.update(self.frame(200, 100), self.detect)
+        tracker.update(self.frame(204, 100), self.detect)
+        self.assertEqual(self.detect_calls, 1)
+        self.assertEqual(tracker.update(self.frame(None, None), self.detect), [])
+        self.assertEqual(self.detect_calls, 2)
+
+    def test_tracker_per_terminal(self):
+        tracking.reset_trackers()
+        self.addCleanup(tracking.reset_trackers)
+        self.assertIs(tracking.get_tracker('pintu1'), tracking.get_tracker('pintu1'))
+        with self.settings(FACE_TRACK_MAX_TERMINALS=2):
+            first = tracking.get_tracker('pintu1')
+            tracking.get_tracker('pintu2')
+            tracking.get_tracker('pintu3')
+            self.assertIsNot(tracking.get_tracker('pintu1'), first)
+
+
+class TrackingEndpointTest(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        override = override_settings(MEDIA_ROOT=os.path.join(tmp.name, 'media'),
+                                     FACE_MODEL_PATH=os.path.join(tmp.name, 'model.lbph'),
+                                     FACE_RECOGNIZER_BACKEND='vector', FACE_TRACKING_ENABLED=True,
+                                     FACE_FRAME_CACHE_TTL=0)
+        override.enable()
+        self.addCleanup(override.disable)
+        tracking.reset_trackers()
+        self.addCleanup(tracking.reset_trackers)
+        cache.clear()
+        owner = User.objects.create_user(username='owner', email='owner@example.com', password='x',
+                                         role=User.Role.OWNER, first_name='John', last_name='Doe')
+        benchmark.build_model(settings.FACE_MODEL_PATH, 1, 3, face_ids=[owner.face_id])
+
+    def test_prediction_cached_per_terminal(self):
+        ok, buffer = cv2.imencode('.jpg', benchmark.synthetic_frame(480, 640, 1, seed=1))
+        counts = lambda: dict(tracking.TRACK_PREDICTIONS._values)
+        before = counts()
+        for _ in range(2):
+            response = self.client.post('/face/createlogusersmartnew/',
+                                        {'image': SimpleUploadedFile('f.jpg', buffer.tobytes(), 'image/jpeg')},
+                                        headers={'X-Terminal-Id': 'pintu1'})
+            self.assertEqual(response.status_code, 200)
+        after = counts()
+        self.assertEqual(after.get(('predicted',), 0) - before.get(('predicted',), 0), 1)
+        self.assertEqual(after.get(('cached',), 0) - before.get(('cached',), 0), 1)
+        self.assertEqual(Logsmartaccess2.objects.count(), 2)
+
+
+@override_settings(FACE_PREDICT_WORKERS=4, FACE_CV_THREADS=None)
+class ParallelPredictTest(SimpleTestCase):
+    def setUp(self):
+        parallel.shutdown()
+        self.addCleanup(parallel.shutdown)
+        self.addCleanup(cv2.setNumThreads, cv2.getNumThreads())
+
+    def test_run_keeps_order_on_pool_threads(self):
+        names = parallel.run(lambda item: (item, threading.current_thread().name), range(6))
+        self.assertEqual([item for item, _ in names], list(range(6)))
+        self.assertTrue(all(name.startswith('face-predict') for _, name in names))
+        # satu wajah tidak perlu lewat pool
+        self.assertEqual(parallel.run(lambda item: threading.current_thread().name, [1]),
+                         [threading.current_thread().name])
+        with self.settings(FACE_PREDICT_WORKERS=1):
+            self.assertEqual(set(parallel.run(lambda item: threading.current_thread().name, range(3))),
+                             {threading.current_thread().name})
+
+    def test_cv_threads_shared_with_pool(self):
+        self.assertEqual(parallel.cv_threads(), max(1, (os.cpu_count() or 1) // 4))
+        with self.settings(FACE_CV_THREADS=2):
+            self.assertEqual(parallel.cv_threads(), 2)
+            parallel.get_executor()
+            self.assertEqual(cv2.getNumThreads(), 2)
+
+    def test_shared_recognizer_matches_sequential(self):
+        faces, labels = synthetic_gallery(users=20, per_user=3)
+        queries = [synthetic_face(seed) for seed in range(12)]
+        for backend in (OpenCVLBPHBackend(), VectorLBPHBackend(top_k=3)):
+            backend.train(faces, labels)
+            expected = [backend.predict(query) for query in queries]
+            # model baru (index centroid belum dibangun) dipakai bersama oleh thread pool
+            backend.train(faces, labels)
+            self.assertEqual(parallel.run(backend.predict, queries), expected)
+
+
+class FrameCacheTest(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        override = override_settings(MEDIA_ROOT=os.path.join(tmp.name, 'media'),
+                                     FACE_MODEL_PATH=os.path.join(tmp.name, 'model.lbph'),
+                                     FACE_RECOGNIZER_BACKEND='vector', FACE_FRAME_CACHE_TTL=5)
+        override.enable()
+        self.addCleanup(override.disable)
+        framecache.clear()
+        self.addCleanup(framecache.clear)
+        owner = User.objects.create_user(username='owner', email='owner@example.com', password='x',
+                                         role=User.Role.OWNER, first_name='John', last_name='Doe')
+        benchmark.build_model(settings.FACE_MODEL_PATH, 1, 3, face_ids=[owner.face_id])
+        self.frame = benchmark.synthetic_frame(480, 640, 1, seed=1)
+
+    def post(self, frame, quality=95, terminal='pintu1'):
+        ok, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        headers = {'X-Terminal-Id': terminal} if terminal else {}
+        response = self.client.post('/face/createlogusersmartnew/',
+                                    {'image': SimpleUploadedFile('f.jpg', buffer.tobytes(), 'image/jpeg')},
+                                    headers=headers)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def lookups(self):
+        return dict(framecache.FRAME_CACHE._values)
+
+    def test_dhash_tolerates_reencoding(self):
+        # latar dengan gradasi cahaya seperti kamera pintu sungguhan, latar yang benar-benar rata
+        # membuat bit dHash tidak stabil (paling buruk cache miss, bukan hasil salah)
+        light = np.linspace(-60, 60, 640)[None, :, None] + np.linspace(-30, 30, 480)[:, None, None]
+        frame = np.clip(self.frame + light, 0, 255).astype(np.uint8)
+        reencoded = cv2.imdecode(cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 60])[1], cv2.IMREAD_COLOR)
+        self.assertLessEqual((framecache.dhash(frame) ^ framecache.dhash(reencoded)).bit_count(), 3)
+        self.assertGreater((framecache.dhash(frame) ^ framecache.dhash(255 - frame)).bit_count(), 30)
+
+    def test_retry_reuses_recognition_and_still_logs(self):
+        before = self.lookups()
+        first = self.post(self.frame)
+        with mock.patch('facerecognition.views.recognize_from_image') as recognize:
+            second = self.post(self.frame)
+        recognize.assert_not_called()
+        for key in ('id_face_user', 'status', 'confidence'):
+            self.assertEqual(second['result'][0][key], first['result'][0][key])
+        self.assertEqual(second['confidence'], first['confidence'])
+        # frame yang di-encode ulang tidak dianggap sama tanpa FACE_FRAME_CACHE_MAX_DISTANCE
+        self.post(self.frame, quality=94)
+        after = self.lookups()
+        for result, expected in ((('miss',), 2), (('exact',), 1), (('similar',), 0)):
+            self.assertEqual(after.get(result, 0) - before.get(result, 0), expected)
+        # hasil dari cache tetap tercatat: frame ini Unknown, jadi tiap akses satu baris
+        self.assertEqual(first['result'][0]['status'], 'Unauthorized')
+        self.assertEqual(Logsmartaccess2.objects.count(), 3)
+
+    def test_similar_face_crop_opt_in(self):
+        with self.settings(FACE_FRAME_CACHE_MAX_DISTANCE=3):
+            before = self.lookups()
+            first = self.post(self.frame)
+            with mock.patch.object(VectorLBPHBackend, 'predict') as predict:
+                second = self.post(self.frame, quality=94)
+            predict.assert_not_called()
+        self.assertEqual(self.lookups().get(('similar',), 0) - before.get(('similar',), 0), 1)
+        self.assertEqual(second['result'][0]['status'], first['result'][0]['status'])
+        self.assertEqual(Logsmartaccess2.objects.count(), 2)
+
+    def test_scoped_to_terminal_and_ttl(self):
+        with self.settings(FACE_DEBOUNCE_SECONDS=0):
+            self.post(self.frame)
+            self.post(self.frame, terminal='pintu2')
+            self.post(self.frame, terminal=None)
+            self.post(self.frame)
+        self.assertEqual(Logsmartaccess2.objects.count(), 4)
+        with self.settings(FACE_FRAME_CACHE_TTL=-1):
+            framecache.store('pintu1', 'x', [])
+        self.assertIsNone(framecache.get_exact('pintu1', 'x'))
+
+    def test_size_bounded(self):
+        with self.settings(FACE_FRAME_CACHE_SIZE=2):
+            for index in range(3):
+                framecache.store('pintu1', str(index), [{'index': index}])
+            self.assertIsNone(framecache.get_exact('pintu1', '0'))
+            self.assertEqual(framecache.get_exact('pintu1', '2'), [{'index': 2}])
+
+
+def tracking_files(media):
+    """Semua file di bawah media/tracking sebagai nama storage (relatif terhadap MEDIA_ROOT)."""
+    return sorted(os.path.relpath(os.path.join(root, name), media).replace(os.sep, '/')
+                  for root, _, names in os.walk(os.path.join(media, 'tracking')) for name in names)
+
+
+def train_on_frame(face_id):
+    """Model dilatih dari crop frame seed 0 supaya frame itu dikenali sebagai `face_id`, seed 1 tidak."""
+    frames = {seed: benchmark.synthetic_frame(480, 640, 1, seed=seed) for seed in (0, 1)}
+    gray = cv2.cvtColor(cv2.imdecode(cv2.imencode('.jpg', frames[0])[1], cv2.IMREAD_COLOR), cv2.COLOR_BGR2GRAY)
+    recognizer = get_recognizer()
+    face = preprocess.prepare_face(gray, detectors.get_detector().detect(gray)[0], size=recognizer.crop_size)
+    recognizer.train([face] * 3, [int(face_id)] * 3)
+    recognizer.save(settings.FACE_MODEL_PATH)
+    return frames
+
+
+class AccessDebounceTest(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.media = os.path.join(tmp.name, 'media')
+        override = override_settings(MEDIA_ROOT=self.media, FACE_MODEL_PATH=os.path.join(tmp.name, 'model.lbph'),
+                                     FACE_RECOGNIZER_BACKEND='vector', FACE_FRAME_CACHE_TTL=0,
+                                     FACE_DEBOUNCE_SECONDS=10)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.owner = User.objects.create_user(username='owner', email='owner@example.com', password='x',
+                                              role=User.Role.OWNER, first_name='John', last_name='Doe')
+        self.frames = train_on_frame(self.owner.face_id)
+
+    def post(self, seed):
+        ok, buffer = cv2.imencode('.jpg', self.frames[seed])
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/face/createlogusersmartnew/',
+                                        {'image': SimpleUploadedFile('f.jpg', buffer.tobytes(), 'image/jpeg')})
+        self.assertEqual(response.status_code, 200)
+        return response.json()['result'][0]
+
+    def tracking_files(self):
+        return tracking_files(self.media)
+
+    def test_repeated_frames_merge_into_one_event(self):
+        for _ in range(3):
+            result = self.post(0)
+        self.assertEqual(result['id_face_user'], self.owner.face_id)
+        self.assertEqual(result['hit_count'], 3)
+        log = Logsmartaccess2.objects.get()
+        self.assertEqual(log.hit_count, 3)
+        self.assertGreater(log.last_seen, log.access_time)
+        self.assertEqual(self.tracking_files(), [log.image.name])
+
+    def test_cached_retry_merged_into_event(self):
+        framecache.clear()
+        self.addCleanup(framecache.clear)
+        ok, buffer = cv2.imencode('.jpg', self.frames[0])
+        with self.settings(FACE_FRAME_CACHE_TTL=5):
+            for _ in range(2):
+                with self.captureOnCommitCallbacks(execute=True):
+                    response = self.client.post('/face/createlogusersmartnew/',
+                                                {'image': SimpleUploadedFile('f.jpg', buffer.tobytes(), 'image/jpeg')},
+                                                headers={'X-Terminal-Id': 'pintu1'})
+        self.assertEqual(response.json()['result'][0]['hit_count'], 2)
+        self.assertEqual(Logsmartaccess2.objects.get().hit_count, 2)
+
+    def test_window_expires(self):
+        self.post(0)
+        Logsmartaccess2.objects.update(last_seen=F('last_seen') - timedelta(seconds=11))
+        self.post(0)
+        self.assertEqual(Logsmartaccess2.objects.count(), 2)
+
+    def test_unknown_faces_not_merged(self):
+        self.assertEqual(self.post(1)['id_face_user'], None)
+        self.post(1)
+        self.assertEqual(Logsmartaccess2.objects.count(), 2)
+
+    def test_best_confidence_image_kept(self):
+        self.post(0)
+        log = Logsmartaccess2.objects.get()
+        Logsmartaccess2.objects.update(confidence=log.confidence - 5)
+        self.post(0)
+        merged = Logsmartaccess2.objects.get()
+        self.assertEqual(merged.confidence, log.confidence)
+        self.assertNotEqual(merged.image.name, log.image.name)
+        self.assertEqual(self.tracking_files(), [merged.image.name])
+        self.assertFalse(debounce.is_better(None, merged.confidence))
+
+    def test_accept_threshold_from_model(self):
+        self.assertEqual(self.post(1)['status'], 'Unauthorized')
+        model = get_recognizer()
+        model.read(settings.FACE_MODEL_PATH)
+        model.accept_threshold = 1e6
+        model.save(settings.FACE_MODEL_PATH)
+        result = self.post(1)
+        self.assertEqual((result['status'], result['id_face_user']), ('Authorized', self.owner.face_id))
+
+    def test_merge_writes_image_before_lock(self):
+        self.post(0)
+        log = Logsmartaccess2.objects.get()
+        calls = []
+        write_image = views.Createlogusersmartnew.write_image
+
+        def record_write(view, *args):
+            calls.append('write')
+            return write_image(view, *args)
+
+        def record_lock(*args):
+            calls.append('lock')
+            return debounce.peek_event(*args)
+
+        with mock.patch.object(views.Createlogusersmartnew, 'write_image', autospec=True, side_effect=record_write), \
+                mock.patch.object(debounce, 'open_event', side_effect=record_lock):
+            # frame yang tidak lebih yakin: tidak ada crop yang ditulis sama sekali
+            self.post(0)
+            self.assertEqual(calls, ['lock'])
+            calls.clear()
+            Logsmartaccess2.objects.update(confidence=log.confidence - 5)
+            self.post(0)
+            self.assertEqual(calls, ['write', 'lock'])
+        merged = Logsmartaccess2.objects.get()
+        self.assertEqual(merged.hit_count, 3)
+        self.assertEqual(self.tracking_files(), [merged.image.name])
+
+
+class WriteBehindTest(TransactionTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.media = os.path.join(tmp.name, 'media')
+        override = override_settings(MEDIA_ROOT=self.media, FACE_MODEL_PATH=os.path.join(tmp.name, 'model.lbph'),
+                                     FACE_RECOGNIZER_BACKEND='vector', FACE_FRAME_CACHE_TTL=0,
+                                     FACE_DEBOUNCE_SECONDS=10, FACE_WRITE_BEHIND=True,
+                                     FACE_WRITE_BEHIND_INTERVAL=0.05,
+                                     FACE_WRITE_BEHIND_SPILL_DIR=os.path.join(tmp.name, 'spill'))
+        override.enable()
+        self.addCleanup(override.disable)
+        self.addCleanup(writebehind.shutdown)
+        self.owner = User.objects.create_user(username='owner', email='owner@example.com', password='x',
+                                              role=User.Role.OWNER, first_name='John', last_name='Doe')
+        self.frames = train_on_frame(self.owner.face_id)
+
+    def post(self, seed):
+        ok, buffer = cv2.imencode('.jpg', self.frames[seed])
+        response = self.client.post('/face/createlogusersmartnew/',
+                                    {'image': SimpleUploadedFile('f.jpg', buffer.tobytes(), 'image/jpeg')})
+        self.assertEqual(response.status_code, 200)
+        return response.json()['result'][0]
+
+    def test_events_written_in_background(self):
+        results = [self.post(0) for _ in range(3)] + [self.post(1)]
+        self.assertEqual(results[0]['id_face_user'], self.owner.face_id)
+        self.assertIsNone(results[0]['image'])
+        self.assertTrue(writebehind.get_buffer().flush(timeout=10))
+        self.assertEqual(writebehind.QUEUE_DEPTH.value(), 0)
+        self.assertEqual(writebehind.pending_spills(), [])
+        known = Logsmartaccess2.objects.get(id_face_user=self.owner)
+        self.assertEqual(known.hit_count, 3)
+        self.assertEqual(known.log_id, results[0]['log_id'])
+        self.assertEqual(Logsmartaccess2.objects.filter(id_face_user=None).count(), 1)
+        self.assertEqual(len(tracking_files(self.media)), 2)
+
+    def test_spill_replayed_once(self):
+        record = writebehind.make_record(None, 'Unauthorized', 20.0, timezone.now(), 'Unknown_x.jpeg')
+        ok, buffer = cv2.imencode('.jpg', self.frames[1])
+        writebehind.write_spill(record, buffer.tobytes())
+        out = StringIO()
+        call_command('flushwritebehind', min_age=0, stdout=out)
+        self.assertIn('1 event', out.getvalue())
+        # event yang sama ditulis ulang (crash setelah commit, sebelum spill dihapus)
+        writebehind.write_spill(record, buffer.tobytes())
+        writebehind.replay()
+        log = Logsmartaccess2.objects.get()
+        self.assertEqual(log.log_id, record['log_id'])
+        self.assertTrue(log.image.name.startswith('tracking/'))
+        self.assertEqual(writebehind.pending_spills(), [])
+
+    def test_spill_synced_before_queueing(self):
+        record = writebehind.make_record(None, 'Unauthorized', 20.0, timezone.now(), 'Unknown_x.jpeg')
+        calls = []
+        fsync, replace = os.fsync, os.replace
+        with mock.patch('os.fsync', side_effect=lambda fd: calls.append('fsync') or fsync(fd)), \
+                mock.patch('os.replace', side_effect=lambda *args: calls.append('replace') or replace(*args)):
+            path = writebehind.write_spill(record, b'jpeg')
+        # isi file sebelum rename, direktori setelah rename
+        self.assertEqual(calls, ['fsync', 'replace', 'fsync'])
+        self.assertEqual(writebehind.read_spill(path)[1], b'jpeg')
+
+    def test_known_face_replay_does_not_add_hits(self):
+        ok, buffer = cv2.imencode('.jpg', self.frames[0])
+        start = timezone.now()
+        records = [writebehind.make_record(self.owner.face_id, 'Authorized', 90.0 + index,
+                                           start + timedelta(seconds=index), f"owner_{index}.jpeg")
+                   for index in range(3)]
+        items = [(writebehind.write_spill(record, buffer.tobytes()), record, buffer.tobytes()) for record in records]
+        writebehind.write_batch(items)
+        log = Logsmartaccess2.objects.get()
+        self.assertEqual((log.hit_count, log.log_id), (3, records[0]['log_id']))
+
+        # crash setelah commit tapi sebelum file spill dihapus: semua event di-replay
+        for record in records:
+            writebehind.write_spill(record, buffer.tobytes())
+        self.assertEqual(writebehind.replay(), 3)
+        log.refresh_from_db()
+        self.assertEqual(log.hit_count, 3)
+        self.assertEqual(Logsmartaccess2.objects.count(), 1)
+        self.assertEqual(len(tracking_files(self.media)), 1)
+        self.assertEqual(writebehind.pending_spills(), [])
+
+
+class TrackingLayoutTest(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.media = os.path.join(tmp.name, 'media')
+        self.archive_dir = os.path.join(tmp.name, 'archive')
+        override = override_settings(MEDIA_ROOT=self.media, FACE_TRACKING_ARCHIVE_DIR=self.archive_dir,
+                                     FACE_TRACKING_HASH_CHARS=2)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def create_log(self, name, access_time):
+        path = os.path.join(self.media, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as file:
+            file.write(b'jpeg')
+        return Logsmartaccess2.objects.create(status='Unauthorized', image=name, access_time=access_time)
+
+    def test_partitioned_name(self):
+        when = timezone.make_aware(timezone.datetime(2026, 10, 17, 8, 30))
+        name = logstorage.partitioned_name('Unknown_1.jpeg', when)
+        prefix = hashlib.sha256(b'Unknown_1.jpeg').hexdigest()[:2]
+        self.assertEqual(name, f"tracking/2026/10/17/{prefix}/Unknown_1.jpeg")
+        self.assertEqual(logstorage.partition_date(name), when.date())
+        self.assertIsNone(logstorage.partition_date('tracking/Unknown_1.jpeg'))
+        log = Logsmartaccess2(status='Unauthorized', access_time=when)
+        self.assertEqual(log.image.field.generate_filename(log, 'Unknown_1.jpeg'), name)
+
+    def test_migrate_flat_files_in_batches(self):
+        when = timezone.now() - timedelta(days=3)
+        logs = [self.create_log(f"tracking/Unknown_{index}.jpeg", when) for index in range(3)]
+        out = StringIO()
+        call_command('migratetrackinglayout', batch=2, stdout=out)
+        self.assertIn('3 gambar dipindah', out.getvalue())
+        for log in logs:
+            log.refresh_from_db()
+            self.assertEqual(logstorage.partition_date(log.image.name), timezone.localtime(when).date())
+        self.assertEqual(tracking_files(self.media), sorted(log.image.name for log in logs))
+        call_command('migratetrackinglayout', stdout=out)
+        self.assertIn('0 gambar dipindah', out.getvalue())
+
+    def test_retention_archives_whole_partitions(self):
+        old_time = timezone.now() - timedelta(days=40)
+        old = self.create_log(logstorage.partitioned_name('old.jpeg', old_time), old_time)
+        recent = self.create_log(logstorage.partitioned_name('new.jpeg'), timezone.now())
+        call_command('trackingretention', days=30, archive=True, stdout=StringIO())
+        old.refresh_from_db()
+        recent.refresh_from_db()
+        self.assertEqual(old.image.name, '')
+        self.assertEqual(tracking_files(self.media), [recent.image.name])
+        day = timezone.localtime(old_time).date()
+        archive = os.path.join(self.archive_dir, f"tracking-{day.isoformat()}.tar.gz")
+        with tarfile.open(archive) as tar:
+            self.assertIn(logstorage.partitioned_name('old.jpeg', old_time), tar.getnames())
+
+
+class BulkIngestTest(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.media = os.path.join(tmp.name, 'media')
+        override = override_settings(MEDIA_ROOT=self.media, FACE_BULK_MAX_RECORDS=3)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.owner = User.objects.create_user(username='owner', email='owner@example.com', password='x',
+                                              role=User.Role.OWNER, first_name='John', last_name='Doe')
+
+    def post(self, records, files=(), key=None):
+        data = {'records': json.dumps(records)}
+        data.update({name: SimpleUploadedFile(f"{name}.jpg", b'jpeg-' + name.encode(), 'image/jpeg')
+                     for name in files})
+        headers = {'Idempotency-Key': key} if key else {}
+        return self.client.post('/face/createlogusersmartbulk/', data, headers=headers)
+
+    def records(self):
+        return [{'face_id': self.owner.face_id, 'status': 'Authorized', 'confidence': 80, 'crop': 'a'},
+                {'status': 'Unauthorized', 'crop': 'b'}]
+
+    def test_batch_written_once_per_idempotency_key(self):
+        response = self.post(self.records(), files=('a', 'b'), key='batch-1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['created'], 2)
+        self.assertEqual(len(tracking_files(self.media)), 2)
+        response = self.post(self.records(), files=('a', 'b'), key='batch-1')
+        self.assertEqual((response.json()['created'], response.json()['skipped']), (0, 2))
+        self.assertEqual(Logsmartaccess2.objects.count(), 2)
+        self.assertEqual(len(tracking_files(self.media)), 2)
+
+    def test_invalid_batches_rejected(self):
+        self.assertEqual(self.post([{'status': 'Unauthorized'}] * 4).status_code, 400)
+        shared = [{'status': 'Unauthorized', 'crop': 'a'}, {'status': 'Authorized', 'crop': 'a'}]
+        response = self.post(shared, files=('a',))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('lebih dari satu record', json.dumps(response.json()))
+        self.assertEqual(self.post([{'face_id': '999', 'status': 'Authorized'}]).status_code, 400)
+        self.assertEqual(Logsmartaccess2.objects.count(), 0)
+
+    def test_conflict_returns_409(self):
+        with mock.patch('facerecognition.ingest.bulk_create_access_logs', side_effect=IntegrityError):
+            self.assertEqual(self.post(self.records(), files=('a', 'b'), key='batch-1').status_code, 409)
+
+    def test_crops_deleted_on_rollback(self):
+        files = {name: SimpleUploadedFile(f"{name}.jpg", b'jpeg', 'image/jpeg') for name in ('a', 'b')}
+        with mock.patch.object(Logsmartaccess2.objects, 'bulk_create', side_effect=IntegrityError):
+            with self.assertRaises(IntegrityError):
+                ingest.bulk_create_access_logs(self.records(), files=files)
+        self.assertEqual(tracking_files(self.media), [])
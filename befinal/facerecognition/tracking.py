@@ -0,0 +1,171 @@
+"""
+Mode track-then-detect untuk terminal yang mengirim frame beruntun.
+
+Deteksi penuh hanya dijalankan setiap FACE_TRACK_DETECT_INTERVAL frame atau saat ada track
+yang hilang. Di antaranya posisi tiap wajah diperbarui dengan template matching pada area
+sekitar kotak sebelumnya (template diperkecil ke FACE_TRACK_TEMPLATE_SIZE piksel, jadi
+biayanya jauh di bawah satu deteksi). Hasil predict LBPH disimpan per track dan baru
+dihitung ulang setiap FACE_TRACK_REPREDICT_INTERVAL frame.
+
+State tracker disimpan per terminal di memori proses (lihat get_tracker); dengan beberapa
+worker tiap worker punya tracker sendiri, paling buruk hanya lebih sering deteksi penuh.
+"""
+import itertools
+import threading
+import time
+from collections import OrderedDict
+import cv2
+from django.conf import settings
+from . import metrics
+
+TRACK_FRAMES = metrics.counter(
+    'face_tracking_frames_total',
+    'Frame mode tracking per cara kotak wajah didapat (detect, track)',
+    ('mode',)
+)
+TRACK_PREDICTIONS = metrics.counter(
+    'face_tracking_predictions_total',
+    'Prediksi wajah mode tracking (predicted, cached)',
+    ('result',)
+)
+
+
+def iou(a, b):
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[0] + a[2], b[0] + b[2]), min(a[1] + a[3], b[1] + b[3])
+    inter = max(0, x2 - x1) * max(0, y2 - y1)
+    union = a[2] * a[3] + b[2] * b[3] - inter
+    return inter / union if union else 0.0
+
+
+class Track:
+    __slots__ = ('id', 'box', 'template', 'scale', 'prediction', 'predicted_at', 'score')
+
+    def __init__(self, track_id, box):
+        self.id = track_id
+        self.box = tuple(int(value) for value in box)
+        self.template = None
+        self.scale = 1.0
+        self.prediction = None
+        self.predicted_at = None
+        self.score = 1.0
+
+
+class FaceTracker:
+    def __init__(self, detect_interval=None, min_score=None, search_margin=None, template_size=None,
+                 repredict_interval=None):
+        self.detect_interval = settings.FACE_TRACK_DETECT_INTERVAL if detect_interval is None else detect_interval
+        self.min_score = settings.FACE_TRACK_MIN_SCORE if min_score is None else min_score
+        self.search_margin = settings.FACE_TRACK_SEARCH_MARGIN if search_margin is None else search_margin
+        self.template_size = settings.FACE_TRACK_TEMPLATE_SIZE if template_size is None else template_size
+        self.repredict_interval = (settings.FACE_TRACK_REPREDICT_INTERVAL if repredict_interval is None
+                                   else repredict_interval)
+        self.lock = threading.Lock()
+        self.tracks = []
+        self.shape = None
+        self.frame_index = 0
+        self.since_detect = 0
+        self._ids = itertools.count(1)
+
+    def _set_template(self, gray, track):
+        x, y, w, h = track.box
+        track.scale = self.template_size / max(w, h)
+        size = (max(1, round(w * track.scale)), max(1, round(h * track.scale)))
+        track.template = cv2.resize(gray[y:y + h, x:x + w], size, interpolation=cv2.INTER_AREA)
+
+    def _follow(self, gray, track):
+        """Posisi baru track dengan template matching di sekitar kotak lama, (box, skor)."""
+        x, y, w, h = track.box
+        pad = int(max(w, h) * self.search_margin)
+        height, width = gray.shape[:2]
+        x1, y1 = max(0, x - pad), max(0, y - pad)
+        x2, y2 = min(width, x + w + pad), min(height, y + h + pad)
+        region = gray[y1:y2, x1:x2]
+        size = (max(1, round((x2 - x1) * track.scale)), max(1, round((y2 - y1) * track.scale)))
+        th, tw = track.template.shape
+        if size[0] < tw or size[1] < th:
+            return track.box, 0.0
+        region = cv2.resize(region, size, interpolation=cv2.INTER_AREA)
+        scores = cv2.matchTemplate(region, track.template, cv2.TM_CCOEFF_NORMED)
+        _, score, _, (dx, dy) = cv2.minMaxLoc(scores)
+        return (x1 + round(dx / track.scale), y1 + round(dy / track.scale), w, h), float(score)
+
+    def _associate(self, gray, boxes):
+        """Kotak hasil deteksi dipasangkan ke track lama (IoU terbesar), sisanya jadi track baru."""
+        remaining = list(self.tracks)
+        tracks = []
+        for box in boxes:
+            box = tuple(int(value) for value in box)
+            best = max(remaining, key=lambda track: iou(track.box, box), default=None)
+            if best is not None and iou(best.box, box) >= settings.FACE_TRACK_MATCH_IOU:
+                remaining.remove(best)
+                best.box = box
+                track = best
+            else:
+                track = Track(next(self._ids), box)
+            track.score = 1.0
+            self._set_template(gray, track)
+            tracks.append(track)
+        self.tracks = tracks
+
+    def update(self, gray, detect):
+        """
+        Memperbarui semua track untuk frame `gray`. `detect(gray)` dipanggil untuk deteksi
+        penuh dan harus mengembalikan kotak (x, y, w, h). Mengembalikan daftar Track.
+        """
+        self.frame_index += 1
+        if self.shape != gray.shape[:2]:
+            self.shape, self.tracks = gray.shape[:2], []
+        need_detect = not self.tracks or self.since_detect + 1 >= self.detect_interval
+        if not need_detect:
+            followed = [self._follow(gray, track) for track in self.tracks]
+            need_detect = any(score < self.min_score for _, score in followed)
+            if not need_detect:
+                for track, (box, score) in zip(self.tracks, followed):
+                    track.box, track.score = box, score
+        if need_detect:
+            self._associate(gray, detect(gray))
+            self.since_detect = 0
+            TRACK_FRAMES.inc(mode='detect')
+        else:
+            self.since_detect += 1
+            TRACK_FRAMES.inc(mode='track')
+        return self.tracks
+
+    def needs_prediction(self, track):
+        if track.prediction is None:
+            return True
+        return bool(self.repredict_interval) and self.frame_index - track.predicted_at >= self.repredict_interval
+
+    def predict(self, track, predict):
+        """Hasil predict track, dari cache kalau masih berlaku; `predict()` dipanggil kalau tidak."""
+        if self.needs_prediction(track):
+            track.prediction = predict()
+            track.predicted_at = self.frame_index
+            TRACK_PREDICTIONS.inc(result='predicted')
+        else:
+            TRACK_PREDICTIONS.inc(result='cached')
+        return track.prediction
+
+
+_trackers = OrderedDict()
+_trackers_lock = threading.Lock()
+
+
+def get_tracker(terminal):
+    """Tracker milik terminal, dibuat kalau belum ada. Tracker yang lama tidak dipakai dibuang."""
+    now = time.monotonic()
+    with _trackers_lock:
+        # urutan _trackers = urutan pemakaian, yang paling lama di depan
+        while _trackers and now - next(iter(_trackers.values()))[1] > settings.FACE_TRACK_IDLE_SECONDS:
+            _trackers.popitem(last=False)
+        tracker = _trackers.pop(terminal, (None, None))[0] or FaceTracker()
+        _trackers[terminal] = (tracker, now)
+        while len(_trackers) > settings.FACE_TRACK_MAX_TERMINALS:
+            _trackers.popitem(last=False)
+    return tracker
+
+
+def reset_trackers():
+    with _trackers_lock:
+        _trackers.clear()
@@ -0,0 +1,144 @@
+"""
+Upload handler untuk endpoint wajah.
+
+- HashingStorageUploadHandler (enroll): tiap part file ditulis langsung ke direktori sementara
+  di dalam MEDIA_ROOT sambil dihitung sha256-nya. Karena satu filesystem dengan lokasi akhir,
+  FileSystemStorage cukup me-rename file saat model disimpan, tanpa salinan tambahan.
+- BoundedMemoryUploadHandler (verifikasi): frame kecil disimpan di memori dengan batas ukuran,
+  lalu didecode langsung dari buffer-nya.
+Kedua handler menolak request yang melewati batas ukuran dengan 413.
+"""
+import hashlib
+import os
+import tempfile
+from io import BytesIO
+import numpy as np
+from django.conf import settings
+from django.core.files.uploadedfile import InMemoryUploadedFile, TemporaryUploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, StopFutureHandlers
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class UploadTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'ukuran upload melebihi batas'
+    default_code = 'upload_too_large'
+
+
+def upload_temp_dir():
+    return settings.FACE_UPLOAD_TEMP_DIR or os.path.join(settings.MEDIA_ROOT, 'uploading')
+
+
+class HashedUploadedFile(TemporaryUploadedFile):
+    """TemporaryUploadedFile yang dibuat di upload_temp_dir() dan membawa sha256 isinya."""
+
+    def __init__(self, name, content_type, size, charset, content_type_extra=None):
+        directory = upload_temp_dir()
+        os.makedirs(directory, exist_ok=True)
+        _, ext = os.path.splitext(name)
+        file = tempfile.NamedTemporaryFile(suffix='.upload' + ext, dir=directory)
+        super(TemporaryUploadedFile, self).__init__(file, name, content_type, size, charset, content_type_extra)
+        self.sha256 = None
+
+
+class _LimitMixin:
+    max_file_size = None
+    max_request_size = None
+    max_files = None
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        if self.max_request_size and content_length and content_length > self.max_request_size:
+            raise UploadTooLarge(f"request maksimal {self.max_request_size} byte")
+        self.request_bytes = 0
+        self.file_count = 0
+
+    def _count(self, size):
+        self.file_bytes += size
+        self.request_bytes += size
+        if self.max_file_size and self.file_bytes > self.max_file_size:
+            raise UploadTooLarge(f"file maksimal {self.max_file_size} byte")
+        if self.max_request_size and self.request_bytes > self.max_request_size:
+            raise UploadTooLarge(f"request maksimal {self.max_request_size} byte")
+
+    def _start_file(self):
+        self.file_count += 1
+        self.file_bytes = 0
+        if self.max_files and self.file_count > self.max_files:
+            raise UploadTooLarge(f"maksimal {self.max_files} file per request")
+
+
+class HashingStorageUploadHandler(_LimitMixin, FileUploadHandler):
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.max_file_size = settings.FACE_UPLOAD_MAX_FILE_SIZE
+        self.max_request_size = settings.FACE_UPLOAD_MAX_REQUEST_SIZE
+        self.max_files = settings.FACE_UPLOAD_MAX_FILES
+        self.files = []
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self._start_file()
+        self.hasher = hashlib.sha256()
+        self.file = HashedUploadedFile(self.file_name, self.content_type, 0, self.charset, self.content_type_extra)
+        self.files.append(self.file)
+        raise StopFutureHandlers()
+
+    def receive_data_chunk(self, raw_data, start):
+        try:
+            self._count(len(raw_data))
+        except UploadTooLarge:
+            self.cleanup()
+            raise
+        self.hasher.update(raw_data)
+        self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        self.file.seek(0)
+        self.file.size = file_size
+        self.file.sha256 = self.hasher.hexdigest()
+        return self.file
+
+    def upload_interrupted(self):
+        self.cleanup()
+
+    def cleanup(self):
+        for file in self.files:
+            file.close()
+
+
+class BoundedMemoryUploadHandler(_LimitMixin, FileUploadHandler):
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.max_file_size = settings.FACE_VERIFY_MAX_FRAME_SIZE
+        self.max_request_size = settings.FACE_VERIFY_MAX_FRAME_SIZE + 64 * 1024
+        self.max_files = 1
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self._start_file()
+        self.file = BytesIO()
+        raise StopFutureHandlers()
+
+    def receive_data_chunk(self, raw_data, start):
+        self._count(len(raw_data))
+        self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        self.file.seek(0)
+        return InMemoryUploadedFile(
+            file=self.file, field_name=self.field_name, name=self.file_name, content_type=self.content_type,
+            size=file_size, charset=self.charset, content_type_extra=self.content_type_extra,
+        )
+
+
+def image_buffer(uploaded):
+    """
+    Buffer uint8 isi file upload untuk cv2.imdecode. File di memori dibaca lewat
+    getbuffer() (view tanpa salinan), file sementara di disk dibaca langsung dari path-nya.
+    """
+    if isinstance(uploaded, InMemoryUploadedFile) and isinstance(uploaded.file, BytesIO):
+        return np.frombuffer(uploaded.file.getbuffer(), dtype=np.uint8)
+    if hasattr(uploaded, 'temporary_file_path'):
+        return np.fromfile(uploaded.temporary_file_path(), dtype=np.uint8)
+    return np.frombuffer(uploaded.read(), dtype=np.uint8)
@@ -4,5 +4,7 @@ urlpatterns = [
     path('createimagetrainingusernew/',views.Createimagetrainingusernew.as_view(),name="createimagetrainingusernew"),
     path('getuserimageexists/',views.Getimageexistsuser.as_view(),name="getuserimageexists"),
     path('createlogusersmartnew/',views.Createlogusersmartnew.as_view(),name="createlogusersmartnew"),
-    path('getuserlogsmartnew/',views.Getuserlogsmartnews.as_view(),name="createlogusersmartnew")
+    path('createlogusersmartbulk/',views.Createlogusersmartbulk.as_view(),name="createlogusersmartbulk"),
+    path('getuserlogsmartnew/',views.Getuserlogsmartnews.as_view(),name="createlogusersmartnew"),
+    path('metrics/',views.metrics_view,name="metrics")
 ]
\ No newline at end of file
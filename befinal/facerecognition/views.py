@@ -1,14 +1,23 @@
 from django.shortcuts import render
-import os,numpy as np,cv2
-from PIL import Image
+import os,json,logging,numpy as np,cv2
+from django.conf import settings
 from django.core.files.base import ContentFile
-from . import models,serializer
+from django.core.files.storage import default_storage
+from django.db import IntegrityError,transaction
+from django.db.models import F
+from django.http import HttpResponse
+from django.utils import timezone
+from . import models,serializer,ingest,metrics,debounce,detectors,detectwindow,framecache,modelstore,parallel,preprocess,profiles,tracking,uploadhandlers,writebehind
+from .recognizer import get_recognizer, load_model
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser,FormParser,JSONParser
 from rest_framework.views import APIView
 from datetime import datetime
 from users.models import User
+from users import caching
 from rest_framework import status
+
+logger=logging.getLogger(__name__)
 # Create your views here.
 def get_trained_images(log_file, user_folder):
     """Membaca daftar gambar yang sudah dilatih dari file log."""
@@ -65,13 +74,13 @@ def non_max_suppression_fast(boxes, overlapThresh=0.3):
         idxs = np.delete(idxs, np.concatenate(([len(idxs)-1], np.where(overlap > overlapThresh)[0])))
 
     return boxes[pick].astype("int")
+@metrics.timed('train_update')
 def train_or_update_user_data(training_dir, model_save_path, target_user, target_label):
-    print(target_user)
-    print(target_label)
-    face_recognizer = cv2.face.LBPHFaceRecognizer.create()
-    haar_name='haarcascade_frontalface_default.xml'
-    haar_loc=os.path.join('hasiltraining',haar_name)
-    face_cascade = cv2.CascadeClassifier(haar_loc)
+    logger.debug("train_or_update_user_data user=%s label=%s", target_user, target_label)
+    # crop mengikuti profil model yang sudah ada, atau profil aktif untuk model baru
+    profile = profiles.model_profile(model_save_path)
+    face_recognizer = get_recognizer(profile=profile)
+    face_detector = detectors.get_detector()
 
     log_file = f"{target_user}_trained_images.log"
     trained_images = get_trained_images(log_file, target_user)
@@ -89,43 +98,48 @@ def train_or_update_user_data(training_dir, model_save_path, target_user, target
                 if image_path in trained_images:
                     continue  # Skip image yang sudah dilatih sebelumnya
 
-                image = Image.open(image_path).convert("L")
-                image_np = np.array(image, "uint8")
-                detected_faces = face_cascade.detectMultiScale(image_np, 1.2, 5)
+                with metrics.timer('decode'):
+                    image_np = preprocess.load_training_image(image_path)
+                with metrics.timer('detect'):
+                    # gambar training: semua ukuran wajah ikut, tanpa batas min_size
+                    detected_faces = face_detector.detect(image_np, min_size=0)
                 for (x, y, w, h) in detected_faces:
-                    faces.append(image_np[y:y+h, x:x+w])
+                    faces.append(preprocess.prepare_face(image_np, (x, y, w, h), copy=True, size=profile['crop_size']))
                     labels.append(target_label)
-                    print(labels)
-                    print(f"Detected faces in {file}: {detected_faces}")
                     new_images.append(image_path)
+                logger.debug("Detected faces in %s: %s", file, detected_faces)
 
-        print(f"Data wajah ditemukan untuk user {target_user}: {len(faces)} gambar baru.")
+        logger.info("Data wajah ditemukan untuk user %s: %d gambar baru.", target_user, len(faces))
     else:
-        print(f"Folder user {target_user} tidak ditemukan.")
+        logger.warning("Folder user %s tidak ditemukan.", target_user)
 
     if faces:
-        # Update model dengan data baru
-        if os.path.exists(model_save_path):
-            face_recognizer.read(model_save_path)
-
-        face_recognizer.update(faces, np.array(labels))
-        face_recognizer.save(model_save_path)
-        print(np.array(labels))
-        print(f"Data baru untuk user {target_user} ditambahkan ke model dan disimpan di {model_save_path}.")
+        # Update model dengan data baru; dikunci supaya enroll paralel tidak saling menimpa
+        with modelstore.model_lock(model_save_path):
+            if os.path.exists(model_save_path):
+                with metrics.timer('model_load'):
+                    face_recognizer.read(model_save_path)
+
+            with metrics.timer('model_train'):
+                face_recognizer.update(faces, labels)
+            with metrics.timer('model_save'):
+                face_recognizer.save(model_save_path)
+        logger.info("Data baru untuk user %s ditambahkan ke model dan disimpan di %s.", target_user, model_save_path)
 
         # Update daftar gambar yang telah dilatih
         update_trained_images(log_file, new_images)
     else:
-        print(f"Tidak ada wajah baru untuk user {target_user}.")
+        logger.info("Tidak ada wajah baru untuk user %s.", target_user)
 
+@metrics.timed('train_replace')
 def train_replace_user_data(training_dir, model_save_path, target_user, target_label):
     """
     Mengganti semua data wajah user yang ada di log dan menggantinya dengan gambar baru dari folder user.
     """
-    face_recognizer = cv2.face.LBPHFaceRecognizer.create()
-    haar_name='haarcascade_frontalface_default.xml'
-    haar_loc=os.path.join('hasiltraining',haar_name)
-    face_cascade = cv2.CascadeClassifier(haar_loc)
+    # crop mengikuti profil model yang sudah ada, atau profil aktif untuk model baru
+    profile = profiles.model_profile(model_save_path)
+    face_recognizer = get_recognizer(profile=profile)
+    face_detector = detectors.get_detector()
 
     log_file = f"{target_user}_trained_images.log"
     faces = []
@@ -139,77 +153,130 @@ def train_replace_user_data(training_dir, model_save_path, target_user, target_l
         # Hapus semua entri lama di log
         if os.path.exists(log_file):
             os.remove(log_file)
-            print(f"Log file lama untuk {target_user} dihapus.")
+            logger.info("Log file lama untuk %s dihapus.", target_user)
 
         # Proses semua gambar di folder user
         for file in os.listdir(user_path):
             if file.endswith(("jpg", "jpeg", "png")):
                 image_path = os.path.join(user_path, file)
-                image = Image.open(image_path).convert("L")
-                image_np = np.array(image, "uint8")
-                detected_faces = face_cascade.detectMultiScale(image_np, 1.2, 5)
+                with metrics.timer('decode'):
+                    image_np = preprocess.load_training_image(image_path)
+                with metrics.timer('detect'):
+                    # gambar training: semua ukuran wajah ikut, tanpa batas min_size
+                    detected_faces = face_detector.detect(image_np, min_size=0)
                 for (x, y, w, h) in detected_faces:
-                    faces.append(image_np[y:y+h, x:x+w])
+                    faces.append(preprocess.prepare_face(image_np, (x, y, w, h), copy=True, size=profile['crop_size']))
                     labels.append(target_label)
                     new_images.append(image_path)
 
-        print(f"Data wajah ditemukan untuk user {target_user}: {len(faces)} gambar.")
+        logger.info("Data wajah ditemukan untuk user %s: %d gambar.", target_user, len(faces))
     else:
-        print(f"Folder user {target_user} tidak ditemukan.")
+        logger.warning("Folder user %s tidak ditemukan.", target_user)
         return  # Tidak ada folder, tidak ada pelatihan
 
     if faces:
         # Latih ulang model dari awal atau update model
-        if os.path.exists(model_save_path):
-            face_recognizer.read(model_save_path)
-        else:
-            print("Model baru akan dibuat.")
+        with modelstore.model_lock(model_save_path):
+            if os.path.exists(model_save_path):
+                with metrics.timer('model_load'):
+                    face_recognizer.read(model_save_path)
+            else:
+                logger.info("Model baru akan dibuat.")
 
-        face_recognizer.train(faces, np.array(labels))
-        face_recognizer.save(model_save_path)
-        print(f"Model untuk user {target_user} disimpan di {model_save_path}.")
+            # hanya sampel milik user ini yang diganti, user lain tetap di model
+            with metrics.timer('model_train'):
+                face_recognizer.replace_label(target_label, faces)
+            with metrics.timer('model_save'):
+                face_recognizer.save(model_save_path)
+        logger.info("Model untuk user %s disimpan di %s.", target_user, model_save_path)
 
         # Update log file dengan gambar baru
         update_trained_images2(log_file, new_images)
     else:
-        print(f"Tidak ada data wajah yang valid untuk user {target_user}.")
+        logger.info("Tidak ada data wajah yang valid untuk user %s.", target_user)
 
 def clear_log_for_user(log_file):
     """Hapus semua referensi log untuk user tertentu."""
     if os.path.exists(log_file):
         os.remove(log_file)
 
-def recognize_from_image(image, model_path, label_to_user):
+def remove_user_data(model_save_path, target_user, target_label):
     """
-    Melakukan proses pengenalan wajah pada gambar yang diberikan.
+    Menghapus semua sampel wajah satu user dari model beserta log gambar yang sudah dilatih,
+    tanpa melatih ulang user lain. Untuk layout .shards cukup menghapus shard milik user.
     """
-    # Load the trained model
-    recognizer = cv2.face.LBPHFaceRecognizer.create()
-    recognizer.read(model_path)
+    clear_log_for_user(f"{target_user}_trained_images.log")
+    with modelstore.model_lock(model_save_path):
+        if not os.path.exists(model_save_path):
+            return
+        face_recognizer = get_recognizer()
+        face_recognizer.read(model_save_path)
+        face_recognizer.remove_label(int(target_label))
+        face_recognizer.save(model_save_path)
+    logger.info("Data wajah user %s (%s) dihapus dari %s.", target_user, target_label, model_save_path)
 
-    # Load the face detection model
-    haar_name='haarcascade_frontalface_default.xml'
-    haar_loc=os.path.join('hasiltraining',haar_name)
-    face_cascade = cv2.CascadeClassifier(haar_loc)
+def recognize_from_image(image, model_path, label_to_user, terminal=None):
+    """
+    Melakukan proses pengenalan wajah pada gambar yang diberikan. Dengan `terminal`,
+    deteksi memakai jendela adaptif terminal tersebut (detectwindow.py), dan kalau
+    FACE_TRACKING_ENABLED frame beruntun dari terminal itu memakai mode tracking (tracking.py).
+    """
+    # model dibuka sekali per proses dan dibaca ulang hanya kalau filenya berubah
+    with metrics.timer('model_load'):
+        recognizer = load_model(model_path)
+
+    face_detector = detectors.get_detector()
 
     # Konversi gambar ke grayscale
     gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
 
-    # Deteksi wajah pada gambar
-    raw_faces = face_cascade.detectMultiScale(gray, scaleFactor=1.2, minNeighbors=5, minSize=(50, 50))
-    faces=non_max_suppression_fast(raw_faces,overlapThresh=0.3)
-    results = []
-    for (x, y, w, h) in faces:
-        face_image = gray[y:y+h, x:x+w]
+    def detect_faces(gray):
+        # Deteksi wajah pada gambar
+        with metrics.timer('detect'):
+            raw_faces = detectwindow.detect(face_detector, gray, color=image, terminal=terminal)
+        with metrics.timer('nms'):
+            return non_max_suppression_fast(raw_faces,overlapThresh=0.3)
+
+    # opsional: prediksi crop wajah yang nyaris sama dari terminal ini dipakai ulang (framecache.py)
+    similar = framecache.similar_enabled(terminal)
+
+    def predict(box):
+        face_image = preprocess.prepare_face(gray, box, size=recognizer.crop_size)
+        face_hash = framecache.dhash(face_image) if similar else None
+        if face_hash is not None:
+            cached = framecache.get_similar(terminal, face_hash)
+            if cached is not None:
+                return tuple(cached)
         try:
-            label, confidence = recognizer.predict(face_image)
-            print(label)
-            print(confidence)
+            with metrics.timer('predict'):
+                prediction = recognizer.predict(face_image)
         except Exception as e:
             # Jika error saat prediksi
-            print(f"Error predicting face: {e}")
+            logger.warning("Error predicting face: %s", e)
+            return None
+        if face_hash is not None:
+            framecache.store_face(terminal, face_hash, prediction)
+        return prediction
+
+    # beberapa wajah dalam satu frame diprediksi paralel (parallel.py)
+    tracker = tracking.get_tracker(terminal) if terminal and settings.FACE_TRACKING_ENABLED else None
+    if tracker is None:
+        boxes = detect_faces(gray)
+        predictions = list(zip(boxes, parallel.run(predict, boxes)))
+    else:
+        with tracker.lock:
+            tracks = tracker.update(gray, detect_faces)
+            stale = [track for track in tracks if tracker.needs_prediction(track)]
+            fresh = dict(zip([track.id for track in stale], parallel.run(lambda track: predict(track.box), stale)))
+            predictions = [(track.box, tracker.predict(track, lambda: fresh[track.id])) for track in tracks]
+
+    results = []
+    for (x, y, w, h), prediction in predictions:
+        if prediction is None:
             continue
-        if confidence >= 50:
+        label, confidence = prediction
+        # ambang ikut profil model, skala jarak chi-square berbeda per grid (profiles.py)
+        if confidence >= recognizer.accept_threshold:
             username = 'Unknown'
             id_user=None
             status = "Unauthorized"
@@ -217,19 +284,27 @@ def recognize_from_image(image, model_path, label_to_user):
             username = label_to_user.get(label, "Unknown")
             id_user=label
             status = "Authorized"
-        print(id_user)
-        print(username)
-        color= (0, 255, 0) if confidence < 50 else (0, 0, 255)
-        cv2.putText(image, username, (x+100,y-10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
-        cv2.rectangle(image, (x, y), (x + w, y + h), (255, 0, 0), 2)
+        logger.debug("predict label=%s confidence=%.2f user=%s", label, confidence, username)
         results.append({
             "id_face_user": id_user,
             "username":username,
             "status": status,
             "confidence":"  {0}%".format(round(100 - confidence)),
-            "face_image": image
+            # confidence numerik (persen) yang disimpan di log
+            "score":float(100 - confidence),
+            "box": [int(x), int(y), int(w), int(h)],
         })
-    print('result from def recognize image',results)
+    logger.debug("recognize_from_image: %d wajah dikenali dari %d deteksi", len(results), len(predictions))
+    return annotate_results(image, results)
+
+def annotate_results(image, results):
+    """Menggambar nama dan kotak tiap wajah ke frame, frame itu menjadi face_image tiap hasil."""
+    for item in results:
+        x, y, w, h = item['box']
+        color= (0, 255, 0) if item['status'] == "Authorized" else (0, 0, 255)
+        cv2.putText(image, item['username'], (x+100,y-10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+        cv2.rectangle(image, (x, y), (x + w, y + h), (255, 0, 0), 2)
+        item['face_image'] = image
     return results
 
 def get_true_label_from_path(image_path):
@@ -239,6 +314,12 @@ def get_true_label_from_path(image_path):
 
 class Createimagetrainingusernew(APIView):
     parser_classes = [MultiPartParser,FormParser]
+    def initialize_request(self,request,*args,**kwargs):
+        # gambar langsung di-stream ke MEDIA_ROOT sambil di-hash, dibatasi ukurannya
+        request.upload_handlers=[uploadhandlers.HashingStorageUploadHandler(request)]
+        return super().initialize_request(request,*args,**kwargs)
+
+    @metrics.observe_request('createimagetrainingusernew')
     def post(self,request):
         username=request.data.get("username",None)
         images=request.FILES.getlist("image_list")
@@ -256,16 +337,22 @@ class Createimagetrainingusernew(APIView):
             },status=status.HTTP_403_FORBIDDEN)
 
         savedimage=[]
+        skipped=[]
         for image in images:
+            sha256=getattr(image,'sha256',None) or ''
+            if sha256 and models.Datawajahnew.objects.filter(user_id=items.id,sha256=sha256).exists():
+                # gambar yang sama sudah pernah didaftarkan, tidak perlu disimpan dan dilatih lagi
+                skipped.append(image.name)
+                continue
             serial=serializer.Imagedatawajahserializernew(data={
                 "user":items.id,
                 "image_user":image
             })
             if serial.is_valid():
-                serial.save()
+                with metrics.timer('storage_write'):
+                    serial.save(sha256=sha256)
                 training_dir=os.path.join('media','imagetraining')
-                model_save='lbph_model.xml'
-                model_save_path=os.path.join('hasiltraining',model_save)
+                model_save_path=settings.FACE_MODEL_PATH
                 train_or_update_user_data(
                     training_dir=training_dir,
                     model_save_path=model_save_path,
@@ -284,7 +371,8 @@ class Createimagetrainingusernew(APIView):
             data={
                 'status':'success',
                 'message':'berhasil mendaftar gambar wajah',
-                'data':savedimage
+                'data':savedimage,
+                'skipped':skipped
             },status=status.HTTP_200_OK
         )
 
@@ -292,20 +380,36 @@ class Createimagetrainingusernew(APIView):
 class Getimageexistsuser(APIView):
     def get(self,request):
         username=request.query_params.get("username",None)
-        try:
-            items=User.objects.get(username=username)
-        except User.DoesNotExist:
+        return caching.cached_response(
+            request,caching.FACE_IMAGES,lambda:self.build_response(username),vary=('username',)
+        )
+
+    def build_response(self,username):
+        # satu query: LEFT JOIN user -> data wajah, baris dengan id None berarti user tanpa gambar
+        rows=list(
+            User.objects.filter(username=username).values(
+                'id',
+                image_id=F('face_data__id'),
+                image_user=F('face_data__image_user'),
+                created_at=F('face_data__created_at'),
+                updated_at=F('face_data__updated_at'),
+            ).order_by('face_data__id')
+        )
+        if not rows:
             return Response({
                 "error":"username does not exist"
             },status=status.HTTP_403_FORBIDDEN)
-        gambarexist=models.Datawajahnew.objects.filter(user_id=items.id)
-        print(gambarexist)
+        gambarexist=[
+            {'id':row['image_id'],'user':row['id'],'image_user':row['image_user'],
+             'created_at':row['created_at'],'updated_at':row['updated_at']}
+            for row in rows if row['image_id'] is not None
+        ]
         if not gambarexist:
             return Response({
                 "error":"gambar user tidak ditemukan"
             },status=status.HTTP_403_FORBIDDEN)
         else:
-            data=serializer.Imagedatawajahserializernew(gambarexist,many=True)
+            data=serializer.Imagedatawajahlistserializer(gambarexist,many=True)
             return Response(
                 data={
                     'status':'success',
@@ -316,91 +420,240 @@ class Getimageexistsuser(APIView):
 
 class Createlogusersmartnew(APIView):
     parser_classes = [MultiPartParser,FormParser]
+    def initialize_request(self,request,*args,**kwargs):
+        # frame verifikasi kecil: tetap di memori (dibatasi) dan didecode dari buffer yang sama
+        request.upload_handlers=[uploadhandlers.BoundedMemoryUploadHandler(request)]
+        return super().initialize_request(request,*args,**kwargs)
+
+    def write_image(self,face_image,file_name):
+        with metrics.timer('encode'):
+            _,image_buffer=cv2.imencode('.jpeg',face_image)
+        with metrics.timer('storage_write'):
+            name=models.Logsmartaccess2._meta.get_field('image').generate_filename(None,file_name)
+            return default_storage.save(name,ContentFile(image_buffer.tobytes(),name=file_name))
+
+    def save_log(self,results,file_name):
+        """
+        Encode crop, tulis ke storage, lalu insert baris log. Storage dan DB ditulis terpisah
+        supaya durasi keduanya tercatat sendiri di metrics. Event user yang sama dengan status
+        yang sama dalam jendela debounce digabung ke baris lama (debounce.py).
+        """
+        now=timezone.now()
+        data={
+            'id_face_user':results['id_face_user'],
+            'status':results['status']
+        }
+        name=None
+        if debounce.enabled(results['id_face_user']):
+            # crop ditulis sebelum lock baris event diambil, dan hanya kalau kemungkinan dipakai,
+            # supaya frame beruntun wajah yang sama tidak antre di I/O disk selama lock dipegang
+            current=debounce.peek_event(results['id_face_user'],results['status'],now)
+            if current is None or debounce.is_better(results['score'],current.confidence):
+                name=self.write_image(results['face_image'],file_name)
+            try:
+                with transaction.atomic():
+                    event=debounce.open_event(results['id_face_user'],results['status'],now)
+                    if event is not None:
+                        return self.merge_log(event,data,results,name,now)
+            except Exception:
+                if name:
+                    ingest.delete_crops([name])
+                raise
+        log_serial=serializer.Logsmartaccesserializernew(data=data)
+        if not log_serial.is_valid():
+            if name:
+                ingest.delete_crops([name])
+            return log_serial
+        if name is None:
+            name=self.write_image(results['face_image'],file_name)
+        with metrics.timer('db_write'):
+            log_serial.save(image=name,confidence=results['score'],access_time=now,last_seen=now)
+        debounce.DEBOUNCE_EVENTS.inc(result='inserted')
+        return log_serial
+
+    def queue_log(self,results,file_name):
+        """
+        Mode write-behind (writebehind.py): crop di-encode lalu diantrekan, baris dan file ditulis
+        writer di belakang. None kalau antrean penuh, log ditulis sinkron lewat save_log.
+        """
+        with metrics.timer('encode'):
+            _,image_buffer=cv2.imencode('.jpeg',results['face_image'])
+        record=writebehind.make_record(results['id_face_user'],results['status'],results['score'],
+                                       timezone.now(),file_name)
+        if not writebehind.get_buffer().submit(record,image_buffer.tobytes()):
+            return None
+        # bentuk respons sama dengan log yang sudah tersimpan, gambar belum ada
+        return serializer.Logsmartaccesserializernew(models.Logsmartaccess2(
+            log_id=record['log_id'],
+            id_face_user_id=record['face_id'],
+            status=record['status'],
+            confidence=record['confidence'],
+            access_time=record['timestamp'],
+            last_seen=record['timestamp'],
+            idempotency_key=record['idempotency_key'],
+        )).data
+
+    def merge_log(self,event,data,results,name,now):
+        """
+        Menambah hit event lama (baris sudah dikunci). Crop `name` sudah ditulis sebelum lock,
+        None kalau tidak; crop dipakai hanya kalau frame ini lebih yakin, selain itu dibuang.
+        """
+        log_serial=serializer.Logsmartaccesserializernew(event,data=data,partial=True)
+        if not log_serial.is_valid():
+            if name:
+                ingest.delete_crops([name])
+            return log_serial
+        fields={'hit_count':event.hit_count+1,'last_seen':now}
+        unused=name
+        if name and debounce.is_better(results['score'],event.confidence):
+            unused=event.image.name
+            fields.update(image=name,confidence=results['score'])
+        with metrics.timer('db_write'):
+            log_serial.save(**fields)
+        if unused:
+            # file lama baru dihapus setelah baris yang menunjuk file baru tersimpan
+            transaction.on_commit(lambda: ingest.delete_crops([unused]))
+        debounce.DEBOUNCE_EVENTS.inc(result='merged')
+        return log_serial
+
+    @metrics.observe_request('createlogusersmartnew')
     def post(self,request):
         image_file=request.FILES.get('image')
-        print(image_file)
         if not image_file:
             return Response(data={
                 'status':"error",
                 "message":"Selain gambar tidak diperbolehkan"
             },status=status.HTTP_400_BAD_REQUEST)
-        image_byte=image_file.read()
-        np_image=np.frombuffer(image_byte,dtype=np.uint8)
-        image=cv2.imdecode(np_image,cv2.IMREAD_COLOR)
-        label_to_user = {
-            int(items.face_id): f"{items.first_name}_{items.last_name}"
-            for items in User.objects.all()
-            if items.face_id is not None and str(items.face_id).isdigit()
-        }
-        model_name='lbph_model.xml'
-        model_path=os.path.join('hasiltraining',model_name)
-        result=recognize_from_image(image,model_path,label_to_user)
+        terminal=detectwindow.terminal_id(request)
+        buffer=uploadhandlers.image_buffer(image_file)
+        # frame yang dikirim ulang terminal memakai hasil pengenalan sebelumnya (framecache.py),
+        # tapi tetap dicatat ke log seperti frame baru
+        use_cache=framecache.enabled(terminal)
+        cached=None
+        if use_cache:
+            sha256=framecache.content_hash(buffer)
+            cached=framecache.get_exact(terminal,sha256)
+        with metrics.timer('decode'):
+            image=cv2.imdecode(buffer,cv2.IMREAD_COLOR)
+        if cached is not None:
+            result=annotate_results(image,cached)
+        else:
+            label_to_user = {
+                int(items.face_id): f"{items.first_name}_{items.last_name}"
+                for items in User.objects.all()
+                if items.face_id is not None and str(items.face_id).isdigit()
+            }
+            result=recognize_from_image(image,settings.FACE_MODEL_PATH,label_to_user,terminal=terminal)
+            if use_cache:
+                framecache.store(terminal,sha256,[
+                    {key:value for key,value in item.items() if key!='face_image'} for item in result])
         image_result=[]
         for results in result:
+            waktu=datetime.now().strftime('%Y%m%d_%H%M%S_%f')
             if not results['id_face_user']:
-                waktu=datetime.now().strftime('%Y%m%d_%H%M%S_%f')
-                _,imagebuffer=cv2.imencode('.jpeg',results['face_image'])
                 file_name = f"Unknown_{waktu}.jpeg"
-                log_serial=serializer.Logsmartaccesserializernew(data={
-                    'id_face_user':None,
-                    'image':ContentFile(imagebuffer.tobytes(),name=file_name),
-                    'status':results['status']
-                })
-                if log_serial.is_valid():
-                    log_serial.save()
-                    image_result.append(log_serial.data)
-                else:
-                    print(f"Error saving log for unknown user: {log_serial.errors}")
+            else:
+                file_name = f"{results['username']}_{results['status']}_{waktu}.jpeg"
+            log_data=self.queue_log(results,file_name) if writebehind.enabled() else None
+            if log_data is None:
+                log_serial=self.save_log(results,file_name)
+                if log_serial.errors:
+                    logger.warning("Error saving log for %s: %s", results['username'], log_serial.errors)
                     return Response(data={
                         "status":"error",
                         "message":log_serial.errors
                     }, status=status.HTTP_400_BAD_REQUEST)
-                return Response(data={
-                    "result":image_result,
-                    "confidence":results['confidence']
-                })
-            _, image_buffer = cv2.imencode(".jpeg", results['face_image'])
-            waktu=datetime.now().strftime('%Y%m%d_%H%M%S_%f')
-            file_name = f"{results['username']}_{results['status']}_{waktu}.jpeg"
-            log_serial=serializer.Logsmartaccesserializernew(data={
-                'id_face_user':results['id_face_user'],
-                'image':ContentFile(image_buffer.tobytes(),name=file_name),
-                'status':results['status']
-            })
-            if log_serial.is_valid():
-                log_serial.save()
-                image_result.append(log_serial.data)
-            else:
-                print(f"Error saving log for unknown user: {log_serial.errors}")
-                return Response(data={
-                    "status":"error",
-                    "message":log_serial.errors
-                }, status=status.HTTP_400_BAD_REQUEST)
-            return Response(
-                data={
-                    "result":image_result,
-                    "confidence":results['confidence']
-                },status=status.HTTP_200_OK
-            )
+                log_data=log_serial.data
+            image_result.append(log_data)
+            data={
+                "result":image_result,
+                "confidence":results['confidence']
+            }
+            return Response(data=data,status=status.HTTP_200_OK)
 class Getuserlogsmartnews(APIView):
+    @metrics.observe_request('getuserlogsmartnew')
     def get(self,request):
         username=request.query_params.get('username',None)
-        items=User.objects.get(username=username)
-        if items.username is None:
+        # satu query: LEFT JOIN user -> log akses, user tanpa log tetap muncul satu baris dengan log_id None
+        rows=list(
+            User.objects.filter(username=username).values(
+                log_id=F('log_access_user__log_id'),
+                id_face_user=F('face_id'),
+                image=F('log_access_user__image'),
+                access_time=F('log_access_user__access_time'),
+                status=F('log_access_user__status'),
+                confidence=F('log_access_user__confidence'),
+                hit_count=F('log_access_user__hit_count'),
+                last_seen=F('log_access_user__last_seen'),
+            ).order_by(F('log_access_user__access_time').desc(nulls_last=True))
+        )
+        if not rows:
             return Response(data={
                 'status':"error",
                 'message':'username tidak ditemukan'
             },status=status.HTTP_400_BAD_REQUEST)
-        finduserimage=models.Logsmartaccess2.objects.filter(id_face_user=items.face_id)
-        if finduserimage.exists() is False:
+        finduserimage=[row for row in rows if row['log_id'] is not None]
+        if not finduserimage:
             return Response(data={
                 'status':'error',
                 'mesage':'user belum terdaftar'
             },status=status.HTTP_400_BAD_REQUEST)
-        serial=serializer.Logsmartaccesserializernew(finduserimage,many=True)
+        serial=serializer.Logsmartaccesslistserializer(finduserimage,many=True)
         return Response(
             data={
                 'status':'success',
                 'data':serial.data
             },status=status.HTTP_200_OK
-        )
\ No newline at end of file
+        )
+class Createlogusersmartbulk(APIView):
+    """
+    Ingest banyak event akses sekaligus dari terminal/edge box.
+    Body JSON {"records":[...]} atau multipart dengan field records berisi JSON,
+    crop dikirim sebagai part file dan dirujuk lewat nama part di record.
+    """
+    parser_classes = [JSONParser,MultiPartParser,FormParser]
+    @metrics.observe_request('createlogusersmartbulk')
+    def post(self,request):
+        records=request.data.get('records')
+        if isinstance(records,str):
+            try:
+                records=json.loads(records)
+            except ValueError:
+                return Response(data={
+                    'status':'error',
+                    'message':'records bukan JSON yang valid'
+                },status=status.HTTP_400_BAD_REQUEST)
+        serial=serializer.Logsmartaccessbulkserializer(
+            data={'records':records},
+            context={'files':request.FILES}
+        )
+        if not serial.is_valid():
+            return Response(data={
+                'status':'error',
+                'message':serial.errors
+            },status=status.HTTP_400_BAD_REQUEST)
+        try:
+            with metrics.timer('db_write'):
+                created,skipped=ingest.bulk_create_access_logs(
+                    serial.validated_data['records'],
+                    files=request.FILES,
+                    batch_key=request.headers.get('Idempotency-Key')
+                )
+        except IntegrityError:
+            # batch yang sama sedang diproses request lain, terminal cukup kirim ulang
+            return Response(data={
+                'status':'error',
+                'message':'batch bentrok dengan request lain, silahkan kirim ulang'
+            },status=status.HTTP_409_CONFLICT)
+        return Response(
+            data={
+                'status':'success',
+                'created':len(created),
+                'skipped':skipped,
+                'data':serializer.Logsmartaccesserializernew(created,many=True).data
+            },status=status.HTTP_200_OK
+        )
+
+def metrics_view(request):
+    """Histogram durasi pipeline dalam format teks Prometheus."""
+    return HttpResponse(metrics.render_prometheus(),content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,290 @@
+"""
+Write-behind log akses createlogusersmartnew/ (FACE_WRITE_BEHIND=True).
+
+Keputusan akses langsung dikembalikan ke terminal, sedangkan baris Logsmartaccess2 dan JPEG
+crop-nya masuk antrean di memori proses (paling banyak FACE_WRITE_BEHIND_QUEUE_SIZE event)
+yang dikuras satu thread writer. Writer mengambil sampai FACE_WRITE_BEHIND_BATCH event (menunggu
+paling lama FACE_WRITE_BEHIND_INTERVAL detik), menggabungkan event berulang (debounce.collapse),
+lalu menulis file lewat ingest.write_crops dan baris lewat satu bulk_create. Kalau antrean
+penuh, event ditulis sinkron seperti mode biasa.
+
+Sebelum masuk antrean, tiap event ditulis (dan di-fsync) ke satu file spill di
+FACE_WRITE_BEHIND_SPILL_DIR dan baru dihapus setelah batch-nya tersimpan. Saat proses berhenti normal antrean dikuras dulu
+(atexit, paling lama FACE_WRITE_BEHIND_SHUTDOWN_TIMEOUT detik). Kalau proses mati sebelum itu,
+file spill yang tertinggal ditulis dengan `manage.py flushwritebehind`. Replay tidak menggandakan
+event yang sempat tersimpan: record yang idempotency key-nya sudah ada di database dibuang, dan
+record wajah dikenal yang waktunya sudah tercakup event face_id + status yang sama (access_time
+sampai last_seen) dianggap sudah digabung ke event itu.
+
+log_id di respons mode ini adalah id baris yang akan dibuat. Kalau writer menggabungkan event ke
+event debounce yang masih terbuka, baris dengan log_id itu tidak pernah ada; event-nya tercatat
+di baris lama (hit_count bertambah).
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, connection, transaction
+from users.models import User
+from . import debounce, ingest, metrics, models
+
+logger = logging.getLogger(__name__)
+
+QUEUE_DEPTH = metrics.gauge(
+    'face_write_behind_queue_depth',
+    'Jumlah event akses yang menunggu ditulis writer write-behind'
+)
+WRITE_BEHIND_EVENTS = metrics.counter(
+    'face_write_behind_events_total',
+    'Event akses write-behind per hasil (queued, written, fallback, failed)',
+    ('result',)
+)
+SPILL_SUFFIX = '.spill'
+
+
+def enabled():
+    return settings.FACE_WRITE_BEHIND
+
+
+def spill_dir():
+    path = settings.FACE_WRITE_BEHIND_SPILL_DIR
+    return path if os.path.isabs(path) else os.path.join(settings.BASE_DIR, path)
+
+
+def make_record(face_id, status, confidence, timestamp, file_name):
+    """Record event seperti record bulk ingest, crop merujuk ke log_id event ini sendiri."""
+    log_id = str(uuid.uuid4())
+    return {
+        'log_id': log_id,
+        'face_id': None if face_id is None else str(face_id),
+        'status': status,
+        'confidence': confidence,
+        'timestamp': timestamp,
+        'crop': log_id,
+        'file_name': file_name,
+        'idempotency_key': f"wb:{log_id}",
+    }
+
+
+def write_spill(record, content):
+    """
+    Satu event = satu file: header JSON satu baris, lalu isi JPEG. File dan direktori di-fsync
+    sebelum event masuk antrean, jadi event yang sudah dijawab tetap ada walaupun mesin mati.
+    """
+    directory = spill_dir()
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, record['log_id'] + SPILL_SUFFIX)
+    header = json.dumps(dict(record, timestamp=record['timestamp'].isoformat())).encode()
+    with open(path + '.tmp', 'wb') as file:
+        file.write(header + b'\n')
+        file.write(content)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(path + '.tmp', path)
+    # rename baru tahan crash setelah direktorinya ikut di-fsync
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    return path
+
+
+def read_spill(path):
+    with open(path, 'rb') as file:
+        header, content = file.read().split(b'\n', 1)
+    record = json.loads(header)
+    record['timestamp'] = datetime.fromisoformat(record['timestamp'])
+    return record, content
+
+
+def already_written(record):
+    """Record replay wajah dikenal yang waktunya sudah tercakup event yang tersimpan."""
+    return bool(record['face_id']) and models.Logsmartaccess2.objects.filter(
+        id_face_user_id=record['face_id'], status=record['status'],
+        access_time__lte=record['timestamp'], last_seen__gte=record['timestamp'],
+    ).exists()
+
+
+def write_batch(items, replaying=False):
+    """
+    Menulis batch (path spill, record, isi JPEG) ke storage dan database dalam satu transaksi,
+    lalu membuang file spill-nya. Kalau gagal, file spill tetap ada dan exception diteruskan.
+    replaying=True untuk file spill tertinggal: record yang sudah tercakup event wajah dikenal
+    ikut dibuang (lihat docstring modul).
+    """
+    # user yang dihapus selagi event-nya antre: log-nya ikut dibuang, sama seperti CASCADE
+    face_ids = {record['face_id'] for _, record, _ in items if record['face_id']}
+    existing = set(User.objects.filter(face_id__in=face_ids).values_list('face_id', flat=True)) if face_ids else set()
+    records = [record for _, record, _ in items if not record['face_id'] or record['face_id'] in existing]
+    files = {record['crop']: ContentFile(content, name=record['file_name']) for _, record, content in items}
+    replaced, written = [], []
+    with transaction.atomic():
+        # record yang barisnya sudah tersimpan tidak boleh ikut digabung debounce lagi
+        keys = [record['idempotency_key'] for record in records]
+        stored = set(models.Logsmartaccess2.objects.filter(idempotency_key__in=keys)
+                     .values_list('idempotency_key', flat=True))
+        records = [record for record in records if record['idempotency_key'] not in stored]
+        if replaying:
+            records = [record for record in records if not already_written(record)]
+        inserts, updates = debounce.collapse(records)
+        try:
+            for update in updates:
+                event = update['event']
+                fields = ['hit_count', 'last_seen']
+                event.hit_count, event.last_seen = update['hit_count'], update['last_seen']
+                if update['crop']:
+                    replaced.append(event.image.name)
+                    written += ingest.write_crops([(event, files[update['crop']])])
+                    event.confidence = update['confidence']
+                    fields += ['image', 'confidence']
+                event.save(update_fields=fields)
+            ingest.bulk_create_access_logs(inserts, files)
+        except Exception:
+            ingest.delete_crops(written)
+            raise
+    # gambar lama event yang digabung baru dihapus setelah transaksi selesai
+    ingest.delete_crops([name for name in replaced if name])
+    for path, _, _ in items:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+class WriteBehindBuffer:
+    def __init__(self, max_size=None, batch_size=None, interval=None):
+        self.queue = queue.Queue(maxsize=settings.FACE_WRITE_BEHIND_QUEUE_SIZE if max_size is None else max_size)
+        self.batch_size = settings.FACE_WRITE_BEHIND_BATCH if batch_size is None else batch_size
+        self.interval = settings.FACE_WRITE_BEHIND_INTERVAL if interval is None else interval
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.thread = None
+
+    def start(self):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.stopping.clear()
+                self.thread = threading.Thread(target=self.run, name='face-write-behind', daemon=True)
+                self.thread.start()
+
+    def submit(self, record, content):
+        """Memasukkan event ke antrean. False kalau antrean penuh, pemanggil menulis sendiri."""
+        self.start()
+        path = write_spill(record, content)
+        try:
+            self.queue.put_nowait((path, record, content))
+        except queue.Full:
+            os.remove(path)
+            WRITE_BEHIND_EVENTS.inc(result='fallback')
+            return False
+        WRITE_BEHIND_EVENTS.inc(result='queued')
+        QUEUE_DEPTH.set(self.queue.qsize())
+        return True
+
+    def run(self):
+        try:
+            while True:
+                try:
+                    batch = [self.queue.get(timeout=self.interval)]
+                except queue.Empty:
+                    if self.stopping.is_set():
+                        break
+                    continue
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self.queue.get_nowait())
+                    except queue.Empty:
+                        break
+                self.write(batch)
+        finally:
+            connection.close()
+
+    def write(self, batch):
+        close_old_connections()
+        try:
+            with metrics.timer('write_behind'):
+                write_batch(batch)
+            WRITE_BEHIND_EVENTS.inc(len(batch), result='written')
+        except Exception:
+            logger.exception("write-behind gagal menulis %d event, file spill ditinggal untuk flushwritebehind",
+                             len(batch))
+            WRITE_BEHIND_EVENTS.inc(len(batch), result='failed')
+        finally:
+            for _ in batch:
+                self.queue.task_done()
+            QUEUE_DEPTH.set(self.queue.qsize())
+
+    def flush(self, timeout=None):
+        """Menunggu semua event di antrean selesai diproses, False kalau timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.queue.all_tasks_done:
+            while self.queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.queue.all_tasks_done.wait(remaining)
+        return True
+
+    def stop(self, timeout=None):
+        flushed = self.flush(timeout)
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+        return flushed
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_buffer():
+    global _buffer
+    with _buffer_lock:
+        if _buffer is None:
+            _buffer = WriteBehindBuffer()
+        return _buffer
+
+
+def shutdown(timeout=None):
+    """Menguras antrean lalu menghentikan writer. Event yang tidak sempat ditulis tetap ada di spill."""
+    global _buffer
+    with _buffer_lock:
+        buffer, _buffer = _buffer, None
+    if buffer is None:
+        return True
+    timeout = settings.FACE_WRITE_BEHIND_SHUTDOWN_TIMEOUT if timeout is None else timeout
+    flushed = buffer.stop(timeout)
+    if not flushed:
+        logger.warning("write-behind: %d event belum tertulis saat shutdown, jalankan flushwritebehind",
+                       buffer.queue.qsize())
+    return flushed
+
+
+atexit.register(shutdown)
+
+
+def pending_spills(min_age=0):
+    """File spill yang umurnya minimal `min_age` detik (event yang masih di antrean writer lebih muda)."""
+    directory = spill_dir()
+    if not os.path.isdir(directory):
+        return []
+    now = time.time()
+    paths = [os.path.join(directory, name) for name in sorted(os.listdir(directory)) if name.endswith(SPILL_SUFFIX)]
+    return [path for path in paths if now - os.path.getmtime(path) >= min_age]
+
+
+def replay(min_age=0, batch_size=None):
+    """Menulis event dari file spill yang tertinggal, mengembalikan jumlah event."""
+    batch_size = batch_size or settings.FACE_WRITE_BEHIND_BATCH
+    paths = pending_spills(min_age)
+    for start in range(0, len(paths), batch_size):
+        write_batch([(path, *read_spill(path)) for path in paths[start:start + batch_size]], replaying=True)
+    return len(paths)
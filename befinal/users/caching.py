@@ -0,0 +1,78 @@
+"""
+Cache respons listing yang sering dipolling terminal (daftar owner, gambar training user).
+
+Setiap namespace punya versi di cache framework Django. Versi adalah timestamp perubahan
+terakhir dan dinaikkan oleh signal saat User/Datawajahnew berubah, jadi key respons lama
+otomatis tidak terpakai lagi. ETag dan Last-Modified diturunkan dari versi tersebut sehingga
+klien yang mengirim If-None-Match / If-Modified-Since cukup menerima 304.
+"""
+import hashlib
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+OWNERS = 'owners'
+FACE_IMAGES = 'face_images'
+
+
+def _version_key(namespace):
+    return f"respcache:version:{namespace}"
+
+
+def get_version(namespace):
+    version = cache.get(_version_key(namespace))
+    if version is None:
+        # versi hilang (restart/eviction): anggap berubah sekarang
+        version = time.time_ns()
+        cache.add(_version_key(namespace), version, None)
+        version = cache.get(_version_key(namespace), version)
+    return version
+
+
+def _bump(namespaces):
+    for namespace in namespaces:
+        version = max(time.time_ns(), (cache.get(_version_key(namespace)) or 0) + 1)
+        cache.set(_version_key(namespace), version, None)
+
+
+def bump(*namespaces):
+    """
+    Naikkan versi sekarang dan sekali lagi setelah commit, supaya respons yang dibangun
+    dari data sebelum commit tidak tertinggal di cache dengan versi baru.
+    """
+    _bump(namespaces)
+    transaction.on_commit(lambda: _bump(namespaces))
+
+
+def cached_response(request, namespace, build, vary=()):
+    """
+    Mengembalikan Response dari cache (atau hasil build()) dengan ETag/Last-Modified,
+    atau 304 kalau validator dari klien masih cocok. `vary` berisi nama query param
+    yang membedakan isi respons.
+    """
+    version = get_version(namespace)
+    params = '&'.join(f"{name}={request.query_params.get(name, '')}" for name in vary)
+    digest = hashlib.sha1(params.encode('utf-8')).hexdigest()[:16]
+    etag = f'"{namespace}-{version}-{digest}"'
+    last_modified = version // 1_000_000_000
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is None:
+        key = f"respcache:{namespace}:{version}:{digest}"
+        cached = cache.get(key)
+        if cached is None:
+            built = build()
+            cached = (built.data, built.status_code)
+            cache.set(key, cached, settings.RESPONSE_CACHE_TIMEOUT)
+        response = Response(data=cached[0], status=cached[1])
+    else:
+        response = not_modified
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    # klien boleh simpan, tapi wajib revalidasi dengan ETag tiap kali pakai
+    response['Cache-Control'] = 'no-cache'
+    return response
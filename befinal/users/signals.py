@@ -0,0 +1,11 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from . import caching
+from .models import User
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_listings(sender, **kwargs):
+    """Daftar owner dan listing gambar (dicari lewat username) ikut berubah."""
+    caching.bump(caching.OWNERS, caching.FACE_IMAGES)
@@ -1,3 +1,39 @@
+from django.core.cache import cache
 from django.test import TestCase
+from .models import User
 
 # Create your tests here.
+
+
+class OwnerListingCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        User.objects.create_user(username='owner', email='owner@example.com', password='x',
+                                 role=User.Role.OWNER, first_name='John', last_name='Doe')
+
+    def test_etag_and_not_modified(self):
+        response = self.client.get('/users/userowner/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([owner['username'] for owner in response.json()], ['owner'])
+        etag = response['ETag']
+
+        with self.assertNumQueries(0):
+            again = self.client.get('/users/userowner/', headers={'If-None-Match': etag})
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again['ETag'], etag)
+
+        with self.assertNumQueries(0):
+            cached = self.client.get('/users/userowner/')
+        self.assertEqual(cached.json(), response.json())
+
+        since = self.client.get('/users/userowner/', headers={'If-Modified-Since': response['Last-Modified']})
+        self.assertEqual(since.status_code, 304)
+
+    def test_user_change_invalidates(self):
+        etag = self.client.get('/users/userowner/')['ETag']
+        User.objects.create_user(username='second', email='second@example.com', password='x',
+                                 role=User.Role.OWNER, first_name='Jane', last_name='Roe')
+        response = self.client.get('/users/userowner/', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(response.json()), 2)
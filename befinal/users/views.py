@@ -7,6 +7,7 @@ from rest_framework.views import APIView
 
 from . import  serializer
 from . import models
+from . import caching
 # Create your views here.
 
 class UserRegistrationView(generics.CreateAPIView):
@@ -51,6 +52,9 @@ class UserRegistrationView(generics.CreateAPIView):
 
 class Usergetrole(APIView):
     def get(self,request):
+        return caching.cached_response(request,caching.OWNERS,self.build_response)
+
+    def build_response(self):
         items=models.User.objects.filter(role=models.User.Role.OWNER)
         userdetail=serializer.UserDetailSerializer(items,many=True)
         return Response(userdetail.data,status=status.HTTP_200_OK)